@@ -0,0 +1,3 @@
+"""
+Load benchmarks for the ELCA Blockbusters API (python -m benchmarks.load).
+"""
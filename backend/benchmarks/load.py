@@ -0,0 +1,623 @@
+"""
+End-to-end load benchmark for the ELCA Blockbusters task pipeline.
+Boots the app in-process (or under uvicorn with N workers) against the fake LLM,
+drives the task and ontology endpoints closed-loop (fixed concurrency) or open-loop
+(Poisson arrivals), and writes a JSON report that `compare` checks against a baseline.
+
+    python -m benchmarks.load run --duration 60 --concurrency 16 --output bench.json
+    python -m benchmarks.load run --rate 20 --server uvicorn --workers 4 --output bench.json
+    python -m benchmarks.load compare baseline.json bench.json --threshold 0.1
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = "tasks=0.4,recent=0.3,values=0.1,beliefs=0.1,summary=0.1"
+
+ENDPOINTS = {
+    "tasks": ("POST", "/api/tasks"),
+    "recent": ("GET", "/api/tasks/recent"),
+    "values": ("GET", "/api/ontology/values"),
+    "beliefs": ("GET", "/api/ontology/beliefs"),
+    "summary": ("GET", "/api/ontology/summary"),
+}
+
+# Keys match the prompt builders in main.py; the first key after "type" names the subject
+TASK_INPUTS = {
+    "pastoral_care": [
+        {"type": "sermon", "topic": "God's Grace", "scripture": "John 3:16", "length": "short"},
+        {"type": "devotional", "theme": "Hope in Advent"},
+        {"type": "scripture_study", "passage": "Luke 10:25-37"},
+    ],
+    "youth_engagement": [
+        {"type": "social_media", "topic": "Belonging", "platform": "instagram"},
+        {"type": "youth_journey", "theme": "Service", "age_group": "high school"},
+        {"type": "event_planning", "event_type": "retreat", "theme": "Creation care"},
+    ],
+    "mission_coordination": [
+        {"type": "volunteer_deployment", "mission": "Food pantry Saturday shift", "volunteer_count": 12},
+        {"type": "mission_opportunity", "focus_area": "Refugee resettlement", "duration": "six months"},
+        {"type": "resource_allocation", "project": "Youth room renovation", "budget": "$500"},
+    ],
+}
+
+# Stages of elca_task_stage_seconds where SQLite lock waits show up
+DB_STAGES = ("claim", "start_commit", "result_commit", "failure_commit")
+
+class RequestSpec(NamedTuple):
+    endpoint: str
+    agent_type: str
+    method: str
+    path: str
+    body: Optional[Dict[str, Any]]
+
+def _percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies: List[float], errors: int, duration: float) -> Dict[str, Any]:
+    """Count, throughput and latency percentiles (milliseconds) of one request group."""
+    values = sorted(latencies)
+    count = len(values) + errors
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_rps": round(len(values) / duration, 3) if duration else 0.0,
+        "mean_ms": ms(sum(values) / len(values)) if values else None,
+        "p50_ms": ms(_percentile(values, 0.50)),
+        "p95_ms": ms(_percentile(values, 0.95)),
+        "p99_ms": ms(_percentile(values, 0.99)),
+        "max_ms": ms(values[-1]) if values else None,
+    }
+
+class Recorder:
+    """Collects per-request latencies once the warm-up is over."""
+
+    def __init__(self):
+        self.measure_from = float("inf")
+        self.latencies: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+        self.errors: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.statuses: Dict[str, int] = defaultdict(int)
+        self.dropped = 0
+
+    def record(self, spec: RequestSpec, started: float, seconds: float, status: str, ok: bool):
+        if started < self.measure_from:
+            return
+        key = (spec.endpoint, spec.agent_type)
+        self.statuses[status] += 1
+        if ok:
+            self.latencies[key].append(seconds)
+        else:
+            self.errors[key] += 1
+
+    def report(self, duration: float) -> Dict[str, Any]:
+        keys = set(self.latencies) | set(self.errors)
+        by_endpoint: Dict[str, Tuple[List[float], int]] = defaultdict(lambda: ([], 0))
+        by_agent: Dict[str, Tuple[List[float], int]] = defaultdict(lambda: ([], 0))
+        for endpoint, agent_type in keys:
+            latencies, errors = self.latencies.get((endpoint, agent_type), []), self.errors.get((endpoint, agent_type), 0)
+            values, count = by_endpoint[endpoint]
+            by_endpoint[endpoint] = (values + latencies, count + errors)
+            if agent_type:
+                values, count = by_agent[agent_type]
+                by_agent[agent_type] = (values + latencies, count + errors)
+
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        return {
+            "summary": {
+                **summarize(all_latencies, sum(self.errors.values()), duration),
+                "dropped_arrivals": self.dropped,
+                "status_codes": dict(self.statuses)
+            },
+            "endpoints": {name: summarize(values, errors, duration) for name, (values, errors) in sorted(by_endpoint.items())},
+            "agent_types": {name: summarize(values, errors, duration) for name, (values, errors) in sorted(by_agent.items())}
+        }
+
+class RequestMix:
+    """Weighted, seeded choice of the next request."""
+
+    def __init__(self, mix: str, agents: Dict[str, str], seed: int, unique_inputs: bool):
+        self.rng = random.Random(seed)
+        self.weights: List[Tuple[str, float]] = []
+        for entry in mix.split(","):
+            name, _, weight = entry.partition("=")
+            if name.strip() not in ENDPOINTS:
+                raise SystemExit(f"Unknown endpoint in --mix: {name}")
+            self.weights.append((name.strip(), float(weight or 1)))
+        self.agents = agents  # agent_type -> agent_id
+        self.unique_inputs = unique_inputs
+        self.counter = 0
+
+    def next(self) -> RequestSpec:
+        name = self.rng.choices([name for name, _ in self.weights], [weight for _, weight in self.weights])[0]
+        method, path = ENDPOINTS[name]
+        if name != "tasks":
+            return RequestSpec(f"{method} {path}", "", method, path, None)
+
+        agent_type = self.rng.choice(sorted(self.agents))
+        input_data = dict(self.rng.choice(TASK_INPUTS[agent_type]))
+        if self.unique_inputs:
+            # Distinct prompts defeat the response caches, so every task reaches the provider
+            self.counter += 1
+            subject = next(key for key in input_data if key != "type")
+            input_data[subject] = f"{input_data[subject]} (benchmark request {self.counter})"
+        body = {"user_id": "benchmark", "agent_id": self.agents[agent_type], "input_data": input_data}
+        return RequestSpec(f"{method} {path}", agent_type, method, path, body)
+
+async def send(client: httpx.AsyncClient, spec: RequestSpec, recorder: Recorder, scheduled: Optional[float] = None):
+    """Issue one request; open-loop latency counts from the scheduled arrival time.
+
+    Tasks run synchronously, so a task that comes back failed counts as an error.
+    """
+    started = scheduled if scheduled is not None else time.monotonic()
+    status, ok = "connection_error", False
+    try:
+        response = await client.request(spec.method, spec.path, json=spec.body)
+        status, ok = str(response.status_code), response.status_code < 400
+        if ok and spec.agent_type and response.json().get("status") == "failed":
+            status, ok = "task_failed", False
+    except httpx.HTTPError:
+        pass
+    recorder.record(spec, started, time.monotonic() - started, status, ok)
+
+async def closed_loop(client: httpx.AsyncClient, mix: RequestMix, recorder: Recorder, concurrency: int, deadline: float):
+    async def user():
+        while time.monotonic() < deadline:
+            await send(client, mix.next(), recorder)
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+
+async def open_loop(
+    client: httpx.AsyncClient,
+    mix: RequestMix,
+    recorder: Recorder,
+    rate: float,
+    deadline: float,
+    max_in_flight: int,
+    seed: int
+):
+    rng = random.Random(seed + 1)
+    in_flight: set = set()
+    next_arrival = time.monotonic()
+    while True:
+        next_arrival += rng.expovariate(rate)
+        if next_arrival >= deadline:
+            break
+        await asyncio.sleep(max(0.0, next_arrival - time.monotonic()))
+        if len(in_flight) >= max_in_flight:
+            if next_arrival >= recorder.measure_from:
+                recorder.dropped += 1
+            continue
+        task = asyncio.create_task(send(client, mix.next(), recorder, scheduled=next_arrival))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    await asyncio.gather(*in_flight)
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+def _process_tree(pid: int) -> List[int]:
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            for child in f.read().split():
+                pids.extend(_process_tree(int(child)))
+    except OSError:
+        pass
+    return pids
+
+class MemorySampler:
+    """Total RSS of the server process tree, sampled in the background."""
+
+    def __init__(self, root_pid: int, interval: float = 0.5):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.samples: List[Tuple[float, int]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self) -> int:
+        rss = sum(_rss_bytes(pid) for pid in _process_tree(self.root_pid))
+        self.samples.append((time.monotonic(), rss))
+        return rss
+
+    def start(self):
+        async def run():
+            while True:
+                self.sample()
+                await asyncio.sleep(self.interval)
+        self._task = asyncio.create_task(run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.sample()
+
+    def report(self, measure_from: float) -> Dict[str, Any]:
+        measured = [rss for at, rss in self.samples if at >= measure_from] or [rss for _, rss in self.samples]
+        if not measured or not measured[0]:
+            return {"available": False}
+        mib = 1024 * 1024
+        return {
+            "available": True,
+            "start_mib": round(measured[0] / mib, 1),
+            "end_mib": round(measured[-1] / mib, 1),
+            "peak_mib": round(max(measured) / mib, 1),
+            "growth_mib": round((measured[-1] - measured[0]) / mib, 1)
+        }
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+def parse_prometheus(text: str) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+    """Samples of a Prometheus text exposition keyed by (name, sorted labels)."""
+    samples = {}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if match:
+            labels = tuple(sorted(_LABEL.findall(match.group(2) or "")))
+            samples[(match.group(1), labels)] = float(match.group(3))
+    return samples
+
+def histogram_quantiles(before: Dict, after: Dict, name: str, group_by: str) -> Dict[str, Dict[str, Any]]:
+    """Per-label quantiles (ms) of a histogram over the interval between two scrapes."""
+    buckets: Dict[str, Dict[float, float]] = defaultdict(dict)
+    for (sample, labels), value in after.items():
+        if sample != f"{name}_bucket":
+            continue
+        label_map = dict(labels)
+        bound = float(label_map.pop("le"))
+        group = label_map.get(group_by, "")
+        previous = before.get((sample, labels), 0.0)
+        buckets[group][bound] = buckets[group].get(bound, 0.0) + value - previous
+
+    result = {}
+    for group, counts in sorted(buckets.items()):
+        bounds = sorted(counts)
+        total = counts[bounds[-1]] if bounds else 0
+        if not total:
+            continue
+        quantiles = {"count": int(total)}
+        for label, fraction in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            quantiles[label] = _bucket_quantile(bounds, counts, total * fraction)
+        result[group] = quantiles
+    return result
+
+def _bucket_quantile(bounds: List[float], counts: Dict[float, float], rank: float) -> Optional[float]:
+    """Linear interpolation within the bucket holding `rank`, like histogram_quantile()."""
+    lower, below = 0.0, 0.0
+    for bound in bounds:
+        if counts[bound] >= rank:
+            if bound == float("inf"):
+                return round(lower * 1000, 2)
+            inside = counts[bound] - below
+            share = (rank - below) / inside if inside else 1.0
+            return round((lower + (bound - lower) * share) * 1000, 2)
+        lower, below = bound, counts[bound]
+    return None
+
+class DatabaseProbe:
+    """Times write statements and counts lock errors through SQLAlchemy events (in-process only)."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.write_seconds: List[float] = []
+        self.locked_errors = 0
+        self.measuring = False
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("benchmark_started", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["benchmark_started"].pop()
+            if self.measuring and statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+                self.write_seconds.append(time.perf_counter() - started)
+
+        @event.listens_for(sync_engine, "handle_error")
+        def on_error(context):
+            stack = context.connection.info.get("benchmark_started") if context.connection is not None else None
+            if stack:
+                stack.pop()
+            if self.measuring and "database is locked" in str(context.original_exception):
+                self.locked_errors += 1
+
+    def report(self) -> Dict[str, Any]:
+        values = sorted(self.write_seconds)
+        return {
+            "write_statements": len(values),
+            "write_p50_ms": round(_percentile(values, 0.5) * 1000, 2) if values else None,
+            "write_p95_ms": round(_percentile(values, 0.95) * 1000, 2) if values else None,
+            "write_p99_ms": round(_percentile(values, 0.99) * 1000, 2) if values else None,
+            "write_max_ms": round(values[-1] * 1000, 2) if values else None,
+            "locked_errors": self.locked_errors
+        }
+
+def app_environment(args: argparse.Namespace, workdir: str) -> Dict[str, str]:
+    """Settings for the app under test: fake LLM profile and throwaway state in `workdir`."""
+    env = {
+        "AI_FAKE_LLM_MODE": args.fake_mode,
+        "AI_FAKE_LLM_TTFT_MS": str(args.ttft_ms),
+        "AI_FAKE_LLM_LATENCY_SIGMA": str(args.latency_sigma),
+        "AI_FAKE_LLM_TOKENS_PER_SECOND": str(args.tokens_per_second),
+        "AI_FAKE_LLM_OUTPUT_TOKENS": str(args.output_tokens),
+        "AI_FAKE_LLM_ERROR_RATE": str(args.error_rate),
+        "AI_FAKE_LLM_RATE_LIMIT_RATE": str(args.rate_limit_rate),
+        "AI_FAKE_LLM_SEED": str(args.seed),
+        "USAGE_DB_PATH": os.path.join(workdir, "ai_usage.db"),
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.db"),
+        "METRICS_DIR": os.path.join(workdir, "metrics"),
+        "METRICS_EXPORT_INTERVAL_SECONDS": "1",
+        "TASK_EXECUTOR": "local",
+    }
+    if args.cassette:
+        env["AI_FAKE_LLM_CASSETTE"] = os.path.abspath(args.cassette)
+    for entry in args.env:
+        key, _, value = entry.partition("=")
+        env[key] = value
+    return env
+
+@asynccontextmanager
+async def in_process_server(env: Dict[str, str], workdir: str) -> AsyncIterator[Dict[str, Any]]:
+    """Run the app's lifespan in this process and talk to it over an ASGI transport."""
+    os.environ.update(env)
+    os.chdir(workdir)  # The default SQLite database lives in the working directory
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+    from shared.models import engine
+
+    probe = DatabaseProbe(engine)
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            yield {"client": client, "pid": os.getpid(), "db_probe": probe}
+
+@asynccontextmanager
+async def uvicorn_server(env: Dict[str, str], workdir: str, workers: int, port: int) -> AsyncIterator[Dict[str, Any]]:
+    """Run the app under uvicorn with `workers` processes."""
+    process_env = {**os.environ, **env, "PYTHONPATH": BACKEND_DIR}
+    log = open(os.path.join(workdir, "server.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir, env=process_env, stdout=log, stderr=subprocess.STDOUT
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                if process.poll() is not None:
+                    raise SystemExit(f"Server exited during startup, see {log.name}")
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise SystemExit(f"Server did not become healthy, see {log.name}")
+                await asyncio.sleep(0.25)
+            yield {"client": client, "pid": process.pid, "db_probe": None}
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log.close()
+
+async def _agents(client: httpx.AsyncClient) -> Dict[str, str]:
+    response = await client.get("/api/agents")
+    response.raise_for_status()
+    return {agent["agent_type"]: agent["id"] for agent in response.json() if agent["agent_type"] in TASK_INPUTS}
+
+async def _scrape(client: httpx.AsyncClient) -> Dict:
+    try:
+        response = await client.get("/metrics")
+        return parse_prometheus(response.text) if response.status_code == 200 else {}
+    except httpx.HTTPError:
+        return {}
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="elca-bench-")
+    env = app_environment(args, workdir)
+    if args.server == "uvicorn":
+        server = uvicorn_server(env, workdir, args.workers, args.port)
+    else:
+        server = in_process_server(env, workdir)
+
+    try:
+        async with server as handle:
+            client: httpx.AsyncClient = handle["client"]
+            mix = RequestMix(args.mix, await _agents(client), args.seed, not args.repeat_inputs)
+            recorder = Recorder()
+            memory = MemorySampler(handle["pid"])
+            memory.start()
+
+            started = time.monotonic()
+            recorder.measure_from = started + args.warmup
+            deadline = recorder.measure_from + args.duration
+
+            async def begin_measurement():
+                await asyncio.sleep(args.warmup)
+                if handle["db_probe"]:
+                    handle["db_probe"].measuring = True
+                return await _scrape(client)
+
+            before_task = asyncio.create_task(begin_measurement())
+            if args.rate:
+                await open_loop(client, mix, recorder, args.rate, deadline, args.max_in_flight, args.seed)
+            else:
+                await closed_loop(client, mix, recorder, args.concurrency, deadline)
+            measured_seconds = time.monotonic() - recorder.measure_from
+            before = await before_task
+            if handle["db_probe"]:
+                handle["db_probe"].measuring = False
+
+            await memory.stop()
+            if args.server == "uvicorn":
+                await asyncio.sleep(1.5)  # Let every worker export a final metrics snapshot
+            after = await _scrape(client)
+
+            report = recorder.report(measured_seconds)
+            stages = histogram_quantiles(before, after, "elca_task_stage_seconds", "stage")
+            report["stages"] = stages
+            report["database"] = {
+                "commit_stages": {stage: stages[stage] for stage in DB_STAGES if stage in stages},
+                **(handle["db_probe"].report() if handle["db_probe"] else {})
+            }
+            report["event_loop_lag"] = histogram_quantiles(before, after, "elca_event_loop_lag_seconds", "")
+            report["memory"] = memory.report(recorder.measure_from)
+    finally:
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report["meta"] = {
+        "revision": _git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "server": args.server,
+        "workers": args.workers if args.server == "uvicorn" else 1,
+        "load": {"mode": "open" if args.rate else "closed", "rate": args.rate, "concurrency": args.concurrency},
+        "duration_seconds": args.duration,
+        "warmup_seconds": args.warmup,
+        "mix": args.mix,
+        "fake_llm": {key: value for key, value in env.items() if key.startswith("AI_FAKE_LLM_")},
+        "env_overrides": args.env,
+        "workdir": workdir if args.keep_workdir else None
+    }
+    return report
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> Tuple[List[str], List[str]]:
+    """Table lines and regressions: p95/p99 up or throughput down by more than `threshold`, or more errors."""
+    lines = [f"{'group':<40} {'metric':<15} {'baseline':>12} {'current':>12} {'change':>9}"]
+    regressions = []
+
+    def check(group: str, name: str, old: Optional[float], new: Optional[float], higher_is_worse: bool, gate: bool = True):
+        if old is None or new is None:
+            return
+        change = (new - old) / old if old else 0.0
+        lines.append(f"{group:<40} {name:<15} {old:>12.2f} {new:>12.2f} {change:>+8.1%}")
+        if gate and ((change > threshold) if higher_is_worse else (change < -threshold)):
+            regressions.append(f"{group} {name}: {old:.2f} -> {new:.2f} ({change:+.1%})")
+
+    sections = [("", "summary")] + [(f"{section}:", section) for section in ("endpoints", "agent_types")]
+    for prefix, section in sections:
+        old_groups = {"all": baseline["summary"]} if section == "summary" else baseline.get(section, {})
+        new_groups = {"all": current["summary"]} if section == "summary" else current.get(section, {})
+        for group in sorted(set(old_groups) & set(new_groups)):
+            old, new = old_groups[group], new_groups[group]
+            label = f"{prefix}{group}"
+            check(label, "throughput_rps", old["throughput_rps"], new["throughput_rps"], higher_is_worse=False)
+            for metric in ("p50_ms", "p95_ms", "p99_ms"):
+                check(label, metric, old[metric], new[metric], higher_is_worse=True, gate=metric != "p50_ms")
+            if new["error_rate"] > old["error_rate"] + 0.01:
+                regressions.append(f"{label} error_rate: {old['error_rate']:.2%} -> {new['error_rate']:.2%}")
+    return lines, regressions
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run a load benchmark")
+    run.add_argument("--server", choices=("inprocess", "uvicorn"), default="inprocess")
+    run.add_argument("--workers", type=int, default=2, help="uvicorn worker processes")
+    run.add_argument("--port", type=int, default=8765)
+    run.add_argument("--duration", type=float, default=30, help="measured seconds")
+    run.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before measuring")
+    run.add_argument("--concurrency", type=int, default=8, help="closed loop: concurrent users")
+    run.add_argument("--rate", type=float, default=0, help="open loop: mean arrivals per second (Poisson)")
+    run.add_argument("--max-in-flight", type=int, default=1000, help="open loop: arrivals beyond this are dropped")
+    run.add_argument("--mix", default=DEFAULT_MIX, help="endpoint weights, e.g. tasks=1,recent=1")
+    run.add_argument("--repeat-inputs", action="store_true", help="reuse task inputs so caches can hit")
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("--fake-mode", choices=("synthetic", "replay"), default="synthetic")
+    run.add_argument("--cassette", help="recorded responses for --fake-mode replay")
+    run.add_argument("--ttft-ms", type=float, default=400)
+    run.add_argument("--latency-sigma", type=float, default=0.5)
+    run.add_argument("--tokens-per-second", type=float, default=60)
+    run.add_argument("--output-tokens", type=int, default=300)
+    run.add_argument("--error-rate", type=float, default=0.0)
+    run.add_argument("--rate-limit-rate", type=float, default=0.0)
+    run.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra app setting (repeatable)")
+    run.add_argument("--output", help="write the JSON report here (default: stdout)")
+    run.add_argument("--keep-workdir", action="store_true", help="keep the database, logs and metrics")
+
+    compare = commands.add_parser("compare", help="Compare a report against a baseline")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        lines, regressions = compare_reports(baseline, current, args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            print("\nRegressions:\n" + "\n".join(f"  {regression}" for regression in regressions))
+            return 1
+        print("\nNo regressions above threshold")
+        return 0
+
+    report = asyncio.run(run_benchmark(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        summary = report["summary"]
+        print(
+            f"{summary['requests']} requests, {summary['throughput_rps']} req/s, "
+            f"p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, p99 {summary['p99_ms']} ms, "
+            f"errors {summary['error_rate']:.2%} -> {args.output}"
+        )
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
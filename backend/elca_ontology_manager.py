@@ -4,22 +4,34 @@ Implements ELCA values, beliefs, and AI ethics guidelines for Blockbusters MVP.
 """
 
 import uuid
+import os
+import asyncio
 from typing import List, Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 import structlog
 
 from shared.models import Value, Belief, ValueCreate, BeliefCreate
-from shared.elca_ai_providers import ELCAAIProviderManager
+from shared.elca_ai_providers import ELCAAIProviderManager, get_ai_provider_manager
+from shared.ontology_snapshot import (
+    ontology_snapshots, OntologySnapshot, ValueRecord, BeliefRecord, AgentRecord
+)
+from shared.guideline_scanner import add_concern, get_guideline_scanner, get_validation_policy, needs_escalation
 
 logger = structlog.get_logger()
 
+# Pipelined validation of long outputs while they are still being generated
+VALIDATION_PIPELINE_ENABLED = os.getenv("VALIDATION_PIPELINE_ENABLED", "false").lower() == "true"
+VALIDATION_PIPELINE_MIN_TOKENS = int(os.getenv("VALIDATION_PIPELINE_MIN_TOKENS", "1000"))
+VALIDATION_SECTION_MIN_CHARS = int(os.getenv("VALIDATION_SECTION_MIN_CHARS", "1200"))
+VALIDATION_MAX_CONCURRENCY = int(os.getenv("VALIDATION_MAX_CONCURRENCY", "3"))
+
 class ELCAOntologyManager:
     """ELCA-specific ontology manager with AI ethics integration."""
     
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, ai_provider: Optional[ELCAAIProviderManager] = None):
         self.db = db
-        self.ai_provider = ELCAAIProviderManager()
+        self.ai_provider = ai_provider or get_ai_provider_manager()
         self.tenant_id = "elca-demo"  # Simplified for MVP
     
     async def initialize_elca_ontology(self):
@@ -174,17 +186,36 @@ class ELCAOntologyManager:
             logger.error("Failed to get ELCA beliefs", error=str(e), tenant_id=self.tenant_id)
             raise
     
+    async def get_snapshot(self) -> OntologySnapshot:
+        """Get the cached ontology and agent registry snapshot for this tenant."""
+        snapshot = await ontology_snapshots.get(self.db, self.tenant_id)
+        # Cached LLM responses are only valid for the ontology they were generated with
+        self.ai_provider.ontology_version = snapshot.fingerprint
+        return snapshot
+    
+    async def get_agent(self, agent_id: str) -> Optional[AgentRecord]:
+        """Look up an agent in the registry snapshot, reloading once on a miss."""
+        snapshot = await self.get_snapshot()
+        agent = snapshot.agents_by_id.get(agent_id)
+        if agent is None:
+            # The agent may have been registered by another process since the snapshot was built
+            ontology_snapshots.invalidate()
+            snapshot = await self.get_snapshot()
+            agent = snapshot.agents_by_id.get(agent_id)
+        return agent
+    
     async def get_relevant_values_and_beliefs(
         self, 
         task_description: str, 
         task_type: str,
         limit: int = 5
-    ) -> tuple[List[Value], List[Belief]]:
+    ) -> tuple[List[ValueRecord], List[BeliefRecord]]:
         """Get relevant values and beliefs for a task with ELCA context."""
         try:
             # For MVP, return most relevant values and beliefs based on task type
-            values = await self.get_values(limit=limit)
-            beliefs = await self.get_beliefs(limit=limit)
+            snapshot = await self.get_snapshot()
+            values = list(snapshot.values[:limit])
+            beliefs = list(snapshot.beliefs[:limit])
             
             # Filter based on task type
             if task_type == "pastoral_care" or task_type == "sermon_generation":
@@ -214,20 +245,39 @@ class ELCAOntologyManager:
             logger.error("Failed to get relevant ELCA ontology items", error=str(e), tenant_id=self.tenant_id)
             raise
     
-    async def validate_ai_content(self, content: str, task_type: str = "general") -> Dict[str, Any]:
-        """Validate AI-generated content against ELCA guidelines."""
+    async def validate_ai_content(
+        self,
+        content: str,
+        task_type: str = "general",
+        snapshot: Optional[OntologySnapshot] = None,
+        section_note: str = ""
+    ) -> Dict[str, Any]:
+        """Validate AI-generated content against ELCA guidelines.
+        
+        The local guideline scanner runs first; the LLM validator is only called when
+        the agent type's policy requires escalation.
+        Pass `snapshot` when validating concurrently so no database session is shared;
+        `section_note` tells the validator it is looking at part of a longer piece.
+        """
         try:
-            # Get ELCA values and beliefs for validation
-            elca_values = await self.get_values(limit=50)
-            elca_beliefs = await self.get_beliefs(limit=50)
+            # Get pre-rendered ELCA values and beliefs for validation
+            snapshot = snapshot or await self.get_snapshot()
             
-            # Create validation prompt
-            values_text = "\n".join([f"- {v.name}: {v.description}" for v in elca_values])
-            beliefs_text = "\n".join([f"- {b.name}: {b.description}" for b in elca_beliefs])
+            # First tier: local scan, enough on its own for clean low-risk content
+            local_report, categories = get_guideline_scanner(snapshot).scan(
+                content,
+                check_transparency=not section_note
+            )
+            if not needs_escalation(get_validation_policy(task_type), content, categories):
+                logger.info("AI content approved by guideline scanner", tenant_id=self.tenant_id, task_type=task_type)
+                return local_report
+            
+            values_text = snapshot.values_text
+            beliefs_text = snapshot.beliefs_text
             
             validation_prompt = f"""
             Validate the following AI-generated content against ELCA 2025 AI guidelines:
-            
+            {section_note}
             Content to validate: {content}
             
             ELCA Values:
@@ -277,13 +327,30 @@ class ELCAOntologyManager:
                 "required": ["is_approved", "compliance_score", "value_alignment", "concerns", "recommendations", "requires_human_review"]
             }
             
+            # Identical content always gets the same verdict, so validation is always cached
             validation_result = await self.ai_provider.generate_structured_output(
                 validation_prompt, 
                 validation_schema, 
-                use_case=task_type
+                use_case=task_type,
+                cache=True
             )
             
-            logger.info("AI content validation completed", tenant_id=self.tenant_id, approved=validation_result.get("is_approved"))
+            # Keep anything the scanner caught that the LLM did not mention
+            if categories:
+                validation_result = {
+                    **validation_result,
+                    "concerns": list(validation_result.get("concerns", [])) + [
+                        concern for concern in local_report["concerns"] if concern["type"] in categories
+                    ]
+                }
+            validation_result["validated_by"] = "llm"
+            
+            logger.info(
+                "AI content validation completed",
+                tenant_id=self.tenant_id,
+                approved=validation_result.get("is_approved"),
+                escalated_for=categories
+            )
             
             return validation_result
             
@@ -357,3 +424,103 @@ class ELCAOntologyManager:
         except Exception as e:
             logger.error("Failed to conduct AI bias audit", error=str(e), tenant_id=self.tenant_id)
             raise
+
+
+def merge_validation_reports(reports: List[Dict[str, Any]], weights: List[int]) -> Dict[str, Any]:
+    """Merge per-section validation reports into one report with the same schema."""
+    if len(reports) == 1:
+        return reports[0]
+    
+    total_weight = sum(weights) or 1
+    compliance_score = sum(
+        report.get("compliance_score", 0) * weight for report, weight in zip(reports, weights)
+    ) / total_weight
+    
+    return {
+        "is_approved": all(report.get("is_approved", False) for report in reports),
+        "compliance_score": round(compliance_score),
+        "value_alignment": list(dict.fromkeys(
+            value for report in reports for value in report.get("value_alignment", [])
+        )),
+        "concerns": [concern for report in reports for concern in report.get("concerns", [])],
+        "recommendations": list(dict.fromkeys(
+            item for report in reports for item in report.get("recommendations", [])
+        )),
+        "requires_human_review": any(report.get("requires_human_review", True) for report in reports),
+        "validated_by": "llm" if any(report.get("validated_by") == "llm" for report in reports) else "guideline_scanner"
+    }
+
+class PipelinedValidator:
+    """Validates completed sections of streamed content while later sections are generated.
+    
+    Text is cut into sections at paragraph breaks once VALIDATION_SECTION_MIN_CHARS have
+    accumulated; each section is validated concurrently and finish() merges the reports.
+    Output shorter than one section is validated in a single call, as before.
+    """
+    
+    def __init__(self, ontology_manager: ELCAOntologyManager, task_type: str, snapshot: OntologySnapshot):
+        self.ontology_manager = ontology_manager
+        self.task_type = task_type
+        self.snapshot = snapshot
+        self.min_section_chars = VALIDATION_SECTION_MIN_CHARS
+        self._semaphore = asyncio.Semaphore(VALIDATION_MAX_CONCURRENCY)
+        self._buffer = ""
+        self._sections: List[str] = []
+        self._validations: List[asyncio.Task] = []
+    
+    def feed(self, chunk: str):
+        """Add generated text, starting validation of any section that is complete."""
+        self._buffer += chunk
+        if len(self._buffer) < self.min_section_chars:
+            return
+        
+        boundary = self._buffer.rfind("\n\n")
+        if boundary >= self.min_section_chars:
+            self._start_section(self._buffer[:boundary])
+            self._buffer = self._buffer[boundary + 2:]
+    
+    async def finish(self) -> Dict[str, Any]:
+        """Validate the remaining text and merge all section reports."""
+        if not self._sections:
+            # Short output: a single ordinary validation
+            content, self._buffer = self._buffer, ""
+            return await self.ontology_manager.validate_ai_content(content, self.task_type, snapshot=self.snapshot)
+        
+        if self._buffer.strip():
+            self._start_section(self._buffer)
+        self._buffer = ""
+        
+        try:
+            reports = await asyncio.gather(*self._validations)
+        except Exception:
+            self.cancel()
+            raise
+        
+        logger.info("Pipelined validation completed", task_type=self.task_type, sections=len(reports))
+        report = merge_validation_reports(list(reports), [len(section) for section in self._sections])
+        
+        # Sections are validated without the transparency check, so disclosure is judged on the whole text
+        concern = get_guideline_scanner(self.snapshot).transparency_concern("\n\n".join(self._sections))
+        return add_concern(report, concern) if concern else report
+    
+    def cancel(self):
+        """Cancel outstanding section validations (e.g. when generation fails)."""
+        for validation in self._validations:
+            validation.cancel()
+    
+    def _start_section(self, section: str):
+        self._sections.append(section)
+        self._validations.append(asyncio.create_task(self._validate_section(section, len(self._sections))))
+    
+    async def _validate_section(self, section: str, number: int) -> Dict[str, Any]:
+        note = (
+            f"This is section {number} of a longer piece that is still being written. "
+            "Judge only this section; statements such as AI-assistance disclosures may appear in other sections."
+        )
+        async with self._semaphore:
+            return await self.ontology_manager.validate_ai_content(
+                section,
+                self.task_type,
+                snapshot=self.snapshot,
+                section_note=note
+            )
@@ -4,23 +4,54 @@ Streamlined backend with 3 specialized agents and ELCA compliance.
 """
 
 import os
+import hmac
+import json
 import uuid
+import asyncio
+import time
+from urllib.parse import parse_qs
 from contextlib import asynccontextmanager
-from typing import List, Dict, Any, Optional
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Any, NamedTuple, Optional
 
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, insert, func
 import structlog
 
 from shared.models import (
-    get_db, init_db, Agent, Task, Value, Belief,
-    AgentResponse, TaskCreate, TaskResponse, ValueResponse, BeliefResponse
+    get_db, get_read_db, init_db, engine, read_engine, async_session_maker,
+    Agent, Task, Value, Belief, TaskStatus, AgentResponse, TaskCreate, TaskResponse, TaskListItem, TaskListResponse,
+    ValueResponse, BeliefResponse
+)
+from elca_ontology_manager import (
+    ELCAOntologyManager, PipelinedValidator, VALIDATION_PIPELINE_ENABLED, VALIDATION_PIPELINE_MIN_TOKENS
+)
+from shared.ontology_snapshot import AgentRecord, ValueRecord, BeliefRecord
+from shared.elca_ai_providers import (
+    ELCAAIProviderManager, get_ai_provider_manager, close_ai_provider_manager
+)
+from shared.health_prober import ProviderHealthProber
+from shared.usage_store import current_tenant
+from shared.metrics import (
+    REGISTRY, METRICS_ENABLED, StageTimer, TASK_STAGE_SECONDS, TASK_SECONDS, TASK_QUEUE_DEPTH, TASKS_RUNNING,
+    DB_CONNECTIONS_CHECKED_OUT, DB_POOL_SIZE, DB_WRITE_QUEUE_DEPTH
+)
+from shared.diagnostics import (
+    SamplingProfiler, LoopLagMonitor, SlowRequestMiddleware, ProfilerBusy, PROFILER_MAX_SECONDS,
+    PROFILER_DEFAULT_INTERVAL_MS, dump_tasks, recent_slow_requests
+)
+from shared.task_engine import TaskExecutionEngine
+from shared.task_queue import (
+    make_owner_id, claim_task, reserve_task, run_with_lease, find_claimable_task_ids, fail_exhausted_tasks,
+    update_task, LeaseLost
+)
+from shared.write_queue import write_queue, execute_write
+from shared.task_listing import (
+    TaskFilters, InvalidCursor, InvalidFields, list_tasks, parse_fields, task_title, task_preview
 )
-from elca_ontology_manager import ELCAOntologyManager
-from shared.elca_ai_providers import ELCAAIProviderManager
 
 # Configure structured logging
 structlog.configure(
@@ -45,24 +76,58 @@ logger = structlog.get_logger()
 
 # Global services
 ai_provider: Optional[ELCAAIProviderManager] = None
+task_engine: Optional[TaskExecutionEngine] = None
+health_prober: Optional[ProviderHealthProber] = None
+loop_lag_monitor = LoopLagMonitor()
+profiler = SamplingProfiler()
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Application lifespan manager."""
+# Admin diagnostics (/admin/debug/*) are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Background execution: "local" runs queued tasks in this process,
+# "worker" leaves them for the standalone worker fleet (python -m worker)
+TASK_EXECUTOR = os.getenv("TASK_EXECUTOR", "local")
+TASK_RECOVERY_INTERVAL_SECONDS = float(os.getenv("TASK_RECOVERY_INTERVAL_SECONDS", "30"))
+process_owner_id = make_owner_id("api")
+
+class TaskPrompt(NamedTuple):
+    """Generation request for a task, built from its input data."""
+    prompt: str
+    use_case: str
+    max_tokens: int
+    semantic_key: Optional[str] = None  # Free-text part of the input, for near-duplicate caching
+    semantic_scope: str = ""  # Input parts that must match exactly
+
+# Long-poll settings for GET /api/tasks/{task_id}
+MAX_TASK_WAIT_SECONDS = 60
+TASK_POLL_INTERVAL_SECONDS = 0.5
+
+# Largest page of the task listing endpoints
+MAX_TASK_PAGE_SIZE = 100
+
+# Streaming: how long a task submitted with ?stream=true waits for its SSE client
+STREAM_RESERVATION_SECONDS = float(os.getenv("STREAM_RESERVATION_SECONDS", "30"))
+SSE_KEEPALIVE_SECONDS = 15
+
+# Receives progress events ("token", "status") while a task is processed
+TaskEventSink = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+# Keeps references to fire-and-forget tasks so they are not garbage collected
+background_tasks: set = set()
+
+async def initialize_services():
+    """Initialize database, AI provider and ELCA ontology (shared by API and workers)."""
     global ai_provider
     
-    # Startup
-    logger.info("Starting ELCA Blockbusters application")
-    
     # Initialize database
     await init_db()
     
-    # Initialize AI provider
-    ai_provider = ELCAAIProviderManager()
+    # Initialize the shared AI provider client pool
+    ai_provider = get_ai_provider_manager()
     
     # Initialize ELCA ontology
     async for db in get_db():
-        ontology_manager = ELCAOntologyManager(db)
+        ontology_manager = ELCAOntologyManager(db, ai_provider)
         try:
             # Check if ontology already exists
             result = await db.execute(select(func.count(Value.id)))
@@ -79,11 +144,85 @@ async def lifespan(app: FastAPI):
             logger.error("Failed to initialize ontology", error=str(e))
         finally:
             break
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan manager."""
+    global task_engine, health_prober
+    
+    # Startup
+    logger.info("Starting ELCA Blockbusters application")
+    
+    await initialize_services()
+    
+    # Probe AI providers in the background; health endpoints serve the cached result
+    health_prober = ProviderHealthProber(ai_provider)
+    health_prober.start()
+    
+    # Watch for event-loop stalls and record what blocked the loop
+    loop_lag_monitor.start()
+    
+    # Export this worker's metrics for /metrics to aggregate
+    REGISTRY.register_collector(collect_runtime_metrics)
+    REGISTRY.start_export()
+    
+    # Start background task execution
+    recovery_task = None
+    if TASK_EXECUTOR == "local":
+        task_engine = TaskExecutionEngine(execute_task)
+        task_engine.start()
+        recovery_task = asyncio.create_task(recover_orphaned_tasks())
     
     yield
     
     # Shutdown
     logger.info("Shutting down ELCA Blockbusters application")
+    if recovery_task:
+        recovery_task.cancel()
+    if task_engine:
+        await task_engine.stop()
+    await health_prober.stop()
+    await loop_lag_monitor.stop()
+    await REGISTRY.stop_export()
+    await close_ai_provider_manager()
+    await write_queue.close()
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+def collect_runtime_metrics():
+    """Refresh queue-depth and database pool gauges before a metrics snapshot."""
+    if task_engine:
+        stats = task_engine.get_stats()
+        TASK_QUEUE_DEPTH.set(stats["queued"])
+        TASKS_RUNNING.set(stats["running"])
+    DB_WRITE_QUEUE_DEPTH.set(write_queue.depth())
+    pool = engine.pool
+    if hasattr(pool, "checkedout"):
+        DB_CONNECTIONS_CHECKED_OUT.set(pool.checkedout())
+        DB_POOL_SIZE.set(pool.size())
+
+async def recover_orphaned_tasks():
+    """Requeue tasks lost by a restart (pending, or in progress with an expired lease)."""
+    while True:
+        try:
+            async with async_session_maker() as db:
+                await fail_exhausted_tasks(db)
+                task_ids = await find_claimable_task_ids(
+                    db,
+                    limit=task_engine.concurrency,
+                    min_age_seconds=TASK_RECOVERY_INTERVAL_SECONDS
+                )
+            for task_id in task_ids:
+                task_engine.submit(task_id)
+            if task_ids:
+                logger.info("Requeued orphaned tasks", count=len(task_ids))
+        except asyncio.QueueFull:
+            logger.warning("Task queue full during orphan recovery")
+        except Exception as e:
+            logger.error("Orphaned task recovery failed", error=str(e))
+        
+        await asyncio.sleep(TASK_RECOVERY_INTERVAL_SECONDS)
 
 async def register_agents(db: AsyncSession):
     """Register the 3 ELCA agents."""
@@ -157,8 +296,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+def is_slow_by_design(scope) -> bool:
+    """Long-polls (?wait=) and admin endpoints (the profiler runs for the requested time)."""
+    path = scope.get("path", "")
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return path.startswith("/admin/") or (path.startswith("/api/tasks/") and "wait" in query)
+
+# Records where requests slower than SLOW_REQUEST_SECONDS were waiting
+app.add_middleware(SlowRequestMiddleware, exclude=is_slow_by_design)
+
+def require_admin(authorization: str = Header(""), x_admin_token: str = Header("")):
+    """Allow only callers presenting ADMIN_TOKEN (Bearer or X-Admin-Token); 404 when unset."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    presented = x_admin_token or authorization.removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(presented.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
 # Health check endpoints
 @app.get("/health")
 async def health_check():
@@ -169,13 +326,12 @@ async def health_check():
 async def readiness_check():
     """Readiness check endpoint."""
     try:
-        # Check AI provider health
-        if ai_provider:
-            health_status = await ai_provider.health_check()
+        # Cached AI provider health from the background prober
+        if health_prober:
             return {
                 "status": "ready", 
                 "service": "elca-blockbusters",
-                "ai_providers": health_status
+                "ai_providers": health_prober.get_summary()
             }
         return {"status": "ready", "service": "elca-blockbusters"}
     except Exception as e:
@@ -184,7 +340,7 @@ async def readiness_check():
 
 # Agent endpoints
 @app.get("/api/agents", response_model=List[AgentResponse])
-async def get_agents(db: AsyncSession = Depends(get_db)):
+async def get_agents(db: AsyncSession = Depends(get_read_db)):
     """Get all registered agents."""
     try:
         result = await db.execute(select(Agent).order_by(Agent.created_at))
@@ -195,7 +351,7 @@ async def get_agents(db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to retrieve agents")
 
 @app.get("/api/agents/{agent_id}", response_model=AgentResponse)
-async def get_agent(agent_id: str, db: AsyncSession = Depends(get_db)):
+async def get_agent(agent_id: str, db: AsyncSession = Depends(get_read_db)):
     """Get a specific agent."""
     try:
         result = await db.execute(select(Agent).where(Agent.id == agent_id))
@@ -211,29 +367,67 @@ async def get_agent(agent_id: str, db: AsyncSession = Depends(get_db)):
 
 # Task endpoints
 @app.post("/api/tasks", response_model=TaskResponse)
-async def create_task(task_data: TaskCreate, db: AsyncSession = Depends(get_db)):
-    """Create a new task."""
+async def create_task(
+    task_data: TaskCreate,
+    response: Response,
+    background: bool = False,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    """Create a new task.
+    
+    With ?background=true the task is queued and 202 is returned immediately.
+    With ?stream=true the task is held for GET /api/tasks/{task_id}/stream, which runs it
+    and streams tokens as they are generated.
+    """
     try:
-        # Verify agent exists
-        result = await db.execute(select(Agent).where(Agent.id == task_data.agent_id))
-        agent = result.scalar_one_or_none()
+        # Verify agent exists in the registry snapshot
+        agent = await ELCAOntologyManager(db, ai_provider).get_agent(task_data.agent_id)
         if not agent:
             raise HTTPException(status_code=404, detail="Agent not found")
         
         # Create task
-        task = Task(
+        task_id = str(uuid.uuid4())
+        await execute_write(db, insert(Task).values(
+            id=task_id,
             user_id=task_data.user_id,
             agent_id=task_data.agent_id,
             input_data=task_data.input_data,
-            status="pending"
-        )
+            status="pending",
+            title=task_title(task_data.input_data)
+        ))
+        task = await db.get(Task, task_id)
         
-        db.add(task)
-        await db.commit()
-        await db.refresh(task)
+        if stream:
+            # Keep executors away until the streaming client connects
+            await reserve_task(db, task.id, STREAM_RESERVATION_SECONDS)
+            response.status_code = status.HTTP_202_ACCEPTED
+            response.headers["Location"] = f"/api/tasks/{task.id}/stream"
+            return task
         
-        # Process task asynchronously (for demo, we'll process immediately)
-        await process_task(task, agent, db)
+        if background:
+            # Hand off to the execution engine (or the worker fleet) and return at once
+            try:
+                if task_engine:
+                    task_engine.submit(task.id)
+            except asyncio.QueueFull:
+                await update_task(db, task, status="failed", error_message="Task queue is full")
+                logger.warning("Task queue full, rejecting task", task_id=task.id)
+                raise HTTPException(status_code=503, detail="Task queue is full, retry later")
+            
+            response.status_code = status.HTTP_202_ACCEPTED
+            response.headers["Location"] = f"/api/tasks/{task.id}"
+            logger.info("Task queued for background processing", task_id=task.id, agent_type=agent.agent_type)
+            return task
+        
+        # Synchronous mode: process before responding
+        if await claim_task(db, task.id, process_owner_id):
+            await db.refresh(task)
+            try:
+                await run_with_lease(task.id, process_owner_id, process_task(task, agent, db))
+            except LeaseLost:
+                # Another executor took the task over; the client polls it for the result
+                pass
         
         return task
         
@@ -243,102 +437,206 @@ async def create_task(task_data: TaskCreate, db: AsyncSession = Depends(get_db))
         logger.error("Failed to create task", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to create task")
 
-async def process_task(task: Task, agent: Agent, db: AsyncSession):
-    """Process a task with the appropriate agent."""
+async def execute_task(task_id: str, owner: str = process_owner_id):
+    """Claim a queued task and process it."""
+    async with async_session_maker() as db:
+        with TASK_STAGE_SECONDS.time(stage="claim", agent_type=""):
+            claimed = await claim_task(db, task_id, owner)
+        if not claimed:
+            logger.info("Task already claimed or finished, skipping", task_id=task_id)
+            return
+    
+    await execute_task_claimed(task_id, owner)
+
+async def execute_task_claimed(task_id: str, owner: str, events: Optional[TaskEventSink] = None):
+    """Process a task whose lease is held by `owner`, renewing the lease while it runs."""
+    async with async_session_maker() as db:
+        result = await db.execute(select(Task).where(Task.id == task_id))
+        task = result.scalar_one_or_none()
+        if not task:
+            return
+        
+        agent = await ELCAOntologyManager(db, ai_provider).get_agent(task.agent_id)
+        if not agent:
+            await update_task(
+                db, task, status="failed", error_message="Agent not found", lease_owner=None, lease_expires_at=None
+            )
+            return
+        
+        await run_with_lease(task_id, owner, process_task(task, agent, db, events))
+
+async def process_task(
+    task: Task,
+    agent: AgentRecord,
+    db: AsyncSession,
+    events: Optional[TaskEventSink] = None
+):
+    """Process a task with the appropriate agent. With `events`, tokens are streamed to it."""
+    stages = StageTimer(TASK_STAGE_SECONDS, agent_type=agent.agent_type)
     try:
-        # Update task status
-        task.status = "in_progress"
-        await db.commit()
+        # Claiming already marked the task in progress; only write if it was not claimed
+        if task.status != TaskStatus.IN_PROGRESS:
+            await update_task(db, task, status=TaskStatus.IN_PROGRESS)
+        stages.mark("start_commit")
         
         # Get ontology manager
-        ontology_manager = ELCAOntologyManager(db)
+        ontology_manager = ELCAOntologyManager(db, ai_provider)
+        
+        # Attribute AI usage and budgets for this task to its tenant
+        current_tenant.set(ontology_manager.tenant_id)
         
         # Get relevant ELCA values and beliefs
         values, beliefs = await ontology_manager.get_relevant_values_and_beliefs(
             str(task.input_data), 
             agent.agent_type
         )
+        stages.mark("ontology_lookup")
         
-        # Process based on agent type
-        if agent.agent_type == "pastoral_care":
-            result = await process_pastoral_task(task, values, beliefs)
-        elif agent.agent_type == "youth_engagement":
-            result = await process_youth_task(task, values, beliefs)
-        elif agent.agent_type == "mission_coordination":
-            result = await process_mission_task(task, values, beliefs)
+        # Build the prompt based on agent type
+        task_prompt = build_task_prompt(task, agent, values, beliefs)
+        stages.mark("prompt_build")
+        
+        # Long outputs can be validated section by section while they are generated
+        pipeline = None
+        if VALIDATION_PIPELINE_ENABLED and task_prompt.max_tokens >= VALIDATION_PIPELINE_MIN_TOKENS:
+            pipeline = PipelinedValidator(ontology_manager, agent.agent_type, await ontology_manager.get_snapshot())
+        
+        if events or pipeline:
+            chunks = []
+            try:
+                async for chunk in ai_provider.generate_text_stream(
+                    task_prompt.prompt,
+                    task_prompt.use_case,
+                    max_tokens=task_prompt.max_tokens
+                ):
+                    chunks.append(chunk)
+                    if pipeline:
+                        pipeline.feed(chunk)
+                    if events:
+                        await events("token", {"text": chunk})
+            except BaseException:
+                if pipeline:
+                    pipeline.cancel()
+                raise
+            result = "".join(chunks)
+            if events:
+                await events("status", {"status": "validating"})
         else:
-            raise ValueError(f"Unknown agent type: {agent.agent_type}")
+            result = await ai_provider.generate_text(
+                task_prompt.prompt,
+                task_prompt.use_case,
+                max_tokens=task_prompt.max_tokens,
+                semantic_key=task_prompt.semantic_key,
+                semantic_scope=task_prompt.semantic_scope
+            )
+        stages.mark("generation")
         
         # Validate content against ELCA guidelines
-        validation = await ontology_manager.validate_ai_content(
-            str(result), 
-            agent.agent_type
-        )
+        if pipeline:
+            validation = await pipeline.finish()
+        else:
+            validation = await ontology_manager.validate_ai_content(
+                str(result), 
+                agent.agent_type
+            )
+        stages.mark("validation")
         
         # Update task with results
-        task.output_data = {
-            "result": result,
-            "elca_validation": validation,
-            "values_considered": [{"name": v.name, "description": v.description} for v in values],
-            "beliefs_considered": [{"name": b.name, "description": b.description} for b in beliefs]
-        }
-        task.status = "completed"
-        
-        await db.commit()
+        await update_task(
+            db,
+            task,
+            output_data={
+                "result": result,
+                "elca_validation": validation,
+                "values_considered": [{"name": v.name, "description": v.description} for v in values],
+                "beliefs_considered": [{"name": b.name, "description": b.description} for b in beliefs]
+            },
+            status="completed",
+            preview=task_preview(result),
+            completed_at=datetime.utcnow(),
+            lease_owner=None,
+            lease_expires_at=None
+        )
+        stages.mark("result_commit")
+        TASK_SECONDS.observe(stages.elapsed(), agent_type=agent.agent_type, status="completed")
         
         logger.info("Task processed successfully", task_id=task.id, agent_type=agent.agent_type)
         
     except Exception as e:
-        task.status = "failed"
-        task.error_message = str(e)
-        await db.commit()
+        await update_task(
+            db,
+            task,
+            status="failed",
+            error_message=str(e),
+            completed_at=datetime.utcnow(),
+            lease_owner=None,
+            lease_expires_at=None
+        )
+        stages.mark("failure_commit")
+        TASK_SECONDS.observe(stages.elapsed(), agent_type=agent.agent_type, status="failed")
         logger.error("Task processing failed", task_id=task.id, error=str(e))
 
-async def process_pastoral_task(task: Task, values: List[Value], beliefs: List[Belief]) -> str:
-    """Process pastoral care tasks."""
+def build_task_prompt(
+    task: Task,
+    agent: AgentRecord,
+    values: List[ValueRecord],
+    beliefs: List[BeliefRecord]
+) -> TaskPrompt:
+    """Build the generation prompt for a task based on agent type."""
+    if agent.agent_type == "pastoral_care":
+        return build_pastoral_prompt(task, values, beliefs)
+    elif agent.agent_type == "youth_engagement":
+        return build_youth_prompt(task, values, beliefs)
+    elif agent.agent_type == "mission_coordination":
+        return build_mission_prompt(task, values, beliefs)
+    else:
+        raise ValueError(f"Unknown agent type: {agent.agent_type}")
+
+def build_pastoral_prompt(task: Task, values: List[ValueRecord], beliefs: List[BeliefRecord]) -> TaskPrompt:
+    """Build the prompt for pastoral care tasks."""
     input_data = task.input_data
     task_type = input_data.get("type", "general")
     
     if task_type == "sermon":
-        return await generate_sermon(input_data, values, beliefs)
+        return build_sermon_prompt(input_data, values, beliefs)
     elif task_type == "devotional":
-        return await generate_devotional(input_data, values, beliefs)
+        return build_devotional_prompt(input_data, values, beliefs)
     elif task_type == "scripture_study":
-        return await generate_scripture_study(input_data, values, beliefs)
+        return build_scripture_study_prompt(input_data, values, beliefs)
     else:
-        return await generate_pastoral_response(input_data, values, beliefs)
+        return build_pastoral_response_prompt(input_data, values, beliefs)
 
-async def process_youth_task(task: Task, values: List[Value], beliefs: List[Belief]) -> str:
-    """Process youth engagement tasks."""
+def build_youth_prompt(task: Task, values: List[ValueRecord], beliefs: List[BeliefRecord]) -> TaskPrompt:
+    """Build the prompt for youth engagement tasks."""
     input_data = task.input_data
     task_type = input_data.get("type", "general")
     
     if task_type == "social_media":
-        return await generate_social_content(input_data, values, beliefs)
+        return build_social_content_prompt(input_data, values, beliefs)
     elif task_type == "youth_journey":
-        return await generate_youth_journey(input_data, values, beliefs)
+        return build_youth_journey_prompt(input_data, values, beliefs)
     elif task_type == "event_planning":
-        return await generate_event_plan(input_data, values, beliefs)
+        return build_event_plan_prompt(input_data, values, beliefs)
     else:
-        return await generate_youth_response(input_data, values, beliefs)
+        return build_youth_response_prompt(input_data, values, beliefs)
 
-async def process_mission_task(task: Task, values: List[Value], beliefs: List[Belief]) -> str:
-    """Process mission coordination tasks."""
+def build_mission_prompt(task: Task, values: List[ValueRecord], beliefs: List[BeliefRecord]) -> TaskPrompt:
+    """Build the prompt for mission coordination tasks."""
     input_data = task.input_data
     task_type = input_data.get("type", "general")
     
     if task_type == "volunteer_deployment":
-        return await generate_volunteer_plan(input_data, values, beliefs)
+        return build_volunteer_plan_prompt(input_data, values, beliefs)
     elif task_type == "mission_opportunity":
-        return await generate_mission_opportunity(input_data, values, beliefs)
+        return build_mission_opportunity_prompt(input_data, values, beliefs)
     elif task_type == "resource_allocation":
-        return await generate_resource_plan(input_data, values, beliefs)
+        return build_resource_plan_prompt(input_data, values, beliefs)
     else:
-        return await generate_mission_response(input_data, values, beliefs)
+        return build_mission_response_prompt(input_data, values, beliefs)
 
-# Pastoral agent functions
-async def generate_sermon(input_data: Dict[str, Any], values: List[Value], beliefs: List[Belief]) -> str:
-    """Generate ELCA-compliant sermon."""
+# Pastoral agent prompts
+def build_sermon_prompt(input_data: Dict[str, Any], values: List[ValueRecord], beliefs: List[BeliefRecord]) -> TaskPrompt:
+    """Prompt for ELCA-compliant sermon."""
     topic = input_data.get("topic", "God's Grace")
     scripture = input_data.get("scripture", "")
     length = input_data.get("length", "short")
@@ -363,10 +661,10 @@ async def generate_sermon(input_data: Dict[str, Any], values: List[Value], belie
     Structure: Opening, Scripture Context, Main Message, Application, Closing Prayer
     """
     
-    return await ai_provider.generate_text(prompt, "sermon_generation", max_tokens=1500)
+    return TaskPrompt(prompt, "sermon_generation", 1500, semantic_key=topic, semantic_scope=f"sermon:{length}:{scripture}")
 
-async def generate_devotional(input_data: Dict[str, Any], values: List[Value], beliefs: List[Belief]) -> str:
-    """Generate ELCA-compliant devotional."""
+def build_devotional_prompt(input_data: Dict[str, Any], values: List[ValueRecord], beliefs: List[BeliefRecord]) -> TaskPrompt:
+    """Prompt for ELCA-compliant devotional."""
     theme = input_data.get("theme", "Daily Grace")
     scripture = input_data.get("scripture", "")
     
@@ -386,10 +684,10 @@ async def generate_devotional(input_data: Dict[str, Any], values: List[Value], b
     - Encouraging and grace-centered tone
     """
     
-    return await ai_provider.generate_text(prompt, "pastoral_care", max_tokens=800)
+    return TaskPrompt(prompt, "pastoral_care", 800, semantic_key=theme, semantic_scope=f"devotional:{scripture}")
 
-async def generate_scripture_study(input_data: Dict[str, Any], values: List[Value], beliefs: List[Belief]) -> str:
-    """Generate ELCA-compliant scripture study."""
+def build_scripture_study_prompt(input_data: Dict[str, Any], values: List[ValueRecord], beliefs: List[BeliefRecord]) -> TaskPrompt:
+    """Prompt for ELCA-compliant scripture study."""
     passage = input_data.get("passage", "")
     focus = input_data.get("focus", "general study")
     
@@ -405,10 +703,10 @@ async def generate_scripture_study(input_data: Dict[str, Any], values: List[Valu
     - Inclusive interpretation
     """
     
-    return await ai_provider.generate_text(prompt, "pastoral_care", max_tokens=1200)
+    return TaskPrompt(prompt, "pastoral_care", 1200, semantic_key=focus, semantic_scope=f"scripture_study:{passage}")
 
-async def generate_pastoral_response(input_data: Dict[str, Any], values: List[Value], beliefs: List[Belief]) -> str:
-    """Generate general pastoral response."""
+def build_pastoral_response_prompt(input_data: Dict[str, Any], values: List[ValueRecord], beliefs: List[BeliefRecord]) -> TaskPrompt:
+    """Prompt for general pastoral response."""
     query = input_data.get("query", "")
     
     prompt = f"""
@@ -418,11 +716,11 @@ async def generate_pastoral_response(input_data: Dict[str, Any], values: List[Va
     Encourage professional pastoral care when appropriate.
     """
     
-    return await ai_provider.generate_text(prompt, "pastoral_care", max_tokens=600)
+    return TaskPrompt(prompt, "pastoral_care", 600, semantic_key=query, semantic_scope="pastoral_response")
 
-# Youth engagement functions
-async def generate_social_content(input_data: Dict[str, Any], values: List[Value], beliefs: List[Belief]) -> str:
-    """Generate Gen-Z social media content."""
+# Youth engagement prompts
+def build_social_content_prompt(input_data: Dict[str, Any], values: List[ValueRecord], beliefs: List[BeliefRecord]) -> TaskPrompt:
+    """Prompt for Gen-Z social media content."""
     platform = input_data.get("platform", "instagram")
     topic = input_data.get("topic", "faith")
     
@@ -437,10 +735,10 @@ async def generate_social_content(input_data: Dict[str, Any], values: List[Value
     - ELCA values of radical hospitality
     """
     
-    return await ai_provider.generate_text(prompt, "youth_engagement", max_tokens=400)
+    return TaskPrompt(prompt, "youth_engagement", 400, semantic_key=topic, semantic_scope=f"social_content:{platform}")
 
-async def generate_youth_journey(input_data: Dict[str, Any], values: List[Value], beliefs: List[Belief]) -> str:
-    """Generate youth spiritual journey plan."""
+def build_youth_journey_prompt(input_data: Dict[str, Any], values: List[ValueRecord], beliefs: List[BeliefRecord]) -> TaskPrompt:
+    """Prompt for youth spiritual journey plan."""
     age_group = input_data.get("age_group", "teens")
     theme = input_data.get("theme", "identity")
     
@@ -455,10 +753,10 @@ async def generate_youth_journey(input_data: Dict[str, Any], values: List[Value]
     - ELCA values integration
     """
     
-    return await ai_provider.generate_text(prompt, "youth_engagement", max_tokens=1000)
+    return TaskPrompt(prompt, "youth_engagement", 1000, semantic_key=theme, semantic_scope=f"youth_journey:{age_group}")
 
-async def generate_event_plan(input_data: Dict[str, Any], values: List[Value], beliefs: List[Belief]) -> str:
-    """Generate youth event plan."""
+def build_event_plan_prompt(input_data: Dict[str, Any], values: List[ValueRecord], beliefs: List[BeliefRecord]) -> TaskPrompt:
+    """Prompt for youth event plan."""
     event_type = input_data.get("event_type", "gathering")
     theme = input_data.get("theme", "community")
     
@@ -473,10 +771,10 @@ async def generate_event_plan(input_data: Dict[str, Any], values: List[Value], b
     - Safety protocols
     """
     
-    return await ai_provider.generate_text(prompt, "youth_engagement", max_tokens=800)
+    return TaskPrompt(prompt, "youth_engagement", 800, semantic_key=theme, semantic_scope=f"event_plan:{event_type}")
 
-async def generate_youth_response(input_data: Dict[str, Any], values: List[Value], beliefs: List[Belief]) -> str:
-    """Generate general youth ministry response."""
+def build_youth_response_prompt(input_data: Dict[str, Any], values: List[ValueRecord], beliefs: List[BeliefRecord]) -> TaskPrompt:
+    """Prompt for general youth ministry response."""
     query = input_data.get("query", "")
     
     prompt = f"""
@@ -485,11 +783,11 @@ async def generate_youth_response(input_data: Dict[str, Any], values: List[Value
     Use authentic, age-appropriate language while maintaining ELCA values.
     """
     
-    return await ai_provider.generate_text(prompt, "youth_engagement", max_tokens=500)
+    return TaskPrompt(prompt, "youth_engagement", 500, semantic_key=query, semantic_scope="youth_response")
 
-# Mission coordination functions
-async def generate_volunteer_plan(input_data: Dict[str, Any], values: List[Value], beliefs: List[Belief]) -> str:
-    """Generate volunteer deployment plan."""
+# Mission coordination prompts
+def build_volunteer_plan_prompt(input_data: Dict[str, Any], values: List[ValueRecord], beliefs: List[BeliefRecord]) -> TaskPrompt:
+    """Prompt for volunteer deployment plan."""
     mission = input_data.get("mission", "community service")
     volunteers = input_data.get("volunteer_count", 10)
     
@@ -505,10 +803,10 @@ async def generate_volunteer_plan(input_data: Dict[str, Any], values: List[Value
     - Accessibility accommodations
     """
     
-    return await ai_provider.generate_text(prompt, "mission_coordination", max_tokens=1000)
+    return TaskPrompt(prompt, "mission_coordination", 1000, semantic_key=mission, semantic_scope=f"volunteer_plan:{volunteers}")
 
-async def generate_mission_opportunity(input_data: Dict[str, Any], values: List[Value], beliefs: List[Belief]) -> str:
-    """Generate mission opportunity."""
+def build_mission_opportunity_prompt(input_data: Dict[str, Any], values: List[ValueRecord], beliefs: List[BeliefRecord]) -> TaskPrompt:
+    """Prompt for mission opportunity."""
     focus_area = input_data.get("focus_area", "local community")
     duration = input_data.get("duration", "ongoing")
     
@@ -523,10 +821,10 @@ async def generate_mission_opportunity(input_data: Dict[str, Any], values: List[
     - Sustainable impact
     """
     
-    return await ai_provider.generate_text(prompt, "mission_coordination", max_tokens=800)
+    return TaskPrompt(prompt, "mission_coordination", 800, semantic_key=focus_area, semantic_scope=f"mission_opportunity:{duration}")
 
-async def generate_resource_plan(input_data: Dict[str, Any], values: List[Value], beliefs: List[Belief]) -> str:
-    """Generate resource allocation plan."""
+def build_resource_plan_prompt(input_data: Dict[str, Any], values: List[ValueRecord], beliefs: List[BeliefRecord]) -> TaskPrompt:
+    """Prompt for resource allocation plan."""
     project = input_data.get("project", "community outreach")
     budget = input_data.get("budget", "limited")
     
@@ -542,10 +840,10 @@ async def generate_resource_plan(input_data: Dict[str, Any], values: List[Value]
     - ELCA ethical procurement
     """
     
-    return await ai_provider.generate_text(prompt, "mission_coordination", max_tokens=800)
+    return TaskPrompt(prompt, "mission_coordination", 800, semantic_key=project, semantic_scope=f"resource_plan:{budget}")
 
-async def generate_mission_response(input_data: Dict[str, Any], values: List[Value], beliefs: List[Belief]) -> str:
-    """Generate general mission response."""
+def build_mission_response_prompt(input_data: Dict[str, Any], values: List[ValueRecord], beliefs: List[BeliefRecord]) -> TaskPrompt:
+    """Prompt for general mission response."""
     query = input_data.get("query", "")
     
     prompt = f"""
@@ -554,30 +852,202 @@ async def generate_mission_response(input_data: Dict[str, Any], values: List[Val
     Focus on ELCA values of justice, stewardship, and community partnership.
     """
     
-    return await ai_provider.generate_text(prompt, "mission_coordination", max_tokens=600)
+    return TaskPrompt(prompt, "mission_coordination", 600, semantic_key=query, semantic_scope="mission_response")
+
+# Task listing endpoints
+def task_filters(
+    agent_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    task_status: Optional[TaskStatus] = Query(None, alias="status"),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None
+) -> TaskFilters:
+    """Listing filters from query parameters."""
+    return TaskFilters(
+        agent_id=agent_id,
+        user_id=user_id,
+        status=task_status.value if task_status else None,
+        created_after=created_after,
+        created_before=created_before
+    )
 
-# Recent tasks endpoint
-@app.get("/api/tasks/recent", response_model=List[TaskResponse])
-async def get_recent_tasks(limit: int = 10, db: AsyncSession = Depends(get_db)):
-    """Get recent tasks."""
+async def fetch_task_page(
+    db: AsyncSession,
+    filters: TaskFilters,
+    limit: int,
+    cursor: Optional[str],
+    fields: Optional[str]
+):
+    """Rows are serialized as they come from the query; per-row model validation is skipped."""
     try:
-        result = await db.execute(
-            select(Task)
-            .order_by(Task.created_at.desc())
-            .limit(limit)
-        )
-        tasks = result.scalars().all()
-        return tasks
+        return await list_tasks(db, filters, limit, cursor, parse_fields(fields))
+    except (InvalidCursor, InvalidFields) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error("Failed to get recent tasks", error=str(e))
+        logger.error("Failed to list tasks", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to retrieve tasks")
 
+# Listings return only the ?fields= selection, so they are documented rather than validated
+@app.get("/api/tasks", response_class=ORJSONResponse, responses={200: {"model": TaskListResponse}})
+async def get_tasks(
+    limit: int = Query(20, ge=1, le=MAX_TASK_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    filters: TaskFilters = Depends(task_filters),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """List tasks newest first, filtered by agent, user, status and creation time.
+    
+    ?fields=summary (or a comma-separated list of fields) returns only those fields.
+    """
+    tasks, next_cursor = await fetch_task_page(db, filters, limit, cursor, fields)
+    return ORJSONResponse({"items": tasks, "next_cursor": next_cursor})
+
+@app.get(
+    "/api/tasks/recent",
+    response_class=ORJSONResponse,
+    responses={200: {
+        "model": List[TaskListItem],
+        "headers": {"X-Next-Cursor": {
+            "description": "Cursor for the next page (pass as ?cursor=); absent on the last page",
+            "schema": {"type": "string"}
+        }}
+    }}
+)
+async def get_recent_tasks(
+    limit: int = Query(10, ge=1, le=MAX_TASK_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    filters: TaskFilters = Depends(task_filters),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get recent tasks. The next page's cursor is returned in the X-Next-Cursor header."""
+    tasks, next_cursor = await fetch_task_page(db, filters, limit, cursor, fields)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return ORJSONResponse(tasks, headers=headers)
+
+@app.get("/api/tasks/{task_id}", response_model=TaskResponse)
+async def get_task(
+    task_id: str,
+    wait: float = Query(0, ge=0, le=MAX_TASK_WAIT_SECONDS),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a task. With ?wait=N, long-poll up to N seconds for the task to finish."""
+    try:
+        deadline = time.monotonic() + wait
+        while True:
+            result = await db.execute(
+                select(Task).where(Task.id == task_id).execution_options(populate_existing=True)
+            )
+            task = result.scalar_one_or_none()
+            if not task:
+                raise HTTPException(status_code=404, detail="Task not found")
+            
+            remaining = deadline - time.monotonic()
+            if task.status not in (TaskStatus.PENDING, TaskStatus.IN_PROGRESS) or remaining <= 0:
+                return task
+            
+            # End the read transaction so the next poll sees fresh data
+            await db.commit()
+            
+            # Tasks running in this process signal completion directly; tasks
+            # executed by another worker process are picked up by polling.
+            if task_engine:
+                await task_engine.wait_for(task_id, min(remaining, TASK_POLL_INTERVAL_SECONDS))
+            else:
+                await asyncio.sleep(min(remaining, TASK_POLL_INTERVAL_SECONDS))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to get task", error=str(e), task_id=task_id)
+        raise HTTPException(status_code=500, detail="Failed to retrieve task")
+
+@app.get("/api/tasks/{task_id}/stream")
+async def stream_task(task_id: str, db: AsyncSession = Depends(get_db)):
+    """Stream a task as Server-Sent Events.
+    
+    If the task is still pending this request runs it and forwards generated tokens
+    ("token" events) as they arrive; otherwise it reports status changes. A final
+    "done" event carries the persisted task. The task keeps running and is saved
+    even if the client disconnects.
+    """
+    result = await db.execute(select(Task.id).where(Task.id == task_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    events: asyncio.Queue = asyncio.Queue()
+    
+    async def publish(event: str, data: Dict[str, Any]):
+        events.put_nowait((event, data))
+    
+    runner = None
+    if await claim_task(db, task_id, process_owner_id, include_reserved=True):
+        runner = asyncio.create_task(execute_task_claimed(task_id, process_owner_id, publish))
+        background_tasks.add(runner)
+        runner.add_done_callback(background_tasks.discard)
+    
+    return StreamingResponse(
+        task_event_stream(task_id, events, runner),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def task_event_stream(
+    task_id: str,
+    events: asyncio.Queue,
+    runner: Optional[asyncio.Task]
+) -> AsyncIterator[str]:
+    """Yield SSE frames until the task finishes."""
+    if runner:
+        yield format_sse("status", {"status": TaskStatus.IN_PROGRESS.value})
+        while True:
+            if runner.done():
+                while not events.empty():
+                    yield format_sse(*events.get_nowait())
+                break
+            
+            next_event = asyncio.ensure_future(events.get())
+            done, _ = await asyncio.wait(
+                {next_event, runner},
+                timeout=SSE_KEEPALIVE_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if next_event in done:
+                yield format_sse(*next_event.result())
+                continue
+            
+            next_event.cancel()
+            if not done:
+                yield ": keep-alive\n\n"
+    else:
+        # Running elsewhere (or already finished): report status changes only
+        last_status = None
+        while True:
+            async with async_session_maker() as db:
+                result = await db.execute(select(Task.status).where(Task.id == task_id))
+                current_status = result.scalar_one_or_none()
+            if current_status != last_status:
+                yield format_sse("status", {"status": current_status})
+                last_status = current_status
+            if current_status not in (TaskStatus.PENDING, TaskStatus.IN_PROGRESS):
+                break
+            await asyncio.sleep(TASK_POLL_INTERVAL_SECONDS)
+    
+    async with async_session_maker() as db:
+        result = await db.execute(select(Task).where(Task.id == task_id))
+        task = result.scalar_one()
+        yield format_sse("done", TaskResponse.model_validate(task).model_dump(mode="json"))
+
 # Ontology endpoints
 @app.get("/api/ontology/values", response_model=List[ValueResponse])
-async def get_values(db: AsyncSession = Depends(get_db)):
+async def get_values(db: AsyncSession = Depends(get_read_db)):
     """Get ELCA values."""
     try:
-        ontology_manager = ELCAOntologyManager(db)
+        ontology_manager = ELCAOntologyManager(db, ai_provider)
         values = await ontology_manager.get_values()
         return values
     except Exception as e:
@@ -585,10 +1055,10 @@ async def get_values(db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to retrieve values")
 
 @app.get("/api/ontology/beliefs", response_model=List[BeliefResponse])
-async def get_beliefs(db: AsyncSession = Depends(get_db)):
+async def get_beliefs(db: AsyncSession = Depends(get_read_db)):
     """Get ELCA beliefs."""
     try:
-        ontology_manager = ELCAOntologyManager(db)
+        ontology_manager = ELCAOntologyManager(db, ai_provider)
         beliefs = await ontology_manager.get_beliefs()
         return beliefs
     except Exception as e:
@@ -596,7 +1066,7 @@ async def get_beliefs(db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to retrieve beliefs")
 
 @app.get("/api/ontology/summary")
-async def get_ontology_summary(db: AsyncSession = Depends(get_db)):
+async def get_ontology_summary(db: AsyncSession = Depends(get_read_db)):
     """Get ontology summary."""
     try:
         values_result = await db.execute(select(func.count(Value.id)))
@@ -610,17 +1080,65 @@ async def get_ontology_summary(db: AsyncSession = Depends(get_db)):
         logger.error("Failed to get ontology summary", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to retrieve summary")
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text-format metrics, aggregated across all workers."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    return Response(await REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Admin diagnostics for a live worker
+@app.get("/admin/debug/profile", dependencies=[Depends(require_admin)])
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=PROFILER_MAX_SECONDS),
+    interval_ms: float = Query(PROFILER_DEFAULT_INTERVAL_MS, ge=1, le=1000),
+    all_threads: bool = False
+):
+    """Sample this worker's stacks and return collapsed stacks for flamegraph tools.
+    
+    By default only the event-loop thread is sampled; all_threads=true adds the
+    thread name as the root frame of every stack.
+    """
+    thread_id = None if all_threads else loop_lag_monitor.loop_thread_id
+    try:
+        result = await asyncio.to_thread(profiler.profile, seconds, interval_ms / 1000, thread_id)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return Response(
+        profiler.collapsed(result["stacks"]),
+        media_type="text/plain",
+        headers={"X-Profile-Samples": str(result["samples"]), "X-Profile-Pid": str(os.getpid())}
+    )
+
+@app.get("/admin/debug/tasks", dependencies=[Depends(require_admin)])
+async def get_asyncio_tasks():
+    """Every asyncio task in this worker and where it is suspended."""
+    tasks = dump_tasks()
+    return {"pid": os.getpid(), "count": len(tasks), "tasks": tasks}
+
+@app.get("/admin/debug/loop", dependencies=[Depends(require_admin)])
+async def get_loop_lag():
+    """Event-loop lag statistics and the stacks captured during recent stalls."""
+    return {"pid": os.getpid(), **loop_lag_monitor.get_stats()}
+
+@app.get("/admin/debug/slow-requests", dependencies=[Depends(require_admin)])
+async def get_slow_requests():
+    """Recent requests slower than SLOW_REQUEST_SECONDS with where they were waiting."""
+    return {"pid": os.getpid(), "requests": recent_slow_requests()}
+
 # AI provider status
 @app.get("/api/ai/status")
 async def get_ai_status():
     """Get AI provider status."""
     try:
-        if ai_provider:
-            health_status = await ai_provider.health_check()
+        if ai_provider and health_prober:
+            health_status = health_prober.get_status()
             usage_stats = ai_provider.get_usage_stats()
             return {
                 "providers": health_status,
                 "usage": usage_stats,
+                "circuit_breakers": ai_provider.get_circuit_status(),
                 "available_providers": ai_provider.get_available_providers()
             }
         return {"status": "AI provider not initialized"}
@@ -0,0 +1,26 @@
+"""
+ELCA Blockbusters database migrations.
+Creates missing tables and columns, builds indexes added since the tables were created
+(CONCURRENTLY on PostgreSQL, so the API keeps writing meanwhile) and backfills task
+titles and previews for rows written before those columns existed.
+Run once per deploy, from a single process: python -m migrate
+"""
+
+import asyncio
+import structlog
+
+from shared.models import async_session_maker, engine, init_db, create_indexes
+from shared.task_listing import backfill_task_summaries
+
+logger = structlog.get_logger()
+
+async def migrate():
+    await init_db()
+    created = await create_indexes()
+    async with async_session_maker() as db:
+        backfilled = await backfill_task_summaries(db)
+    logger.info("Database migrated", indexes_created=created, tasks_backfilled=backfilled)
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,178 @@
+"""
+Latency- and error-aware provider routing for ELCA Blockbusters.
+Keeps rolling (EWMA) latency, throughput and error rates per provider, model
+and use case, and routes each request to the cheapest provider expected to
+meet the use case's latency objective. Static preferences act as priors.
+"""
+
+import os
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+import structlog
+
+from shared.pricing import estimate_cost
+
+logger = structlog.get_logger()
+
+AI_ADAPTIVE_ROUTING_ENABLED = os.getenv("AI_ADAPTIVE_ROUTING_ENABLED", "true").lower() == "true"
+AI_ROUTING_EWMA_ALPHA = float(os.getenv("AI_ROUTING_EWMA_ALPHA", "0.2"))
+AI_ROUTING_MAX_ERROR_RATE = float(os.getenv("AI_ROUTING_MAX_ERROR_RATE", "0.25"))
+# Cost multiplier for the statically preferred provider; 1.0 routes on cost alone
+AI_ROUTING_PREFERENCE_DISCOUNT = float(os.getenv("AI_ROUTING_PREFERENCE_DISCOUNT", "0.02"))
+# Observations fade back to the prior with this time constant, so a recovered provider is retried
+AI_ROUTING_DECAY_SECONDS = float(os.getenv("AI_ROUTING_DECAY_SECONDS", "300"))
+
+DEFAULT_LATENCY_SLO_SECONDS = {
+    "pastoral_care": 30.0,
+    "sermon_generation": 60.0,
+    "youth_engagement": 20.0,
+    "mission_coordination": 30.0,
+    "general": 30.0,
+}
+
+def _load_latency_slos() -> Dict[str, float]:
+    """Per-use-case latency objectives, overridable via AI_ROUTING_SLO_SECONDS="use_case=seconds,..."."""
+    slos = dict(DEFAULT_LATENCY_SLO_SECONDS)
+    for entry in os.getenv("AI_ROUTING_SLO_SECONDS", "").split(","):
+        if "=" in entry:
+            use_case, seconds = entry.split("=", 1)
+            try:
+                slos[use_case.strip()] = float(seconds)
+            except ValueError:
+                logger.warning("Ignoring invalid AI_ROUTING_SLO_SECONDS entry", entry=entry)
+    return slos
+
+LATENCY_SLO_SECONDS = _load_latency_slos()
+
+@dataclass
+class RouteStats:
+    """Rolling performance of one (provider, model, use case) route."""
+    latency_seconds: Optional[float] = None
+    tokens_per_second: Optional[float] = None
+    error_rate: float = 0.0
+    samples: int = 0
+    updated_at: float = field(default_factory=time.monotonic)
+
+    def observe(self, alpha: float, seconds: float, output_tokens: Optional[int], failed: bool):
+        self.samples += 1
+        self.updated_at = time.monotonic()
+        self.error_rate += alpha * ((1.0 if failed else 0.0) - self.error_rate)
+        if failed:
+            return
+
+        self.latency_seconds = seconds if self.latency_seconds is None else (
+            self.latency_seconds + alpha * (seconds - self.latency_seconds)
+        )
+        if output_tokens and seconds > 0:
+            rate = output_tokens / seconds
+            self.tokens_per_second = rate if self.tokens_per_second is None else (
+                self.tokens_per_second + alpha * (rate - self.tokens_per_second)
+            )
+
+    def confidence(self, decay_seconds: float) -> float:
+        """Weight of the observations against the prior, fading with age."""
+        if not self.samples:
+            return 0.0
+        return math.exp(-(time.monotonic() - self.updated_at) / decay_seconds)
+
+class AdaptiveRouter:
+    """Chooses a provider per request from observed route performance."""
+
+    def __init__(
+        self,
+        enabled: bool = AI_ADAPTIVE_ROUTING_ENABLED,
+        alpha: float = AI_ROUTING_EWMA_ALPHA,
+        max_error_rate: float = AI_ROUTING_MAX_ERROR_RATE,
+        preference_discount: float = AI_ROUTING_PREFERENCE_DISCOUNT,
+        decay_seconds: float = AI_ROUTING_DECAY_SECONDS,
+        latency_slos: Mapping[str, float] = LATENCY_SLO_SECONDS
+    ):
+        self.enabled = enabled
+        self.alpha = alpha
+        self.max_error_rate = max_error_rate
+        self.preference_discount = preference_discount
+        self.decay_seconds = decay_seconds
+        self.latency_slos = dict(latency_slos)
+        self._routes: Dict[Tuple[str, str, str], RouteStats] = {}
+        self.decisions: Dict[str, int] = {}
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        use_case: str,
+        seconds: float,
+        output_tokens: Optional[int] = None,
+        failed: bool = False
+    ):
+        """Fold one call outcome into the route's rolling stats."""
+        route = self._routes.get((provider, model, use_case))
+        if route is None:
+            route = self._routes[(provider, model, use_case)] = RouteStats()
+        route.observe(self.alpha, seconds, output_tokens, failed)
+
+    def latency_slo(self, use_case: str) -> float:
+        return self.latency_slos.get(use_case, self.latency_slos["general"])
+
+    def select(
+        self,
+        use_case: str,
+        max_tokens: int,
+        candidates: Iterable[Tuple[str, str]],
+        preferred: str
+    ) -> Optional[str]:
+        """Pick a provider from (provider, model) candidates.
+
+        Routes expected to meet the latency objective with an acceptable error rate
+        are ranked by expected cost (the preferred provider's discounted); if none
+        qualify, the route with the lowest expected latency wins.
+        """
+        slo = self.latency_slo(use_case)
+        scored = []
+        for provider, model in candidates:
+            latency, error_rate = self._estimate(provider, model, use_case, slo)
+            # Failed calls are paid for in retries, so cost scales with 1 / success rate
+            cost = estimate_cost(model, 0, max_tokens) / max(0.05, 1.0 - error_rate)
+            if provider == preferred:
+                cost *= self.preference_discount
+            meets_objective = latency <= slo and error_rate <= self.max_error_rate
+            scored.append((not meets_objective, cost if meets_objective else latency, provider))
+
+        if not scored:
+            return None
+        choice = min(scored)[2]
+        self.decisions[choice] = self.decisions.get(choice, 0) + 1
+        if choice != preferred:
+            logger.info("Adaptive routing away from preferred provider", use_case=use_case, preferred=preferred, chosen=choice)
+        return choice
+
+    def _estimate(self, provider: str, model: str, use_case: str, slo: float) -> Tuple[float, float]:
+        """Expected latency and error rate, blending observations with the prior."""
+        route = self._routes.get((provider, model, use_case))
+        # Prior: every route is assumed to comfortably meet the objective
+        prior_latency, prior_error = slo * 0.5, 0.0
+        if route is None or not route.samples:
+            return prior_latency, prior_error
+
+        weight = route.confidence(self.decay_seconds)
+        observed_latency = route.latency_seconds if route.latency_seconds is not None else prior_latency
+        return (
+            prior_latency + weight * (observed_latency - prior_latency),
+            prior_error + weight * (route.error_rate - prior_error)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        routes: List[Dict[str, Any]] = []
+        for (provider, model, use_case), route in self._routes.items():
+            routes.append({
+                "provider": provider,
+                "model": model,
+                "use_case": use_case,
+                "latency_seconds": round(route.latency_seconds, 3) if route.latency_seconds is not None else None,
+                "tokens_per_second": round(route.tokens_per_second, 1) if route.tokens_per_second is not None else None,
+                "error_rate": round(route.error_rate, 3),
+                "samples": route.samples
+            })
+        return {"enabled": self.enabled, "decisions": dict(self.decisions), "routes": routes}
@@ -0,0 +1,100 @@
+"""
+Per-tenant and per-use-case AI spend budgets for ELCA Blockbusters.
+Near the limit requests are downgraded to cheaper models; at the limit they
+are rejected before the provider is called.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+import structlog
+
+from shared.usage_store import UsageStore
+
+logger = structlog.get_logger()
+
+# Monthly USD budgets: "tenant=500,tenant/use_case=100,*/use_case=50"
+AI_MONTHLY_BUDGETS_USD = os.getenv("AI_MONTHLY_BUDGETS_USD", "")
+# Share of a budget after which cheaper models are used
+AI_BUDGET_DOWNGRADE_AT = float(os.getenv("AI_BUDGET_DOWNGRADE_AT", "0.8"))
+
+# Cheaper model used for each model once a budget is nearly spent
+BUDGET_DOWNGRADE_MODELS = {
+    "claude-sonnet-4-5": "claude-haiku-4-5",
+    "gpt-4-turbo": "gpt-3.5-turbo",
+}
+
+class BudgetExceededError(RuntimeError):
+    """Raised instead of calling a provider when a budget is exhausted."""
+
+def parse_budgets(spec: str) -> Dict[Tuple[str, Optional[str]], float]:
+    """Parse budget entries into {(tenant or "*", use_case or None): usd}."""
+    budgets: Dict[Tuple[str, Optional[str]], float] = {}
+    for entry in spec.split(","):
+        if "=" not in entry:
+            continue
+        scope, amount = entry.split("=", 1)
+        tenant, _, use_case = scope.strip().partition("/")
+        try:
+            budgets[(tenant or "*", use_case or None)] = float(amount)
+        except ValueError:
+            logger.warning("Ignoring invalid AI_MONTHLY_BUDGETS_USD entry", entry=entry)
+    return budgets
+
+class BudgetPolicy:
+    """Checks spend from the shared usage store against configured budgets."""
+
+    def __init__(
+        self,
+        usage_store: UsageStore,
+        budgets: Optional[Dict[Tuple[str, Optional[str]], float]] = None,
+        downgrade_at: float = AI_BUDGET_DOWNGRADE_AT
+    ):
+        self.usage_store = usage_store
+        self.budgets = parse_budgets(AI_MONTHLY_BUDGETS_USD) if budgets is None else budgets
+        self.downgrade_at = downgrade_at
+        self.stats = {"downgraded": 0, "rejected": 0}
+
+    def _applicable(self, tenant: str, use_case: str) -> List[Tuple[str, float, float]]:
+        """(scope label, budget, spent) for every budget covering this tenant and use case."""
+        applicable = []
+        for (budget_tenant, budget_use_case), amount in self.budgets.items():
+            if budget_tenant not in ("*", tenant) or budget_use_case not in (None, use_case):
+                continue
+            spent = self.usage_store.spent(
+                tenant=None if budget_tenant == "*" else tenant,
+                use_case=budget_use_case
+            )
+            label = budget_tenant + (f"/{budget_use_case}" if budget_use_case else "")
+            applicable.append((label, amount, spent))
+        return applicable
+
+    def downgrade_model(self, tenant: str, use_case: str, model: str) -> str:
+        """The model to use, cheaper if any applicable budget is nearly spent."""
+        if not self.budgets or model not in BUDGET_DOWNGRADE_MODELS:
+            return model
+        for _, amount, spent in self._applicable(tenant, use_case):
+            if spent >= amount * self.downgrade_at:
+                self.stats["downgraded"] += 1
+                return BUDGET_DOWNGRADE_MODELS[model]
+        return model
+
+    def check(self, tenant: str, use_case: str, estimated_cost: float):
+        """Raise BudgetExceededError if this call would overrun an applicable budget."""
+        for label, amount, spent in self._applicable(tenant, use_case):
+            if spent + estimated_cost > amount:
+                self.stats["rejected"] += 1
+                logger.warning("AI budget exhausted", budget=label, limit_usd=amount, spent_usd=round(spent, 4))
+                raise BudgetExceededError(f"AI budget for {label} exhausted (${spent:.2f} of ${amount:.2f})")
+
+    def get_status(self) -> Dict[str, Any]:
+        budgets = []
+        for (tenant, use_case), amount in self.budgets.items():
+            spent = self.usage_store.spent(tenant=None if tenant == "*" else tenant, use_case=use_case)
+            budgets.append({
+                "tenant": tenant,
+                "use_case": use_case,
+                "limit_usd": amount,
+                "spent_usd": round(spent, 4),
+                "used": round(spent / amount, 4) if amount else None
+            })
+        return {"budgets": budgets, "downgrade_at": self.downgrade_at, **self.stats}
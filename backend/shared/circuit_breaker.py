@@ -0,0 +1,156 @@
+"""
+Per-provider circuit breakers for ELCA Blockbusters AI calls.
+A provider that keeps failing or stalling is skipped for a cool-down period,
+so requests fail over immediately instead of stacking timeouts.
+"""
+
+import os
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Deque, Dict, Optional, Tuple
+import structlog
+
+logger = structlog.get_logger()
+
+CIRCUIT_WINDOW_SIZE = int(os.getenv("CIRCUIT_WINDOW_SIZE", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "60"))
+CIRCUIT_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.8"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+CIRCUIT_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", "1"))
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is refused because the provider's circuit is open."""
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a sliding window of recent calls.
+
+    The circuit opens when, over at least `min_calls` calls, the failure rate or the
+    rate of calls slower than `slow_call_seconds` reaches its threshold. After
+    `open_seconds` a limited number of trial calls are let through (half-open);
+    their outcome closes or re-opens the circuit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = CIRCUIT_WINDOW_SIZE,
+        min_calls: int = CIRCUIT_MIN_CALLS,
+        error_rate_threshold: float = CIRCUIT_ERROR_RATE,
+        slow_call_seconds: float = CIRCUIT_SLOW_CALL_SECONDS,
+        slow_call_rate_threshold: float = CIRCUIT_SLOW_CALL_RATE,
+        open_seconds: float = CIRCUIT_OPEN_SECONDS,
+        half_open_max_calls: int = CIRCUIT_HALF_OPEN_CALLS
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CircuitState.CLOSED
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)  # (failed, slow)
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._last_error: Optional[str] = None
+        # Wall-clock time of the last real call outcome, for passive health
+        self.last_success_at: Optional[float] = None
+        self.last_failure_at: Optional[float] = None
+        self.stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def allow_request(self) -> bool:
+        """Whether a call may go to the provider now. Every allowed call must be
+        followed by record_success(), record_failure() or release()."""
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self.stats["rejected"] += 1
+                return False
+            self._transition(CircuitState.HALF_OPEN)
+
+        if self.state == CircuitState.HALF_OPEN:
+            if self._half_open_in_flight >= self.half_open_max_calls:
+                self.stats["rejected"] += 1
+                return False
+            self._half_open_in_flight += 1
+        return True
+
+    def record_success(self, duration: float):
+        self.stats["successes"] += 1
+        self.last_success_at = time.time()
+        slow = duration >= self.slow_call_seconds
+        if self.state == CircuitState.HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            if slow:
+                self._open()
+            else:
+                self._window.clear()
+                self._transition(CircuitState.CLOSED)
+            return
+
+        self._window.append((False, slow))
+        self._evaluate()
+
+    def record_failure(self, duration: float, error: Optional[BaseException] = None):
+        self.stats["failures"] += 1
+        self.last_failure_at = time.time()
+        self._last_error = str(error) if error else None
+        if self.state == CircuitState.HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            self._open()
+            return
+
+        self._window.append((True, duration >= self.slow_call_seconds))
+        self._evaluate()
+
+    def release(self):
+        """Give back a permitted call that was abandoned without an outcome."""
+        if self.state == CircuitState.HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def get_status(self) -> Dict[str, Any]:
+        calls = len(self._window)
+        failures = sum(1 for failed, _ in self._window if failed)
+        slow = sum(1 for _, is_slow in self._window if is_slow)
+        status = {
+            "state": self.state.value,
+            "window_calls": calls,
+            "error_rate": round(failures / calls, 3) if calls else 0.0,
+            "slow_call_rate": round(slow / calls, 3) if calls else 0.0,
+            "last_error": self._last_error,
+            **self.stats
+        }
+        if self.state == CircuitState.OPEN:
+            status["retry_in_seconds"] = round(max(0.0, self._opened_at + self.open_seconds - time.monotonic()), 1)
+        return status
+
+    def _evaluate(self):
+        calls = len(self._window)
+        if self.state != CircuitState.CLOSED or calls < self.min_calls:
+            return
+
+        error_rate = sum(1 for failed, _ in self._window if failed) / calls
+        slow_rate = sum(1 for _, slow in self._window if slow) / calls
+        if error_rate >= self.error_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+            self._open()
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._window.clear()
+        self.stats["opened"] += 1
+        self._transition(CircuitState.OPEN)
+
+    def _transition(self, state: CircuitState):
+        if state != self.state:
+            logger.warning("Circuit breaker state changed", provider=self.name, old=self.state.value, new=state.value)
+            self.state = state
+            if state != CircuitState.HALF_OPEN:
+                self._half_open_in_flight = 0
@@ -0,0 +1,304 @@
+"""
+Production diagnostics for ELCA Blockbusters workers.
+A sampling profiler that emits flamegraph-compatible collapsed stacks, asyncio task
+dumps, an event-loop lag monitor that captures what the loop was doing when it
+stalled, and an ASGI middleware that records stacks of slow requests.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import Counter, deque
+from datetime import datetime, timezone
+from types import FrameType
+from typing import Any, Callable, Deque, Dict, List, Optional
+import structlog
+
+from shared.metrics import REGISTRY
+
+logger = structlog.get_logger()
+
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+PROFILER_DEFAULT_INTERVAL_MS = float(os.getenv("PROFILER_DEFAULT_INTERVAL_MS", "10"))
+LOOP_LAG_CHECK_INTERVAL_SECONDS = float(os.getenv("LOOP_LAG_CHECK_INTERVAL_SECONDS", "0.5"))
+LOOP_LAG_STALL_SECONDS = float(os.getenv("LOOP_LAG_STALL_SECONDS", "0.5"))
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "10"))
+SLOW_REQUEST_LOG_SIZE = int(os.getenv("SLOW_REQUEST_LOG_SIZE", "50"))
+
+# Stacks deeper than this are truncated at the root end
+MAX_STACK_DEPTH = 128
+
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "elca_event_loop_lag_seconds",
+    "Delay of a scheduled event-loop callback beyond its due time.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+SLOW_REQUESTS = REGISTRY.counter("elca_slow_requests_total", "Requests that exceeded SLOW_REQUEST_SECONDS.", ("path",))
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    # ';' separates frames in collapsed-stack format
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+def collapse_frame(frame: Optional[FrameType]) -> str:
+    """Root-first ';'-joined stack of a thread's current frame."""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+def format_frame_stack(frame: Optional[FrameType]) -> List[str]:
+    """Innermost-last formatted stack of a thread's current frame."""
+    return traceback.format_list(traceback.extract_stack(frame, limit=MAX_STACK_DEPTH)) if frame else []
+
+def _await_chain(awaitable: Any) -> List[FrameType]:
+    """Frames of a suspended coroutine and everything it is awaiting, outermost first."""
+    frames = []
+    while awaitable is not None and len(frames) < MAX_STACK_DEPTH:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None) or getattr(awaitable, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None) or getattr(awaitable, "ag_await", None)
+    return frames
+
+def format_task_stack(task: asyncio.Task) -> List[str]:
+    """Where a task is suspended, following its whole await chain."""
+    return [
+        f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        for frame in _await_chain(task.get_coro())
+    ]
+
+def dump_tasks(loop: Optional[asyncio.AbstractEventLoop] = None) -> List[Dict[str, Any]]:
+    """All tasks of the loop with the stack each is suspended at."""
+    tasks = asyncio.all_tasks(loop)
+    current = asyncio.current_task(loop)
+    dump = []
+    for task in tasks:
+        coro = task.get_coro()
+        dump.append({
+            "name": task.get_name(),
+            "coroutine": getattr(coro, "__qualname__", type(coro).__name__),
+            "current": task is current,
+            "done": task.done(),
+            "stack": format_task_stack(task)
+        })
+    dump.sort(key=lambda entry: entry["coroutine"])
+    return dump
+
+class SamplingProfiler:
+    """Samples thread stacks from a background thread; one profile at a time.
+
+    Overhead is one sys._current_frames() walk per interval while a profile runs
+    and nothing otherwise, so it is safe to leave enabled.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def profile(self, seconds: float, interval: float, thread_id: Optional[int] = None) -> Dict[str, Any]:
+        """Sample for `seconds`; only `thread_id` if given, else every thread but the sampler."""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            seconds = min(max(seconds, interval), PROFILER_MAX_SECONDS)
+            own_id = threading.get_ident()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks: Counter = Counter()
+            samples = 0
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == own_id or (thread_id is not None and ident != thread_id):
+                        continue
+                    stack = collapse_frame(frame)
+                    if thread_id is None:
+                        stack = f"{names.get(ident, ident)};{stack}"
+                    stacks[stack] += 1
+                samples += 1
+                time.sleep(interval)
+            return {"seconds": seconds, "samples": samples, "stacks": stacks}
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def collapsed(stacks: Counter) -> str:
+        """Brendan Gregg collapsed-stack text (input for flamegraph.pl / speedscope)."""
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+class LoopLagMonitor:
+    """Measures how late the event loop runs a periodic callback.
+
+    A watchdog thread notices when the loop has not ticked for LOOP_LAG_STALL_SECONDS
+    and records the loop thread's stack at that moment, i.e. the code blocking it.
+    """
+
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_CHECK_INTERVAL_SECONDS,
+        stall_threshold: float = LOOP_LAG_STALL_SECONDS,
+        history: int = 20
+    ):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.stats = {"checks": 0, "stalls": 0, "max_lag_seconds": 0.0, "last_lag_seconds": 0.0}
+        self._last_tick = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._run())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join, self.interval * 2)
+            self._watchdog = None
+
+    @property
+    def loop_thread_id(self) -> Optional[int]:
+        return self._loop_thread_id
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "max_lag_seconds": round(self.stats["max_lag_seconds"], 4),
+            "last_lag_seconds": round(self.stats["last_lag_seconds"], 4),
+            "stall_threshold_seconds": self.stall_threshold,
+            "recent_stalls": list(self.stalls)
+        }
+
+    async def _run(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_tick = now
+            self.stats["checks"] += 1
+            self.stats["last_lag_seconds"] = lag
+            self.stats["max_lag_seconds"] = max(self.stats["max_lag_seconds"], lag)
+            LOOP_LAG_SECONDS.observe(lag)
+
+    def _watch(self):
+        reported_tick = None
+        while not self._stop.wait(self.interval / 2):
+            tick = self._last_tick
+            blocked_for = time.monotonic() - tick - self.interval
+            if blocked_for < self.stall_threshold or tick == reported_tick:
+                continue
+            # One capture per stall: the loop has not ticked since `tick`
+            reported_tick = tick
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stall = {
+                "detected_at": datetime.now(timezone.utc).isoformat(),
+                "blocked_seconds": round(blocked_for, 3),
+                "stack": format_frame_stack(frame)
+            }
+            self.stats["stalls"] += 1
+            self.stalls.append(stall)
+            logger.warning(
+                "Event loop stalled",
+                blocked_seconds=stall["blocked_seconds"],
+                location=stall["stack"][-1].strip() if stall["stack"] else None
+            )
+
+class SlowRequestMiddleware:
+    """ASGI middleware that captures where a request is suspended once it runs too long.
+
+    A request is timed until its response starts, so streamed bodies (SSE) do not
+    count; `exclude` skips requests that are slow by design, such as long-polls.
+    Per request it costs one timer; the stack is only captured for slow requests.
+    """
+
+    def __init__(
+        self,
+        app,
+        threshold_seconds: float = SLOW_REQUEST_SECONDS,
+        log_size: int = SLOW_REQUEST_LOG_SIZE,
+        exclude: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ):
+        self.app = app
+        self.threshold_seconds = threshold_seconds
+        self.exclude = exclude
+        self.entries: Deque[Dict[str, Any]] = deque(maxlen=log_size)
+        slow_request_logs.append(self.entries)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.threshold_seconds <= 0 or (self.exclude and self.exclude(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        started = time.monotonic()
+        captured: Dict[str, Any] = {}
+        response_started: Optional[float] = None
+
+        def capture():
+            captured["stack"] = format_task_stack(task) if task else []
+
+        async def timed_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start" and response_started is None:
+                response_started = time.monotonic()
+                timer.cancel()
+            await send(message)
+
+        timer = asyncio.get_running_loop().call_later(self.threshold_seconds, capture)
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            timer.cancel()
+            duration = (response_started or time.monotonic()) - started
+            if duration >= self.threshold_seconds:
+                self._record(scope, duration, captured.get("stack", []))
+
+    def _record(self, scope, duration: float, stack: List[str]):
+        path = scope.get("path", "")
+        route = scope.get("route")
+        route_path = getattr(route, "path", path)
+        entry = {
+            "method": scope.get("method"),
+            "path": path,
+            "query": scope.get("query_string", b"").decode("latin-1"),
+            "duration_seconds": round(duration, 3),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "stack_at_threshold": stack
+        }
+        self.entries.append(entry)
+        SLOW_REQUESTS.inc(path=route_path)
+        logger.warning(
+            "Slow request",
+            method=entry["method"],
+            path=path,
+            duration_seconds=entry["duration_seconds"],
+            location=stack[-1] if stack else None
+        )
+
+# Slow-request logs of every installed middleware instance
+slow_request_logs: List[Deque[Dict[str, Any]]] = []
+
+def recent_slow_requests() -> List[Dict[str, Any]]:
+    entries = [entry for log in slow_request_logs for entry in log]
+    return sorted(entries, key=lambda entry: entry["finished_at"], reverse=True)
@@ -4,16 +4,94 @@ Supports OpenAI, Claude, and X.ai Grok with cost optimization.
 """
 
 import os
+import json
+import time
 import asyncio
-from typing import List, Dict, Any, Optional, Union
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Any, Optional, TypeVar, Union
 from enum import Enum
 import structlog
 import openai
 from anthropic import AsyncAnthropic
 import httpx
 
+from shared.llm_cache import LLMResponseCache, make_cache_key
+from shared.semantic_cache import SemanticCache
+from shared.single_flight import SingleFlight
+from shared.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from shared.hedging import RequestHedger
+from shared.adaptive_router import AdaptiveRouter
+from shared.rate_limiter import ProviderRateLimiter, RateLimitTimeout, is_rate_limit_error, retry_after_seconds
+from shared.structured_output import compile_schema, parse_structured_output
+from shared.pricing import estimate_cost
+from shared.usage_store import UsageStore, current_tenant
+from shared.budgets import BudgetPolicy, BudgetExceededError
+from shared.fake_llm import AI_FAKE_LLM_MODE, FakeLLMTransport, RecordingTransport, fake_llm_enabled
+from shared.metrics import (
+    REGISTRY, AI_REQUEST_SECONDS, AI_FIRST_TOKEN_SECONDS, AI_TOKENS, AI_COST_USD, AI_RATE_LIMIT_WAITING,
+    AI_IN_FLIGHT, CACHE_LOOKUPS
+)
+
 logger = structlog.get_logger()
 
+T = TypeVar("T")
+
+# Connection pool settings shared by all provider clients
+AI_HTTP_MAX_CONNECTIONS = int(os.getenv("AI_HTTP_MAX_CONNECTIONS", "100"))
+AI_HTTP_MAX_KEEPALIVE = int(os.getenv("AI_HTTP_MAX_KEEPALIVE", "20"))
+AI_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("AI_HTTP_KEEPALIVE_EXPIRY", "60"))
+AI_HTTP_TIMEOUT = float(os.getenv("AI_HTTP_TIMEOUT", "120"))
+AI_HTTP2_ENABLED = os.getenv("AI_HTTP2_ENABLED", "true").lower() == "true"
+
+# Time limits for one provider attempt and for a whole request including fallbacks
+AI_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("AI_ATTEMPT_TIMEOUT_SECONDS", "90"))
+AI_REQUEST_DEADLINE_SECONDS = float(os.getenv("AI_REQUEST_DEADLINE_SECONDS", "150"))
+AI_HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv("AI_HEALTH_PROBE_TIMEOUT_SECONDS", "10"))
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _build_http_client(provider: str, http2: bool = False, **kwargs) -> httpx.AsyncClient:
+    """Build a pooled keep-alive HTTP client for a provider (or its local fake, see AI_FAKE_LLM_MODE)."""
+    if http2 and not _http2_available():
+        logger.warning("h2 not installed, falling back to HTTP/1.1")
+        http2 = False
+    
+    limits = httpx.Limits(
+        max_connections=AI_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=AI_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=AI_HTTP_KEEPALIVE_EXPIRY
+    )
+    if fake_llm_enabled():
+        kwargs["transport"] = FakeLLMTransport(provider)
+    elif AI_FAKE_LLM_MODE == "record":
+        kwargs["transport"] = RecordingTransport(provider, httpx.AsyncHTTPTransport(limits=limits, http2=http2))
+    
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=httpx.Timeout(AI_HTTP_TIMEOUT, connect=10.0),
+        http2=http2,
+        **kwargs
+    )
+
+def _api_key(name: str) -> Optional[str]:
+    """A provider API key; with the fake LLM every provider is available without keys."""
+    return os.getenv(name) or ("fake-key" if fake_llm_enabled() else None)
+
+# Tool / schema name used for provider-native structured output
+STRUCTURED_OUTPUT_TOOL = "structured_output"
+
+# Re-asks after a structured response fails local validation and repair
+STRUCTURED_OUTPUT_MAX_REASKS = int(os.getenv("STRUCTURED_OUTPUT_MAX_REASKS", "1"))
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for throughput tracking."""
+    return max(1, len(text) // 4)
+
 class AIProvider(str, Enum):
     OPENAI = "openai"
     CLAUDE = "claude"
@@ -27,7 +105,16 @@ class ELCAAIProviderManager:
         self.primary_provider = AIProvider.CLAUDE  # Claude Sonnet 4.5 as primary
         self.fallback_providers = [AIProvider.OPENAI, AIProvider.GROK]
         self.cost_optimization_enabled = True
-        self.usage_tracking = {}
+        self.usage_store = UsageStore()  # Real token counts and cost, shared across workers
+        self.budgets = BudgetPolicy(self.usage_store)
+        self.response_cache = LLMResponseCache.from_env()
+        self.semantic_cache = SemanticCache.from_env()
+        self.in_flight = SingleFlight()  # Coalesces identical concurrent requests
+        self.circuit_breakers = {provider: CircuitBreaker(provider.value) for provider in AIProvider}
+        self.hedger = RequestHedger.from_env()
+        self.router = AdaptiveRouter()
+        self.rate_limiters = {provider: ProviderRateLimiter.from_env(provider.value) for provider in AIProvider}
+        self.ontology_version = ""  # Fingerprint of the ontology snapshot, part of cache keys
         
         # ELCA-specific model preferences - Claude Sonnet 4.5 prioritized
         self.elca_model_preferences = {
@@ -39,63 +126,332 @@ class ELCAAIProviderManager:
         }
     
     def _initialize_providers(self) -> Dict[AIProvider, Any]:
-        """Initialize AI provider clients."""
+        """Initialize AI provider clients on pooled keep-alive connections."""
         providers = {}
         
         # OpenAI
-        if os.getenv("OPENAI_API_KEY"):
+        if _api_key("OPENAI_API_KEY"):
             providers[AIProvider.OPENAI] = openai.AsyncOpenAI(
-                api_key=os.getenv("OPENAI_API_KEY")
+                api_key=_api_key("OPENAI_API_KEY"),
+                http_client=_build_http_client(AIProvider.OPENAI.value)
             )
         
         # Claude
-        if os.getenv("ANTHROPIC_API_KEY"):
+        if _api_key("ANTHROPIC_API_KEY"):
             providers[AIProvider.CLAUDE] = AsyncAnthropic(
-                api_key=os.getenv("ANTHROPIC_API_KEY")
+                api_key=_api_key("ANTHROPIC_API_KEY"),
+                http_client=_build_http_client(AIProvider.CLAUDE.value)
             )
         
         # X.ai Grok
-        if os.getenv("XAI_API_KEY"):
-            providers[AIProvider.GROK] = httpx.AsyncClient(
+        if _api_key("XAI_API_KEY"):
+            providers[AIProvider.GROK] = _build_http_client(
+                AIProvider.GROK.value,
+                http2=AI_HTTP2_ENABLED,
                 base_url="https://api.x.ai/v1",
                 headers={
-                    "Authorization": f"Bearer {os.getenv('XAI_API_KEY')}",
+                    "Authorization": f"Bearer {_api_key('XAI_API_KEY')}",
                     "Content-Type": "application/json"
                 }
             )
         
+        if AI_FAKE_LLM_MODE:
+            logger.warning("Fake LLM mode active", mode=AI_FAKE_LLM_MODE)
+        
         return providers
     
+    async def aclose(self):
+        """Close all provider clients and their connection pools."""
+        for provider, client in self.providers.items():
+            try:
+                if isinstance(client, httpx.AsyncClient):
+                    await client.aclose()
+                else:
+                    await client.close()
+            except Exception as e:
+                logger.warning("Failed to close AI provider client", provider=provider, error=str(e))
+        self.providers = {}
+        self.response_cache.close()
+        await self.usage_store.close()
+    
     async def generate_text(
         self, 
         prompt: str, 
         use_case: str = "general",
         max_tokens: int = 1000,
         temperature: float = 0.7,
-        provider: Optional[AIProvider] = None
+        provider: Optional[AIProvider] = None,
+        cache: Optional[bool] = None,
+        semantic_key: Optional[str] = None,
+        semantic_scope: str = "",
+        response_schema: Optional[Dict[str, Any]] = None
     ) -> str:
-        """Generate text with ELCA-specific optimizations."""
+        """Generate text with ELCA-specific optimizations.
+        
+        cache=None caches according to the per-use-case opt-in (LLM_CACHE_USE_CASES);
+        True/False forces caching on or off for this call.
+        
+        semantic_key is the free-text part of the request (e.g. a topic) used for
+        near-duplicate matching when the use case is enabled in SEMANTIC_CACHE_USE_CASES;
+        semantic_scope holds the parts that must match exactly (e.g. platform, length).
+        
+        response_schema requests JSON through the provider's native structured output
+        mechanism; only responses that satisfy the schema are cached.
+        """
         
         # Select provider based on use case and cost optimization
         if not provider:
             provider = self._select_optimal_provider(use_case, max_tokens)
         
+        use_cache = self.response_cache.is_enabled_for(use_case) if cache is None else cache
+        use_semantic = semantic_key is not None and cache is not False and self.semantic_cache.is_enabled_for(use_case)
+        
+        model = self._get_model(provider, use_case)
+        key_prompt = prompt if response_schema is None else f"{prompt}\n{json.dumps(response_schema, sort_keys=True)}"
+        request_key = make_cache_key(
+            provider.value,
+            model,
+            key_prompt,
+            max_tokens,
+            temperature,
+            self.ontology_version
+        )
+        
+        if use_cache:
+            cached = await self.response_cache.get(request_key)
+            if cached is not None:
+                return cached
+        
+        if use_semantic:
+            partition_key = (
+                use_case, semantic_scope, provider.value, model, max_tokens, round(temperature, 3), self.ontology_version
+            )
+            cached = self.semantic_cache.lookup(partition_key, semantic_key)
+            if cached is not None:
+                return cached
+        
+        async def generate_and_store() -> str:
+            result = await self._generate_text_uncached(
+                prompt, use_case, max_tokens, temperature, provider, response_schema
+            )
+            cacheable = response_schema is None or not parse_structured_output(result, compile_schema(response_schema))[1]
+            if use_cache and cacheable:
+                await self.response_cache.set(request_key, result)
+            if use_semantic:
+                self.semantic_cache.store(partition_key, semantic_key, result)
+            return result
+        
+        # Identical concurrent requests share one upstream call
+        return await self.in_flight.do(request_key, generate_and_store)
+    
+    async def _generate_text_uncached(
+        self,
+        prompt: str,
+        use_case: str,
+        max_tokens: int,
+        temperature: float,
+        provider: AIProvider,
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Call the selected provider, falling back to the others on failure.
+        
+        Providers whose circuit is open are skipped without a call, each attempt is
+        bounded by AI_ATTEMPT_TIMEOUT_SECONDS and the whole request by AI_REQUEST_DEADLINE_SECONDS.
+        With hedging enabled, a slow attempt is raced against the next provider.
+        """
+        deadline = time.monotonic() + AI_REQUEST_DEADLINE_SECONDS
+        last_error: Optional[Exception] = None
+        
+        async def attempt(candidate: AIProvider) -> str:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            model = self._resolve_model(candidate, use_case)
+            self._check_budget(model, use_case, prompt, max_tokens)
+            started = time.monotonic()
+            try:
+                result = await self._call_with_breaker(
+                    candidate,
+                    self._generate_provider_text(
+                        candidate, model, prompt, max_tokens, temperature, use_case, response_schema
+                    ),
+                    timeout=min(AI_ATTEMPT_TIMEOUT_SECONDS, remaining),
+                    tokens=_estimate_tokens(prompt) + max_tokens
+                )
+            except (CircuitOpenError, RateLimitTimeout):
+                raise
+            except Exception as e:
+                elapsed = time.monotonic() - started
+                # 429s are handled by the rate limiter, not held against the route
+                if is_rate_limit_error(e):
+                    AI_REQUEST_SECONDS.observe(elapsed, provider=candidate.value, use_case=use_case, outcome="rate_limited")
+                else:
+                    AI_REQUEST_SECONDS.observe(elapsed, provider=candidate.value, use_case=use_case, outcome="error")
+                    self.router.record(candidate.value, model, use_case, elapsed, failed=True)
+                raise
+            elapsed = time.monotonic() - started
+            AI_REQUEST_SECONDS.observe(elapsed, provider=candidate.value, use_case=use_case, outcome="success")
+            self.hedger.record_latency(candidate.value, use_case, elapsed)
+            self.router.record(candidate.value, model, use_case, elapsed, _estimate_tokens(result))
+            return result
+        
+        candidates = self._fallback_order(provider)
+        while candidates and time.monotonic() < deadline:
+            candidate = candidates.pop(0)
+            try:
+                if self.hedger.enabled and candidates:
+                    return await self._hedged_attempt(attempt, candidate, candidates, use_case)
+                return await attempt(candidate)
+            except BudgetExceededError:
+                raise
+            except CircuitOpenError as e:
+                last_error = last_error or e
+                logger.info("Skipping provider with open circuit", provider=candidate)
+            except RateLimitTimeout as e:
+                last_error = e
+                logger.warning("Provider rate limit queue timed out, trying fallback", provider=candidate)
+            except Exception as e:
+                last_error = e
+                logger.warning("Provider failed, trying fallback", provider=candidate, error=str(e) or type(e).__name__)
+        
+        if last_error is None:
+            last_error = asyncio.TimeoutError()
+        raise RuntimeError(f"All text generation providers failed: {last_error}")
+    
+    async def _hedged_attempt(
+        self,
+        attempt: Callable[[AIProvider], Awaitable[str]],
+        primary: AIProvider,
+        remaining: List[AIProvider],
+        use_case: str
+    ) -> str:
+        """Run the primary attempt; if it outlives its latency percentile, race a backup.
+        
+        The backup is taken from `remaining` once launched. The first successful answer
+        wins and the other call is cancelled; if both fail, the last error is raised.
+        """
+        primary_task = asyncio.ensure_future(attempt(primary))
+        pending = {primary_task}
+        last_error: Optional[BaseException] = None
         try:
-            if provider == AIProvider.OPENAI and provider in self.providers:
-                return await self._generate_openai_text(prompt, max_tokens, temperature, use_case)
-            elif provider == AIProvider.CLAUDE and provider in self.providers:
-                return await self._generate_claude_text(prompt, max_tokens, temperature, use_case)
-            elif provider == AIProvider.GROK and provider in self.providers:
-                return await self._generate_grok_text(prompt, max_tokens, temperature, use_case)
-            else:
-                raise ValueError(f"Provider {provider} not available")
-                
+            delay = self.hedger.hedge_delay(primary.value, use_case)
+            backup = remaining[0]
+            if delay is None or self.circuit_breakers[backup].state == CircuitState.OPEN:
+                return await primary_task
+            
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+            if done or not self.hedger.try_acquire():
+                return await primary_task
+            
+            remaining.pop(0)
+            logger.info("Hedging slow request", primary=primary, backup=backup, after_seconds=round(delay, 2))
+            backup_task = asyncio.ensure_future(attempt(backup))
+            pending = {primary_task, backup_task}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.hedger.stats["backup_wins" if task is backup_task else "primary_wins"] += 1
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            # Also reached when the caller is cancelled: no attempt outlives this call
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    def _fallback_order(self, provider: AIProvider) -> List[AIProvider]:
+        """The selected provider followed by the configured fallbacks that are available."""
+        candidates = [provider] + [p for p in self.fallback_providers if p != provider]
+        return [p for p in candidates if p in self.providers]
+    
+    async def _call_with_breaker(
+        self,
+        provider: AIProvider,
+        call: Awaitable[T],
+        timeout: float,
+        tokens: Optional[int] = None
+    ) -> T:
+        """Run a provider call through its circuit breaker with a timeout.
+        
+        With `tokens`, the call first queues for a slot in the provider's rate limiter
+        (the wait counts against `timeout`); without, the caller holds the slot.
+        A 429 backs off the rate limiter instead of counting against the breaker.
+        """
+        breaker = self.circuit_breakers[provider]
+        limiter = self.rate_limiters[provider]
+        if not breaker.allow_request():
+            if asyncio.iscoroutine(call):
+                call.close()
+            raise CircuitOpenError(f"Circuit open for {provider.value}")
+        
+        if tokens is not None:
+            queued_at = time.monotonic()
+            try:
+                await limiter.acquire(tokens, timeout)
+            except BaseException:
+                breaker.release()
+                if asyncio.iscoroutine(call):
+                    call.close()
+                raise
+            timeout = max(0.001, timeout - (time.monotonic() - queued_at))
+        
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(call, timeout)
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
         except Exception as e:
-            logger.warning("Primary provider failed, trying fallback", provider=provider, error=str(e))
-            return await self._generate_text_with_fallback(prompt, use_case, max_tokens, temperature)
+            if is_rate_limit_error(e):
+                breaker.release()
+                limiter.on_rate_limited(retry_after_seconds(e))
+            else:
+                breaker.record_failure(time.monotonic() - started, e)
+            raise
+        finally:
+            if tokens is not None:
+                limiter.release()
+        breaker.record_success(time.monotonic() - started)
+        limiter.on_success()
+        return result
+    
+    def _generate_provider_text(
+        self,
+        provider: AIProvider,
+        model: str,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        use_case: str,
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> Awaitable[str]:
+        """Dispatch a generation request to a provider."""
+        if provider == AIProvider.OPENAI:
+            return self._generate_openai_text(model, prompt, max_tokens, temperature, use_case, response_schema)
+        elif provider == AIProvider.CLAUDE:
+            return self._generate_claude_text(model, prompt, max_tokens, temperature, use_case, response_schema)
+        elif provider == AIProvider.GROK:
+            return self._generate_grok_text(model, prompt, max_tokens, temperature, use_case, response_schema)
+        raise ValueError(f"Provider {provider} not available")
     
     def _select_optimal_provider(self, use_case: str, max_tokens: int) -> AIProvider:
-        """Select optimal provider based on use case and cost."""
+        """Select optimal provider based on use case, observed performance and cost."""
+        preferred = self._preferred_provider(use_case)
+        if not self.router.enabled:
+            return preferred
+        
+        candidates = [
+            (provider.value, self._get_model(provider, use_case))
+            for provider in self.providers
+            if self.circuit_breakers[provider].state != CircuitState.OPEN
+        ]
+        choice = self.router.select(use_case, max_tokens, candidates, preferred.value)
+        return AIProvider(choice) if choice else preferred
+    
+    def _preferred_provider(self, use_case: str) -> AIProvider:
+        """Static provider preference, used as the routing prior."""
         
         # Use case-specific preferences
         if use_case in self.elca_model_preferences:
@@ -106,65 +462,123 @@ class ELCAAIProviderManager:
         # Default to primary provider
         return self.primary_provider if self.primary_provider in self.providers else AIProvider.OPENAI
     
-    async def _generate_text_with_fallback(self, prompt: str, use_case: str, max_tokens: int, temperature: float) -> str:
-        """Try fallback providers for text generation."""
-        for provider in self.fallback_providers:
-            try:
-                if provider in self.providers:
-                    return await self.generate_text(prompt, use_case, max_tokens, temperature, provider)
-            except Exception as e:
-                logger.warning("Fallback provider failed", provider=provider, error=str(e))
-                continue
+    def _get_model(self, provider: AIProvider, use_case: str) -> str:
+        """Configured model for a provider and use case (cache keys and routing use this)."""
+        if provider == AIProvider.OPENAI:
+            return "gpt-4-turbo" if use_case in ["pastoral_care", "sermon_generation"] else "gpt-3.5-turbo"
+        elif provider == AIProvider.CLAUDE:
+            return "claude-sonnet-4-5"  # Latest Claude Sonnet 4.5 (October 2025) for all ELCA use cases
+        return "grok-beta"
+    
+    def _resolve_model(self, provider: AIProvider, use_case: str) -> str:
+        """Model for one provider attempt, downgraded when the tenant's budget runs low.
         
-        raise RuntimeError("All text generation providers failed")
+        Called once per attempt so each call counts at most one downgrade.
+        """
+        return self.budgets.downgrade_model(current_tenant.get(), use_case, self._get_model(provider, use_case))
+    
+    def _check_budget(self, model: str, use_case: str, prompt: str, max_tokens: int):
+        """Reject a call up front if its worst-case cost would overrun a budget."""
+        if not self.budgets.budgets:
+            return
+        estimated = estimate_cost(model, _estimate_tokens(prompt), max_tokens)
+        self.budgets.check(current_tenant.get(), use_case, estimated)
     
-    async def _generate_openai_text(self, prompt: str, max_tokens: int, temperature: float, use_case: str) -> str:
+    async def _generate_openai_text(
+        self,
+        model: str,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        use_case: str,
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> str:
         """Generate text using OpenAI with ELCA context."""
         client = self.providers[AIProvider.OPENAI]
         
-        # Select model based on use case
-        model = "gpt-4-turbo" if use_case in ["pastoral_care", "sermon_generation"] else "gpt-3.5-turbo"
-        
         # Add ELCA context to prompt
         elca_context = self._get_elca_context(use_case)
         enhanced_prompt = f"{elca_context}\n\n{prompt}"
         
+        # JSON mode; the turbo models do not accept json_schema response formats
+        extra = {"response_format": {"type": "json_object"}} if response_schema is not None else {}
+        
         response = await client.chat.completions.create(
             model=model,
             messages=[{"role": "user", "content": enhanced_prompt}],
             max_tokens=max_tokens,
-            temperature=temperature
+            temperature=temperature,
+            **extra
         )
         
+        content = response.choices[0].message.content
+        
         # Track usage for cost monitoring
-        self._track_usage(AIProvider.OPENAI, model, max_tokens)
+        usage = response.usage
+        self._track_usage(
+            AIProvider.OPENAI, model, use_case,
+            usage.prompt_tokens if usage else _estimate_tokens(enhanced_prompt),
+            usage.completion_tokens if usage else _estimate_tokens(content or "")
+        )
         
-        return response.choices[0].message.content
+        return content
     
-    async def _generate_claude_text(self, prompt: str, max_tokens: int, temperature: float, use_case: str) -> str:
-        """Generate text using Claude with ELCA context."""
+    async def _generate_claude_text(
+        self,
+        model: str,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        use_case: str,
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Generate text using Claude with ELCA context. Structured output uses a forced tool call."""
         client = self.providers[AIProvider.CLAUDE]
         
-        # Select model based on use case - using Claude Sonnet 4.5 as primary
-        model = "claude-sonnet-4-5"  # Latest Claude Sonnet 4.5 (October 2025) for all ELCA use cases
-        
         # Add ELCA context to prompt
         elca_context = self._get_elca_context(use_case)
         enhanced_prompt = f"{elca_context}\n\n{prompt}"
         
+        extra = {}
+        if response_schema is not None:
+            extra = {
+                "tools": [{
+                    "name": STRUCTURED_OUTPUT_TOOL,
+                    "description": "Record the response in the required structure.",
+                    "input_schema": response_schema
+                }],
+                "tool_choice": {"type": "tool", "name": STRUCTURED_OUTPUT_TOOL}
+            }
+        
         response = await client.messages.create(
             model=model,
             max_tokens=max_tokens,
             temperature=temperature,
-            messages=[{"role": "user", "content": enhanced_prompt}]
+            messages=[{"role": "user", "content": enhanced_prompt}],
+            **extra
         )
         
         # Track usage for cost monitoring
-        self._track_usage(AIProvider.CLAUDE, model, max_tokens)
+        self._track_usage(
+            AIProvider.CLAUDE, model, use_case, response.usage.input_tokens, response.usage.output_tokens
+        )
+        
+        if response_schema is not None:
+            for block in response.content:
+                if block.type == "tool_use":
+                    return json.dumps(block.input)
         
         return response.content[0].text
     
-    async def _generate_grok_text(self, prompt: str, max_tokens: int, temperature: float, use_case: str) -> str:
+    async def _generate_grok_text(
+        self,
+        model: str,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        use_case: str,
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> str:
         """Generate text using X.ai Grok with ELCA context."""
         client = self.providers[AIProvider.GROK]
         
@@ -174,21 +588,245 @@ class ELCAAIProviderManager:
         
         payload = {
             "messages": [{"role": "user", "content": enhanced_prompt}],
-            "model": "grok-beta",
+            "model": model,
             "stream": False,
             "temperature": temperature,
             "max_tokens": max_tokens
         }
+        if response_schema is not None:
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": STRUCTURED_OUTPUT_TOOL, "schema": response_schema}
+            }
         
         response = await client.post("/chat/completions", json=payload)
         response.raise_for_status()
         
         result = response.json()
         
+        content = result["choices"][0]["message"]["content"]
+        
         # Track usage for cost monitoring
-        self._track_usage(AIProvider.GROK, "grok-beta", max_tokens)
+        usage = result.get("usage") or {}
+        self._track_usage(
+            AIProvider.GROK, model, use_case,
+            usage.get("prompt_tokens", _estimate_tokens(enhanced_prompt)),
+            usage.get("completion_tokens", _estimate_tokens(content or ""))
+        )
+        
+        return content
+    
+    async def generate_text_stream(
+        self,
+        prompt: str,
+        use_case: str = "general",
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        provider: Optional[AIProvider] = None,
+        cache: Optional[bool] = None
+    ) -> AsyncIterator[str]:
+        """Stream generated text chunk by chunk as the provider produces it.
+        
+        Falls back to the next provider only if a provider fails before sending
+        its first chunk; a failure mid-stream is raised to the caller. The wait for
+        a first chunk, across all fallbacks, is bounded by AI_REQUEST_DEADLINE_SECONDS.
+        """
+        if not provider:
+            provider = self._select_optimal_provider(use_case, max_tokens)
+        
+        use_cache = self.response_cache.is_enabled_for(use_case) if cache is None else cache
+        cache_key = make_cache_key(
+            provider.value,
+            self._get_model(provider, use_case),
+            prompt,
+            max_tokens,
+            temperature,
+            self.ontology_version
+        )
+        if use_cache:
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        deadline = time.monotonic() + AI_REQUEST_DEADLINE_SECONDS
+        last_error: Optional[Exception] = None
+        for candidate in self._fallback_order(provider):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                last_error = last_error or asyncio.TimeoutError()
+                break
+            # Over-budget calls are rejected before any provider is contacted
+            model = self._resolve_model(candidate, use_case)
+            self._check_budget(model, use_case, prompt, max_tokens)
+            limiter = self.rate_limiters[candidate]
+            try:
+                # A stream holds its concurrency slot until the last chunk
+                await limiter.acquire(_estimate_tokens(prompt) + max_tokens, min(AI_ATTEMPT_TIMEOUT_SECONDS, remaining))
+            except RateLimitTimeout as e:
+                last_error = e
+                continue
+            
+            try:
+                stream = self._stream_provider_text(candidate, model, prompt, max_tokens, temperature, use_case)
+                started = time.monotonic()
+                try:
+                    # The breaker judges a stream by how quickly its first chunk arrives
+                    first_chunk = await self._call_with_breaker(
+                        candidate,
+                        self._first_chunk(stream),
+                        timeout=min(AI_ATTEMPT_TIMEOUT_SECONDS, max(0.0, deadline - time.monotonic()))
+                    )
+                except CircuitOpenError as e:
+                    last_error = last_error or e
+                    continue
+                except Exception as e:
+                    elapsed = time.monotonic() - started
+                    if is_rate_limit_error(e):
+                        AI_REQUEST_SECONDS.observe(elapsed, provider=candidate.value, use_case=use_case, outcome="rate_limited")
+                    else:
+                        AI_REQUEST_SECONDS.observe(elapsed, provider=candidate.value, use_case=use_case, outcome="error")
+                        self.router.record(candidate.value, model, use_case, elapsed, failed=True)
+                    await stream.aclose()
+                    last_error = e
+                    logger.warning("Streaming provider failed, trying fallback", provider=candidate, error=str(e) or type(e).__name__)
+                    continue
+                
+                AI_FIRST_TOKEN_SECONDS.observe(time.monotonic() - started, provider=candidate.value, use_case=use_case)
+                chunks = []
+                if first_chunk:
+                    chunks.append(first_chunk)
+                    yield first_chunk
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+            finally:
+                limiter.release()
+            
+            text = "".join(chunks)
+            elapsed = time.monotonic() - started
+            AI_REQUEST_SECONDS.observe(elapsed, provider=candidate.value, use_case=use_case, outcome="success")
+            self.router.record(candidate.value, model, use_case, elapsed, _estimate_tokens(text))
+            if use_cache:
+                await self.response_cache.set(cache_key, text)
+            return
+        
+        raise RuntimeError(f"All text generation providers failed: {last_error}")
+    
+    @staticmethod
+    async def _first_chunk(stream: AsyncIterator[str]) -> str:
+        """Wait for the first chunk of a stream ("" if the stream is empty)."""
+        try:
+            return await stream.__anext__()
+        except StopAsyncIteration:
+            return ""
+    
+    def _stream_provider_text(
+        self,
+        provider: AIProvider,
+        model: str,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        use_case: str
+    ) -> AsyncIterator[str]:
+        """Dispatch a streaming request to a provider."""
+        if provider == AIProvider.OPENAI:
+            return self._stream_openai_text(model, prompt, max_tokens, temperature, use_case)
+        elif provider == AIProvider.CLAUDE:
+            return self._stream_claude_text(model, prompt, max_tokens, temperature, use_case)
+        elif provider == AIProvider.GROK:
+            return self._stream_grok_text(model, prompt, max_tokens, temperature, use_case)
+        raise ValueError(f"Provider {provider} not available")
+    
+    async def _stream_openai_text(
+        self, model: str, prompt: str, max_tokens: int, temperature: float, use_case: str
+    ) -> AsyncIterator[str]:
+        """Stream text from OpenAI with ELCA context."""
+        client = self.providers[AIProvider.OPENAI]
+        enhanced_prompt = f"{self._get_elca_context(use_case)}\n\n{prompt}"
+        
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": enhanced_prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            stream_options={"include_usage": True}  # Final chunk carries the token usage
+        )
+        usage = None
+        chunks = []
+        async for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                chunks.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+        
+        self._track_usage(
+            AIProvider.OPENAI, model, use_case,
+            usage.prompt_tokens if usage else _estimate_tokens(enhanced_prompt),
+            usage.completion_tokens if usage else _estimate_tokens("".join(chunks))
+        )
+    
+    async def _stream_claude_text(
+        self, model: str, prompt: str, max_tokens: int, temperature: float, use_case: str
+    ) -> AsyncIterator[str]:
+        """Stream text from Claude with ELCA context."""
+        client = self.providers[AIProvider.CLAUDE]
+        enhanced_prompt = f"{self._get_elca_context(use_case)}\n\n{prompt}"
+        
+        async with client.messages.stream(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=[{"role": "user", "content": enhanced_prompt}]
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+            usage = (await stream.get_final_message()).usage
         
-        return result["choices"][0]["message"]["content"]
+        self._track_usage(AIProvider.CLAUDE, model, use_case, usage.input_tokens, usage.output_tokens)
+    
+    async def _stream_grok_text(
+        self, model: str, prompt: str, max_tokens: int, temperature: float, use_case: str
+    ) -> AsyncIterator[str]:
+        """Stream text from X.ai Grok (OpenAI-compatible server-sent events)."""
+        client = self.providers[AIProvider.GROK]
+        enhanced_prompt = f"{self._get_elca_context(use_case)}\n\n{prompt}"
+        
+        payload = {
+            "messages": [{"role": "user", "content": enhanced_prompt}],
+            "model": model,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        
+        usage = {}
+        chunks = []
+        async with client.stream("POST", "/chat/completions", json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                usage = event.get("usage") or usage
+                choices = event.get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    chunks.append(delta)
+                    yield delta
+        
+        self._track_usage(
+            AIProvider.GROK, model, use_case,
+            usage.get("prompt_tokens", _estimate_tokens(enhanced_prompt)),
+            usage.get("completion_tokens", _estimate_tokens("".join(chunks)))
+        )
     
     def _get_elca_context(self, use_case: str) -> str:
         """Get ELCA-specific context for AI prompts."""
@@ -237,25 +875,41 @@ class ELCAAIProviderManager:
         
         return contexts.get(use_case, contexts["general"])
     
-    def _track_usage(self, provider: AIProvider, model: str, tokens: int):
-        """Track AI usage for cost monitoring."""
-        if provider not in self.usage_tracking:
-            self.usage_tracking[provider] = {}
-        
-        if model not in self.usage_tracking[provider]:
-            self.usage_tracking[provider][model] = {"tokens": 0, "requests": 0}
-        
-        self.usage_tracking[provider][model]["tokens"] += tokens
-        self.usage_tracking[provider][model]["requests"] += 1
+    def _track_usage(self, provider: AIProvider, model: str, use_case: str, input_tokens: int, output_tokens: int):
+        """Track AI usage for cost monitoring, using the token counts the provider reported."""
+        cost = estimate_cost(model, input_tokens, output_tokens)
+        self.usage_store.record(current_tenant.get(), use_case, provider.value, model, input_tokens, output_tokens, cost)
+        AI_TOKENS.inc(input_tokens, provider=provider.value, model=model, direction="input")
+        AI_TOKENS.inc(output_tokens, provider=provider.value, model=model, direction="output")
+        AI_COST_USD.inc(cost, provider=provider.value, model=model)
+    
+    def collect_metrics(self):
+        """Refresh cache and queue metrics from component stats before a metrics snapshot."""
+        cache = self.response_cache.stats
+        CACHE_LOOKUPS.set(cache["memory_hits"], cache="response", result="memory_hit")
+        CACHE_LOOKUPS.set(cache["disk_hits"], cache="response", result="disk_hit")
+        CACHE_LOOKUPS.set(cache["misses"], cache="response", result="miss")
+        semantic = self.semantic_cache.stats
+        CACHE_LOOKUPS.set(semantic["hits"], cache="semantic", result="hit")
+        CACHE_LOOKUPS.set(semantic["misses"], cache="semantic", result="miss")
+        for provider, limiter in self.rate_limiters.items():
+            AI_RATE_LIMIT_WAITING.set(limiter.get_stats()["waiting"], provider=provider.value)
+        AI_IN_FLIGHT.set(self.in_flight.get_stats()["in_flight"])
     
     async def generate_structured_output(
         self,
         prompt: str,
         schema: Dict[str, Any],
         use_case: str = "general",
-        provider: Optional[AIProvider] = None
+        provider: Optional[AIProvider] = None,
+        cache: Optional[bool] = None
     ) -> Dict[str, Any]:
-        """Generate structured output following a schema with ELCA context."""
+        """Generate structured output following a schema with ELCA context.
+        
+        Uses the provider's native structured output, then validates locally against the
+        compiled schema (repairing fences, trailing prose and truncation) before re-asking.
+        """
+        validator = compile_schema(schema)
         
         # Add ELCA context to prompt
         elca_context = self._get_elca_context(use_case)
@@ -265,71 +919,104 @@ class ELCAAIProviderManager:
         {prompt}
         
         Please respond with valid JSON following this schema:
-        {schema}
+        {json.dumps(schema)}
         
         Ensure the response is valid JSON and follows the schema exactly.
         """
         
-        response_text = await self.generate_text(structured_prompt, use_case, provider=provider)
+        response_text = await self.generate_text(
+            structured_prompt, use_case, provider=provider, cache=cache, response_schema=schema
+        )
+        result, errors = parse_structured_output(response_text, validator)
+        
+        for _ in range(STRUCTURED_OUTPUT_MAX_REASKS):
+            if not errors:
+                break
+            logger.warning("Structured output failed validation, re-asking", use_case=use_case, errors=errors[:5])
+            reask_prompt = f"""
+            {structured_prompt}
+            
+            Your previous response did not match the schema:
+            {response_text}
+            
+            Problems found:
+            {chr(10).join(f"- {error}" for error in errors[:10])}
+            
+            Respond again with corrected JSON only.
+            """
+            response_text = await self.generate_text(
+                reask_prompt, use_case, provider=provider, cache=False, response_schema=schema
+            )
+            result, errors = parse_structured_output(response_text, validator)
+        
+        if errors:
+            logger.error("Failed to parse structured output", errors=errors[:5], response=response_text)
+            raise ValueError(f"Invalid JSON response: {'; '.join(errors[:5])}")
         
-        try:
-            import json
-            return json.loads(response_text)
-        except json.JSONDecodeError as e:
-            logger.error("Failed to parse structured output", error=str(e), response=response_text)
-            raise ValueError(f"Invalid JSON response: {response_text}")
+        return result
     
     def get_usage_stats(self) -> Dict[str, Any]:
-        """Get AI usage statistics for cost monitoring."""
-        total_tokens = 0
-        total_requests = 0
-        
-        for provider, models in self.usage_tracking.items():
-            for model, stats in models.items():
-                total_tokens += stats["tokens"]
-                total_requests += stats["requests"]
-        
+        """Get AI usage statistics for cost monitoring (this month, across all workers)."""
         return {
-            "total_tokens": total_tokens,
-            "total_requests": total_requests,
-            "provider_breakdown": self.usage_tracking,
-            "cost_optimization_enabled": self.cost_optimization_enabled
+            **self.usage_store.get_stats(),
+            "budgets": self.budgets.get_status(),
+            "cost_optimization_enabled": self.cost_optimization_enabled,
+            "cache": self.response_cache.get_stats(),
+            "semantic_cache": self.semantic_cache.get_stats(),
+            "single_flight": self.in_flight.get_stats(),
+            "hedging": self.hedger.get_stats(),
+            "routing": self.router.get_stats(),
+            "rate_limits": {provider.value: self.rate_limiters[provider].get_stats() for provider in self.providers}
         }
     
+    def get_circuit_status(self) -> Dict[str, Any]:
+        """Circuit breaker state of each configured provider."""
+        return {provider.value: self.circuit_breakers[provider].get_status() for provider in self.providers}
+    
     def get_available_providers(self) -> List[AIProvider]:
         """Get list of available AI providers."""
         return list(self.providers.keys())
     
+    async def probe_provider(self, provider: AIProvider):
+        """Cheapest possible liveness check: list models (no tokens are generated)."""
+        client = self.providers[provider]
+        if provider == AIProvider.OPENAI:
+            await client.models.list()
+        elif provider == AIProvider.CLAUDE:
+            await client.models.list(limit=1)
+        elif provider == AIProvider.GROK:
+            response = await client.get("/models")
+            response.raise_for_status()
+    
     async def health_check(self) -> Dict[str, Any]:
         """Check health of all AI providers."""
-        health_status = {}
         
-        for provider in self.providers:
+        async def check(provider: AIProvider) -> str:
             try:
-                if provider == AIProvider.OPENAI:
-                    client = self.providers[provider]
-                    await client.models.list()
-                    health_status[provider] = "healthy"
-                elif provider == AIProvider.CLAUDE:
-                    client = self.providers[provider]
-                    await client.messages.create(
-                        model="claude-sonnet-4-5",
-                        max_tokens=10,
-                        messages=[{"role": "user", "content": "test"}]
-                    )
-                    health_status[provider] = "healthy"
-                elif provider == AIProvider.GROK:
-                    client = self.providers[provider]
-                    response = await client.post("/chat/completions", json={
-                        "messages": [{"role": "user", "content": "test"}],
-                        "model": "grok-beta",
-                        "max_tokens": 1
-                    })
-                    response.raise_for_status()
-                    health_status[provider] = "healthy"
-                else:
-                    health_status[provider] = "healthy"
+                await asyncio.wait_for(self.probe_provider(provider), AI_HEALTH_PROBE_TIMEOUT_SECONDS)
+                return "healthy"
             except Exception as e:
-                health_status[provider] = f"unhealthy: {str(e)}"
+                return f"unhealthy: {str(e) or type(e).__name__}"
         
-        return health_status
+        providers = list(self.providers)
+        results = await asyncio.gather(*(check(provider) for provider in providers))
+        return dict(zip(providers, results))
+
+
+# Process-wide provider manager, created in the app lifespan and shared by all requests
+_shared_provider_manager: Optional[ELCAAIProviderManager] = None
+
+def get_ai_provider_manager() -> ELCAAIProviderManager:
+    """Get the process-wide AI provider manager, creating it on first use."""
+    global _shared_provider_manager
+    if _shared_provider_manager is None:
+        _shared_provider_manager = ELCAAIProviderManager()
+        REGISTRY.register_collector(_shared_provider_manager.collect_metrics)
+    return _shared_provider_manager
+
+async def close_ai_provider_manager():
+    """Close the process-wide AI provider manager."""
+    global _shared_provider_manager
+    if _shared_provider_manager is not None:
+        await _shared_provider_manager.aclose()
+        _shared_provider_manager = None
@@ -0,0 +1,444 @@
+"""
+Deterministic local stand-in for the OpenAI, Claude and Grok APIs.
+An httpx transport that answers the provider HTTP APIs (plain, streaming and
+structured output) from a cassette of recorded responses or with synthesized text,
+with configurable latency, token rate, errors and 429s, so the whole request
+path can be load-tested offline. Selected with AI_FAKE_LLM_MODE.
+"""
+
+import os
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import httpx
+import structlog
+
+logger = structlog.get_logger()
+
+# "" (real providers), "synthetic", "replay" (cassette, synthesizing misses) or "record" (real providers, saved to the cassette)
+AI_FAKE_LLM_MODE = os.getenv("AI_FAKE_LLM_MODE", "").lower()
+AI_FAKE_LLM_CASSETTE = os.getenv("AI_FAKE_LLM_CASSETTE", "./llm_cassette.jsonl")
+AI_FAKE_LLM_SEED = int(os.getenv("AI_FAKE_LLM_SEED", "0"))
+
+# Profile defaults; each can be overridden per provider as AI_FAKE_<PROVIDER>_<SETTING>
+FAKE_PROFILE_DEFAULTS = {
+    "TTFT_MS": 400.0,  # median time to first token
+    "LATENCY_SIGMA": 0.5,  # log-normal spread of the time to first token
+    "TOKENS_PER_SECOND": 60.0,
+    "OUTPUT_TOKENS": 300.0,  # synthesized response length, capped by max_tokens
+    "ERROR_RATE": 0.0,  # share of calls answered with a 500
+    "RATE_LIMIT_RATE": 0.0,  # share of calls answered with a 429
+    "RETRY_AFTER_SECONDS": 1.0,
+}
+
+# Tokens per streamed chunk
+FAKE_CHUNK_TOKENS = 4
+
+FAKE_MODELS = {
+    "openai": ["gpt-4-turbo", "gpt-3.5-turbo"],
+    "claude": ["claude-sonnet-4-5", "claude-haiku-4-5"],
+    "grok": ["grok-beta"],
+}
+
+_WORDS = (
+    "grace faith community neighbor hope service justice mercy welcome gospel prayer scripture "
+    "congregation youth mission share love serve together church family peace gathering story "
+    "worship gifts listen belong journey care table bread water light"
+).split()
+
+def fake_llm_enabled() -> bool:
+    return AI_FAKE_LLM_MODE in ("synthetic", "replay")
+
+def prompt_key(prompt: str) -> str:
+    """Cassette key of a prompt."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:32]
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+class FakeProfile:
+    """Latency, throughput and failure settings for one provider."""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        for name, default in FAKE_PROFILE_DEFAULTS.items():
+            value = os.getenv(f"AI_FAKE_{provider.upper()}_{name}", os.getenv(f"AI_FAKE_LLM_{name}", str(default)))
+            setattr(self, name.lower(), float(value))
+
+    def first_token_delay(self, rng: random.Random) -> float:
+        if self.latency_sigma <= 0:
+            return self.ttft_ms / 1000
+        return rng.lognormvariate(math.log(max(self.ttft_ms, 0.001) / 1000), self.latency_sigma)
+
+    def token_delay(self, tokens: int) -> float:
+        return tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+class Cassette:
+    """Recorded responses keyed by prompt hash, stored as JSON lines."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(key)
+
+    def record(self, entry: Dict[str, Any]):
+        with self._lock:
+            self.entries[entry["key"]] = entry
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+_cassettes: Dict[str, Cassette] = {}
+
+def get_cassette(path: str = AI_FAKE_LLM_CASSETTE) -> Cassette:
+    """Cassette shared by all providers of the process."""
+    if path not in _cassettes:
+        _cassettes[path] = Cassette(path)
+    return _cassettes[path]
+
+def _request_prompt(body: Dict[str, Any]) -> str:
+    """The prompt text of a chat/messages request."""
+    parts = []
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, list):
+            content = "".join(block.get("text", "") for block in content if isinstance(block, dict))
+        parts.append(str(content))
+    return "\n".join(parts)
+
+def _request_schema(provider: str, body: Dict[str, Any]) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """Whether structured output was requested, and its schema if the request carries one."""
+    if provider == "claude":
+        for tool in body.get("tools") or []:
+            return True, tool.get("input_schema")
+        return False, None
+
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        return True, response_format.get("json_schema", {}).get("schema")
+    if response_format.get("type") == "json_object":
+        # JSON mode carries the schema only in the prompt
+        return True, _schema_from_prompt(_request_prompt(body))
+    return False, None
+
+def _schema_from_prompt(prompt: str) -> Optional[Dict[str, Any]]:
+    marker = prompt.find("following this schema:")
+    if marker < 0:
+        return None
+    start = prompt.find("{", marker)
+    try:
+        schema, _ = json.JSONDecoder().raw_decode(prompt[start:])
+        return schema
+    except ValueError:
+        return None
+
+def synthesize_value(schema: Optional[Dict[str, Any]], name: str = "") -> Any:
+    """A minimal instance of a JSON schema. Booleans named is_*/has_* are true, others false."""
+    schema = schema or {}
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type", "object")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        return {key: synthesize_value(sub, key) for key, sub in (schema.get("properties") or {}).items()}
+    if kind == "array":
+        return [synthesize_value(schema.get("items"), name) for _ in range(schema.get("minItems", 0))]
+    if kind in ("integer", "number"):
+        value = schema.get("maximum", schema.get("minimum", 1))
+        return int(value) if kind == "integer" else float(value)
+    if kind == "boolean":
+        return name.startswith(("is_", "has_"))
+    if kind == "string":
+        return f"synthetic {name}".strip()
+    return None
+
+def synthesize_text(key: str, tokens: int) -> str:
+    """Deterministic filler text for a prompt, one word per token."""
+    rng = random.Random(f"{AI_FAKE_LLM_SEED}:{key}")
+    sentences = []
+    remaining = max(1, tokens)
+    while remaining > 0:
+        length = min(remaining, rng.randint(6, 14))
+        words = [rng.choice(_WORDS) for _ in range(length)]
+        sentences.append(" ".join(words).capitalize() + ".")
+        remaining -= length
+    return " ".join(sentences)
+
+class FakeLLMTransport(httpx.AsyncBaseTransport):
+    """Serves one provider's HTTP API locally."""
+
+    def __init__(self, provider: str, cassette: Optional[Cassette] = None, profile: Optional[FakeProfile] = None):
+        self.provider = provider
+        self.cassette = cassette if cassette is not None else (get_cassette() if AI_FAKE_LLM_MODE == "replay" else None)
+        self.profile = profile or FakeProfile(provider)
+        self._rng = random.Random(f"{AI_FAKE_LLM_SEED}:{provider}")
+        self.stats = {"requests": 0, "replayed": 0, "synthesized": 0, "errors": 0, "rate_limited": 0}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if request.method == "GET" and path.endswith("/models"):
+            return self._models_response()
+        if request.method != "POST" or not (path.endswith("/chat/completions") or path.endswith("/messages")):
+            return self._error_response(404, "not_found_error", f"Fake {self.provider} has no {request.method} {path}")
+
+        self.stats["requests"] += 1
+        body = json.loads(await request.aread() or b"{}")
+        delay = self.profile.first_token_delay(self._rng)
+
+        roll = self._rng.random()
+        if roll < self.profile.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            await asyncio.sleep(min(delay, 0.05))
+            return self._error_response(
+                429, "rate_limit_error", "Fake rate limit",
+                headers={"retry-after": str(self.profile.retry_after_seconds)}
+            )
+        if roll < self.profile.rate_limit_rate + self.profile.error_rate:
+            self.stats["errors"] += 1
+            await asyncio.sleep(delay)
+            return self._error_response(500, "api_error", "Fake provider error")
+
+        completion = self._completion(body)
+        if body.get("stream"):
+            return httpx.Response(
+                200,
+                headers={"content-type": "text/event-stream"},
+                stream=_SSEStream(self._stream_events(body, completion, delay))
+            )
+
+        await asyncio.sleep(delay + self.profile.token_delay(completion["output_tokens"]))
+        return httpx.Response(200, json=self._response_body(body, completion))
+
+    def _completion(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Text and usage for a request, from the cassette or synthesized."""
+        prompt = _request_prompt(body)
+        key = prompt_key(prompt)
+        structured, schema = _request_schema(self.provider, body)
+        max_tokens = int(body.get("max_tokens") or self.profile.output_tokens)
+
+        entry = self.cassette.get(key) if self.cassette else None
+        if entry is not None:
+            self.stats["replayed"] += 1
+            text = entry["text"]
+            output_tokens = entry.get("output_tokens") or _count_tokens(text)
+        else:
+            self.stats["synthesized"] += 1
+            if structured:
+                text = json.dumps(synthesize_value(schema))
+                output_tokens = _count_tokens(text)
+            else:
+                output_tokens = min(max_tokens, int(self.profile.output_tokens))
+                text = synthesize_text(key, output_tokens)
+
+        return {
+            "text": text,
+            "structured": structured,
+            "input_tokens": (entry or {}).get("input_tokens") or _count_tokens(prompt),
+            "output_tokens": output_tokens
+        }
+
+    def _response_body(self, body: Dict[str, Any], completion: Dict[str, Any]) -> Dict[str, Any]:
+        model = body.get("model", "")
+        text = completion["text"]
+        if self.provider == "claude":
+            if completion["structured"]:
+                tool_name = (body.get("tools") or [{}])[0].get("name", "structured_output")
+                content = [{"type": "tool_use", "id": "toolu_fake", "name": tool_name, "input": json.loads(text)}]
+                stop_reason = "tool_use"
+            else:
+                content = [{"type": "text", "text": text}]
+                stop_reason = "end_turn"
+            return {
+                "id": "msg_fake",
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": content,
+                "stop_reason": stop_reason,
+                "stop_sequence": None,
+                "usage": {"input_tokens": completion["input_tokens"], "output_tokens": completion["output_tokens"]}
+            }
+
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": completion["input_tokens"],
+                "completion_tokens": completion["output_tokens"],
+                "total_tokens": completion["input_tokens"] + completion["output_tokens"]
+            }
+        }
+
+    async def _stream_events(self, body: Dict[str, Any], completion: Dict[str, Any], delay: float) -> AsyncIterator[bytes]:
+        await asyncio.sleep(delay)
+        chunks = _split_chunks(completion["text"])
+        chunk_delay = self.profile.token_delay(FAKE_CHUNK_TOKENS)
+        model = body.get("model", "")
+
+        if self.provider == "claude":
+            message = {
+                "id": "msg_fake", "type": "message", "role": "assistant", "model": model, "content": [],
+                "stop_reason": None, "stop_sequence": None,
+                "usage": {"input_tokens": completion["input_tokens"], "output_tokens": 1}
+            }
+            yield _sse({"type": "message_start", "message": message}, "message_start")
+            yield _sse({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}, "content_block_start")
+            for index, chunk in enumerate(chunks):
+                if index:
+                    await asyncio.sleep(chunk_delay)
+                yield _sse(
+                    {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}},
+                    "content_block_delta"
+                )
+            yield _sse({"type": "content_block_stop", "index": 0}, "content_block_stop")
+            yield _sse({
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": completion["output_tokens"]}
+            }, "message_delta")
+            yield _sse({"type": "message_stop"}, "message_stop")
+            return
+
+        base = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+        for index, chunk in enumerate(chunks):
+            if index:
+                await asyncio.sleep(chunk_delay)
+            yield _sse({**base, "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]})
+        yield _sse({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield _sse({**base, "choices": [], "usage": {
+                "prompt_tokens": completion["input_tokens"],
+                "completion_tokens": completion["output_tokens"],
+                "total_tokens": completion["input_tokens"] + completion["output_tokens"]
+            }})
+        yield b"data: [DONE]\n\n"
+
+    def _models_response(self) -> httpx.Response:
+        models = FAKE_MODELS.get(self.provider, [])
+        if self.provider == "claude":
+            data = [{"type": "model", "id": model, "display_name": model, "created_at": "2025-01-01T00:00:00Z"} for model in models]
+            return httpx.Response(200, json={
+                "data": data, "has_more": False, "first_id": models[0] if models else None, "last_id": models[-1] if models else None
+            })
+        data = [{"id": model, "object": "model", "created": 0, "owned_by": "fake"} for model in models]
+        return httpx.Response(200, json={"object": "list", "data": data})
+
+    def _error_response(self, status: int, error_type: str, message: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        if self.provider == "claude":
+            body = {"type": "error", "error": {"type": error_type, "message": message}}
+        else:
+            body = {"error": {"message": message, "type": error_type, "code": None}}
+        return httpx.Response(status, json=body, headers=headers)
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Passes requests to the real provider and saves successful completions to the cassette."""
+
+    def __init__(self, provider: str, inner: httpx.AsyncBaseTransport, cassette: Optional[Cassette] = None):
+        self.provider = provider
+        self.inner = inner
+        self.cassette = cassette or get_cassette()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "POST" or not (request.url.path.endswith("/chat/completions") or request.url.path.endswith("/messages")):
+            return await self.inner.handle_async_request(request)
+
+        # Uncompressed responses, so the raw body can be parsed and passed through unchanged
+        request.headers["accept-encoding"] = "identity"
+        response = await self.inner.handle_async_request(request)
+        if response.status_code != 200:
+            return response
+
+        raw = b"".join([chunk async for chunk in response.stream])
+        await response.aclose()
+        try:
+            body = json.loads(request.content or b"{}")
+            prompt = _request_prompt(body)
+            text, input_tokens, output_tokens = _parse_completion(self.provider, raw, bool(body.get("stream")))
+            self.cassette.record({
+                "key": prompt_key(prompt),
+                "provider": self.provider,
+                "model": body.get("model"),
+                "text": text,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens
+            })
+        except (ValueError, KeyError, IndexError) as e:
+            logger.warning("Could not record provider response", provider=self.provider, error=str(e))
+        return httpx.Response(response.status_code, headers=response.headers, content=raw, extensions=response.extensions)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+def _parse_completion(provider: str, raw: bytes, stream: bool) -> Tuple[str, Optional[int], Optional[int]]:
+    """Text and token usage of a recorded provider response."""
+    if not stream:
+        body = json.loads(raw)
+        if provider == "claude":
+            usage = body.get("usage", {})
+            for block in body["content"]:
+                if block["type"] == "tool_use":
+                    return json.dumps(block["input"]), usage.get("input_tokens"), usage.get("output_tokens")
+            return body["content"][0]["text"], usage.get("input_tokens"), usage.get("output_tokens")
+        usage = body.get("usage") or {}
+        return body["choices"][0]["message"]["content"], usage.get("prompt_tokens"), usage.get("completion_tokens")
+
+    parts: List[str] = []
+    usage: Dict[str, Any] = {}
+    for line in raw.decode("utf-8").splitlines():
+        if not line.startswith("data:") or line.strip() == "data: [DONE]":
+            continue
+        event = json.loads(line[len("data:"):])
+        if provider == "claude":
+            if event.get("type") == "message_start":
+                usage["prompt_tokens"] = event["message"]["usage"].get("input_tokens")
+            elif event.get("type") == "content_block_delta":
+                parts.append(event["delta"].get("text") or event["delta"].get("partial_json") or "")
+            elif event.get("type") == "message_delta":
+                usage["completion_tokens"] = event.get("usage", {}).get("output_tokens")
+        else:
+            usage.update(event.get("usage") or {})
+            for choice in event.get("choices") or []:
+                parts.append(choice.get("delta", {}).get("content") or "")
+    return "".join(parts), usage.get("prompt_tokens"), usage.get("completion_tokens")
+
+def _split_chunks(text: str) -> List[str]:
+    """Split text into stream chunks of FAKE_CHUNK_TOKENS words, keeping the spaces between them."""
+    words = text.split(" ")
+    chunks = [" ".join(words[i:i + FAKE_CHUNK_TOKENS]) for i in range(0, len(words), FAKE_CHUNK_TOKENS)]
+    return [chunk + " " for chunk in chunks[:-1]] + chunks[-1:]
+
+def _sse(data: Dict[str, Any], event: Optional[str] = None) -> bytes:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n".encode("utf-8")
+
+class _SSEStream(httpx.AsyncByteStream):
+    def __init__(self, events: AsyncIterator[bytes]):
+        self._events = events
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for event in self._events:
+            yield event
+
+    async def aclose(self):
+        await self._events.aclose()
@@ -0,0 +1,262 @@
+"""
+Local first-tier validation of AI content against ELCA guidelines.
+A compiled Aho-Corasick automaton finds every rule term in a single pass, so
+clean, low-risk content can be approved without a second LLM call.
+"""
+
+import os
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+import structlog
+
+from shared.ontology_snapshot import OntologySnapshot
+
+logger = structlog.get_logger()
+
+# Agent types whose clean content may be approved without the LLM validator
+VALIDATION_LOCAL_AGENT_TYPES = [
+    t.strip()
+    for t in os.getenv("VALIDATION_LOCAL_AGENT_TYPES", "youth_engagement,mission_coordination").split(",")
+    if t.strip()
+]
+VALIDATION_LOCAL_MAX_CHARS = int(os.getenv("VALIDATION_LOCAL_MAX_CHARS", "4000"))
+
+@dataclass(frozen=True)
+class GuidelineRule:
+    """A term the scanner looks for and what finding it means."""
+    term: str
+    category: str
+    severity: str
+    description: str
+    suggestion: str = ""
+
+def _rules(category: str, severity: str, description: str, terms: Dict[str, str]) -> List[GuidelineRule]:
+    return [GuidelineRule(term, category, severity, description, suggestion) for term, suggestion in terms.items()]
+
+GUIDELINE_RULES: List[GuidelineRule] = [
+    *_rules("exclusionary_language", "high", "Demeaning or exclusionary language", {
+        "retarded": "Use person-first language such as 'person with an intellectual disability'",
+        "crippled": "Use person-first language such as 'person with a disability'",
+        "illegal aliens": "Use 'undocumented immigrants' or 'migrants'",
+        "illegals": "Use 'undocumented immigrants' or 'migrants'",
+        "normal people": "Avoid implying that some people are not normal",
+        "those people": "Name the group respectfully or speak of 'our neighbors'",
+        "real christians": "Avoid judging whose faith is genuine",
+        "true believers": "Avoid judging whose faith is genuine",
+        "unsaved": "Speak of God's grace for all rather than dividing people",
+        "lifestyle choice": "Avoid framing identities as choices",
+    }),
+    *_rules("non_inclusive_language", "medium", "Language that is not inclusive or accessible", {
+        "handicapped": "Use 'person with a disability' or 'accessible'",
+        "wheelchair-bound": "Use 'wheelchair user'",
+        "confined to a wheelchair": "Use 'wheelchair user'",
+        "suffers from": "Use 'lives with' or 'has'",
+        "mankind": "Use 'humankind' or 'humanity'",
+        "manpower": "Use 'volunteers' or 'people power'",
+        "brotherhood of man": "Use 'human family'",
+        "you guys": "Use 'everyone' or 'friends'",
+        "ladies and gentlemen": "Use 'friends' or 'everyone'",
+        "the homeless": "Speak of 'people experiencing homelessness'",
+    }),
+    *_rules("human_replacement", "high", "Suggests AI can replace human ministry or discernment", {
+        "instead of your pastor": "Encourage contact with a pastor or pastoral care team",
+        "no need to talk to": "Encourage human connection and pastoral care",
+        "replace your pastor": "Present AI as assisting, not replacing, human ministry",
+        "as your spiritual advisor": "Present AI as assisting, not replacing, human ministry",
+        "i am praying for you": "AI should not claim to pray; invite the community to pray",
+        "i will pray for you": "AI should not claim to pray; invite the community to pray",
+    }),
+    *_rules("sensitive_topic", "high", "Sensitive pastoral topic that needs careful review", {
+        "suicide": "Include crisis resources and referral to professional care",
+        "self-harm": "Include crisis resources and referral to professional care",
+        "abuse": "Include referral to appropriate professional and safeguarding support",
+        "overdose": "Include crisis resources and referral to professional care",
+        "diagnosis": "Avoid medical advice; refer to qualified professionals",
+        "medication": "Avoid medical advice; refer to qualified professionals",
+    }),
+]
+
+# Any of these counts as disclosing AI assistance
+AI_TRANSPARENCY_MARKERS = (
+    "ai-assisted", "ai assisted", "ai-generated", "ai generated", "generated with ai",
+    "prepared with ai", "created with ai", "with ai assistance", "with the help of ai",
+    "with the assistance of ai", "artificial intelligence",
+)
+
+_VALUE_STOPWORDS = frozenset({"and", "the", "of", "for", "with", "radical", "centered", "first"})
+
+_SEVERITY_PENALTY = {"high": 30, "medium": 10, "low": 5}
+
+_TRANSPARENCY_CONCERN = {
+    "type": "ai_transparency",
+    "severity": "low",
+    "description": "Content does not disclose AI assistance",
+    "suggestion": "Add a short note that this content was prepared with AI assistance"
+}
+
+class AhoCorasick:
+    """Multi-pattern matcher compiled once; scans text in a single pass.
+
+    Matches are whole words/phrases only and case-insensitive.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, Any]]] = [[]]
+
+        for pattern, payload in patterns:
+            self._add(pattern.lower(), payload)
+        self._build_failure_links()
+
+    def _add(self, pattern: str, payload: Any):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(pattern), payload))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> List[Tuple[int, Any]]:
+        """Start offsets and payloads of all whole-word matches in `text`."""
+        text = text.lower()
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, payload in self._output[state]:
+                start = index - length + 1
+                if _is_boundary(text, start - 1) and _is_boundary(text, index + 1):
+                    matches.append((start, payload))
+        return matches
+
+def _is_boundary(text: str, index: int) -> bool:
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+def value_keywords(value_name: str) -> List[str]:
+    """Keywords that signal alignment with a value, e.g. 'Human Dignity' -> human, dignity."""
+    words = re.findall(r"[a-z]+", value_name.lower())
+    return [word for word in words if len(word) > 3 and word not in _VALUE_STOPWORDS]
+
+@dataclass(frozen=True)
+class ValidationPolicy:
+    """When content from an agent type may be approved by the local scanner."""
+    local_approval: bool
+    max_local_chars: int = VALIDATION_LOCAL_MAX_CHARS
+    escalate_categories: FrozenSet[str] = frozenset(
+        {"exclusionary_language", "non_inclusive_language", "human_replacement", "sensitive_topic"}
+    )
+
+def get_validation_policy(agent_type: str) -> ValidationPolicy:
+    """Pastoral care always escalates unless explicitly opted in via VALIDATION_LOCAL_AGENT_TYPES."""
+    return ValidationPolicy(local_approval=agent_type in VALIDATION_LOCAL_AGENT_TYPES)
+
+class GuidelineScanner:
+    """Compiled scanner for guideline rules plus the values of one ontology snapshot."""
+
+    def __init__(self, snapshot: OntologySnapshot, rules: Iterable[GuidelineRule] = GUIDELINE_RULES):
+        self.fingerprint = snapshot.fingerprint
+        patterns: List[Tuple[str, Tuple[str, Any]]] = [(rule.term, ("rule", rule)) for rule in rules]
+        patterns.extend((marker, ("transparency", marker)) for marker in AI_TRANSPARENCY_MARKERS)
+        for value in snapshot.values:
+            patterns.extend((keyword, ("value", value.name)) for keyword in value_keywords(value.name))
+        self._automaton = AhoCorasick(patterns)
+
+    def scan(self, content: str, check_transparency: bool = True) -> Tuple[Dict[str, Any], List[str]]:
+        """Validate content locally.
+
+        Returns a report with the same schema as the LLM validator and the
+        categories of the rule findings, which decide whether to escalate.
+        """
+        rule_hits: Dict[str, GuidelineRule] = {}
+        aligned_values: Dict[str, None] = {}
+        has_disclosure = False
+
+        for _, (kind, payload) in self._automaton.find_all(content):
+            if kind == "rule":
+                rule_hits.setdefault(payload.term, payload)
+            elif kind == "value":
+                aligned_values.setdefault(payload)
+            else:
+                has_disclosure = True
+
+        concerns = [
+            {
+                "type": rule.category,
+                "severity": rule.severity,
+                "description": f"{rule.description}: '{rule.term}'",
+                "suggestion": rule.suggestion
+            }
+            for rule in rule_hits.values()
+        ]
+        if check_transparency and not has_disclosure:
+            concerns.append(dict(_TRANSPARENCY_CONCERN))
+
+        score = max(0, 100 - sum(_SEVERITY_PENALTY.get(c["severity"], 0) for c in concerns))
+        categories = sorted({rule.category for rule in rule_hits.values()})
+
+        report = {
+            "is_approved": not categories,
+            "compliance_score": score,
+            "value_alignment": list(aligned_values),
+            "concerns": concerns,
+            "recommendations": list(dict.fromkeys(c["suggestion"] for c in concerns if c["suggestion"])),
+            "requires_human_review": "sensitive_topic" in categories or "human_replacement" in categories,
+            "validated_by": "guideline_scanner"
+        }
+        return report, categories
+
+    def transparency_concern(self, content: str) -> Optional[Dict[str, Any]]:
+        """The AI-transparency concern for content that never discloses AI assistance, else None."""
+        if any(kind == "transparency" for _, (kind, _) in self._automaton.find_all(content)):
+            return None
+        return dict(_TRANSPARENCY_CONCERN)
+
+def add_concern(report: Dict[str, Any], concern: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a validation report with one more concern, its suggestion and its score penalty."""
+    return {
+        **report,
+        "compliance_score": max(0, report.get("compliance_score", 0) - _SEVERITY_PENALTY.get(concern["severity"], 0)),
+        "concerns": [*report.get("concerns", []), concern],
+        "recommendations": list(dict.fromkeys([*report.get("recommendations", []), concern["suggestion"]]))
+    }
+
+def needs_escalation(policy: ValidationPolicy, content: str, categories: List[str]) -> bool:
+    """Whether the LLM validator must review the content after the local scan."""
+    return (
+        not policy.local_approval
+        or len(content) > policy.max_local_chars
+        or any(category in policy.escalate_categories for category in categories)
+    )
+
+_scanner: Optional[GuidelineScanner] = None
+
+def get_guideline_scanner(snapshot: OntologySnapshot) -> GuidelineScanner:
+    """Scanner compiled for the snapshot's ontology, rebuilt when the ontology changes."""
+    global _scanner
+    if _scanner is None or _scanner.fingerprint != snapshot.fingerprint:
+        _scanner = GuidelineScanner(snapshot)
+        logger.info("Guideline scanner compiled", fingerprint=snapshot.fingerprint)
+    return _scanner
@@ -0,0 +1,119 @@
+"""
+Background AI provider health prober for ELCA Blockbusters.
+Providers are probed on an interval with the cheapest endpoint available and
+combined with passive health from real traffic; /ready and /api/ai/status
+serve the cached result instantly instead of calling providers per request.
+"""
+
+import os
+import time
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import structlog
+
+from shared.elca_ai_providers import ELCAAIProviderManager, AIProvider, AI_HEALTH_PROBE_TIMEOUT_SECONDS
+from shared.circuit_breaker import CircuitState
+
+logger = structlog.get_logger()
+
+AI_HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("AI_HEALTH_PROBE_INTERVAL_SECONDS", "60"))
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+class ProviderHealthProber:
+    """Periodically probes providers and keeps the latest result per provider."""
+
+    def __init__(
+        self,
+        ai_provider: ELCAAIProviderManager,
+        interval_seconds: float = AI_HEALTH_PROBE_INTERVAL_SECONDS,
+        timeout_seconds: float = AI_HEALTH_PROBE_TIMEOUT_SECONDS
+    ):
+        self.ai_provider = ai_provider
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self._probes: Dict[AIProvider, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def probe_all(self):
+        """Probe every configured provider concurrently."""
+        await asyncio.gather(*(self._probe(provider) for provider in list(self.ai_provider.providers)))
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """Cached health per provider, merged with passive health from real traffic."""
+        now = time.time()
+        status = {}
+        for provider in self.ai_provider.providers:
+            probe = self._probes.get(provider, {})
+            breaker = self.ai_provider.circuit_breakers[provider]
+            checked_at = probe.get("checked_at")
+            status[provider.value] = {
+                "status": self._combine(probe, breaker),
+                "probe_ok": probe.get("ok"),
+                "probe_latency_ms": probe.get("latency_ms"),
+                "probe_error": probe.get("error"),
+                "checked_at": _isoformat(checked_at),
+                "age_seconds": round(now - checked_at, 1) if checked_at else None,
+                "stale": checked_at is None or now - checked_at > 2 * self.interval_seconds,
+                "circuit": breaker.state.value,
+                "last_traffic_success_at": _isoformat(breaker.last_success_at),
+                "last_traffic_failure_at": _isoformat(breaker.last_failure_at)
+            }
+        return status
+
+    def get_summary(self) -> Dict[str, str]:
+        """Provider -> status string, for readiness responses."""
+        return {provider: health["status"] for provider, health in self.get_status().items()}
+
+    @staticmethod
+    def _combine(probe: Dict[str, Any], breaker) -> str:
+        """Real traffic is stronger evidence than a probe, whichever is more recent wins."""
+        if breaker.state == CircuitState.OPEN:
+            return "unhealthy"
+        if breaker.state == CircuitState.HALF_OPEN:
+            return "degraded"
+
+        last_probe = probe.get("checked_at") or 0.0
+        last_success = breaker.last_success_at or 0.0
+        last_failure = breaker.last_failure_at or 0.0
+        if not probe.get("ok", True) and last_probe >= last_success:
+            return "unhealthy"
+        if last_failure > last_success:
+            return "degraded"
+        if not probe and not last_success:
+            return "unknown"
+        return "healthy"
+
+    async def _probe(self, provider: AIProvider):
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self.ai_provider.probe_provider(provider), self.timeout_seconds)
+            result = {"ok": True, "error": None}
+        except Exception as e:
+            result = {"ok": False, "error": str(e) or type(e).__name__}
+            logger.warning("AI provider health probe failed", provider=provider, error=result["error"])
+        result["latency_ms"] = round((time.monotonic() - started) * 1000, 1)
+        result["checked_at"] = time.time()
+        self._probes[provider] = result
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.error("AI provider health probing failed", error=str(e))
+            await asyncio.sleep(self.interval_seconds)
@@ -0,0 +1,117 @@
+"""
+Hedged requests for ELCA Blockbusters AI calls.
+When the primary provider is slower than its observed latency percentile, a
+backup request goes to the next provider and the first good answer wins.
+"""
+
+import os
+import math
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+import structlog
+
+logger = structlog.get_logger()
+
+AI_HEDGE_ENABLED = os.getenv("AI_HEDGE_ENABLED", "false").lower() == "true"
+AI_HEDGE_PERCENTILE = float(os.getenv("AI_HEDGE_PERCENTILE", "95"))
+AI_HEDGE_BUDGET = float(os.getenv("AI_HEDGE_BUDGET", "0.05"))
+AI_HEDGE_MIN_SAMPLES = int(os.getenv("AI_HEDGE_MIN_SAMPLES", "20"))
+AI_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("AI_HEDGE_MIN_DELAY_SECONDS", "1"))
+
+class LatencyTracker:
+    """Recent successful call latencies per key, for percentile estimates."""
+
+    def __init__(self, window_size: int = 200):
+        self.window_size = window_size
+        self._samples: Dict[Tuple, Deque[float]] = {}
+
+    def record(self, key: Tuple, seconds: float):
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.window_size)
+        samples.append(seconds)
+
+    def count(self, key: Tuple) -> int:
+        return len(self._samples.get(key, ()))
+
+    def percentile(self, key: Tuple, percentile: float) -> Optional[float]:
+        samples = self._samples.get(key)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(percentile / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+class RequestHedger:
+    """Decides when to hedge and enforces the extra-request budget.
+
+    The budget works like a token bucket: every eligible request adds `budget`
+    tokens (e.g. 0.05 for at most 5% extra requests) and every hedge spends one.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        percentile: float = 95,
+        budget: float = 0.05,
+        min_samples: int = 20,
+        min_delay_seconds: float = 1.0,
+        burst: float = 5.0
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay_seconds = min_delay_seconds
+        self.burst = burst
+        self.latencies = LatencyTracker()
+        self._tokens = 0.0
+        self.stats = {
+            "eligible": 0,
+            "hedged": 0,
+            "backup_wins": 0,
+            "primary_wins": 0,
+            "budget_exhausted": 0
+        }
+
+    @classmethod
+    def from_env(cls) -> "RequestHedger":
+        """Configure hedging from environment variables."""
+        return cls(
+            enabled=AI_HEDGE_ENABLED,
+            percentile=AI_HEDGE_PERCENTILE,
+            budget=AI_HEDGE_BUDGET,
+            min_samples=AI_HEDGE_MIN_SAMPLES,
+            min_delay_seconds=AI_HEDGE_MIN_DELAY_SECONDS
+        )
+
+    def record_latency(self, provider: str, use_case: str, seconds: float):
+        self.latencies.record((provider, use_case), seconds)
+
+    def hedge_delay(self, provider: str, use_case: str) -> Optional[float]:
+        """How long to wait for the primary before hedging, or None to not hedge."""
+        key = (provider, use_case)
+        if self.latencies.count(key) < self.min_samples:
+            return None
+        self.stats["eligible"] += 1
+        self._tokens = min(self.burst, self._tokens + self.budget)
+        return max(self.min_delay_seconds, self.latencies.percentile(key, self.percentile))
+
+    def try_acquire(self) -> bool:
+        """Spend budget for one hedge."""
+        if self._tokens < 1.0:
+            self.stats["budget_exhausted"] += 1
+            return False
+        self._tokens -= 1.0
+        self.stats["hedged"] += 1
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        eligible = self.stats["eligible"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "extra_request_rate": round(self.stats["hedged"] / eligible, 4) if eligible else 0.0,
+            "percentile": self.percentile,
+            "budget": self.budget
+        }
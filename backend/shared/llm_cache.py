@@ -0,0 +1,202 @@
+"""
+Exact-match LLM response cache for ELCA Blockbusters.
+In-memory LRU front with an optional on-disk SQLite tier shared by all worker processes.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+import structlog
+
+logger = structlog.get_logger()
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so re-indented templates share cache entries."""
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+def make_cache_key(
+    provider: str,
+    model: str,
+    prompt: str,
+    max_tokens: int,
+    temperature: float,
+    ontology_version: str
+) -> str:
+    """Build a stable cache key for a generation request."""
+    payload = json.dumps(
+        [provider, model, normalize_prompt(prompt), max_tokens, round(temperature, 3), ontology_version],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMResponseCache:
+    """Two-tier (memory LRU + SQLite) cache with TTL and size eviction."""
+
+    PRUNE_EVERY_WRITES = 100
+
+    def __init__(
+        self,
+        enabled_use_cases: Iterable[str] = (),
+        max_entries: int = 1000,
+        ttl_seconds: float = 86400,
+        db_path: Optional[str] = None,
+        max_db_entries: int = 50000
+    ):
+        self.enabled_use_cases = set(enabled_use_cases)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.max_db_entries = max_db_entries
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writes_since_prune = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        if db_path:
+            try:
+                self._db = self._open_db(db_path)
+            except sqlite3.Error as e:
+                logger.warning("LLM cache disk tier unavailable", path=db_path, error=str(e))
+                self._db = None
+
+    @classmethod
+    def from_env(cls) -> "LLMResponseCache":
+        """Configure the cache from environment variables; the disk tier is opened only if LLM_CACHE_PATH is set."""
+        use_cases = [u.strip() for u in os.getenv("LLM_CACHE_USE_CASES", "").split(",") if u.strip()]
+        return cls(
+            enabled_use_cases=use_cases,
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000")),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400")),
+            db_path=os.getenv("LLM_CACHE_PATH", "") or None,
+            max_db_entries=int(os.getenv("LLM_CACHE_MAX_DB_ENTRIES", "50000"))
+        )
+
+    def is_enabled_for(self, use_case: str) -> bool:
+        """Generation caching is opt-in per use case."""
+        return use_case in self.enabled_use_cases
+
+    async def get(self, key: str) -> Optional[str]:
+        """Look up a response, checking memory first and then the shared disk tier."""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return value
+            del self._memory[key]
+
+        if self._db is not None:
+            try:
+                row = await asyncio.to_thread(self._disk_get, key, now)
+            except sqlite3.Error as e:
+                logger.warning("LLM cache disk read failed", error=str(e))
+                row = None
+            if row is not None:
+                expires_at, value = row
+                self._memory_put(key, value, expires_at)
+                self.stats["disk_hits"] += 1
+                return value
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        """Store a response in both tiers."""
+        expires_at = time.time() + self.ttl_seconds
+        self._memory_put(key, value, expires_at)
+        self.stats["writes"] += 1
+
+        if self._db is not None:
+            try:
+                await asyncio.to_thread(self._disk_put, key, value, expires_at)
+            except sqlite3.Error as e:
+                logger.warning("LLM cache disk write failed", error=str(e))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for monitoring."""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_enabled": self._db is not None,
+            "enabled_use_cases": sorted(self.enabled_use_cases)
+        }
+
+    def close(self):
+        """Close the disk tier."""
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    def _memory_put(self, key: str, value: str, expires_at: float):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    @staticmethod
+    def _open_db(path: str) -> sqlite3.Connection:
+        connection = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_expires_at ON llm_cache (expires_at)")
+        connection.commit()
+        return connection
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, str]]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT expires_at, value FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def _disk_put(self, key: str, value: str, expires_at: float):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, time.time())
+            )
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= self.PRUNE_EVERY_WRITES:
+                self._writes_since_prune = 0
+                self._disk_prune()
+            self._db.commit()
+
+    def _disk_prune(self):
+        """Drop expired rows, then the oldest rows beyond the size limit."""
+        self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+        self._db.execute(
+            """
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_db_entries,)
+        )
@@ -0,0 +1,363 @@
+"""
+Low-overhead in-process metrics for ELCA Blockbusters, exposed in Prometheus text format.
+Each process periodically writes a snapshot to METRICS_DIR; /metrics merges the
+snapshots so counters and histograms cover every gunicorn worker and task worker.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import tempfile
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import structlog
+
+logger = structlog.get_logger()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Shared directory for per-process snapshots, empty to report this process only
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(tempfile.gettempdir(), "elca_metrics"))
+METRICS_EXPORT_INTERVAL_SECONDS = float(os.getenv("METRICS_EXPORT_INTERVAL_SECONDS", "5"))
+# Snapshots of exited processes are kept (their counts still count) for this long
+METRICS_DEAD_PROCESS_RETENTION_SECONDS = float(os.getenv("METRICS_DEAD_PROCESS_RETENTION_SECONDS", "3600"))
+
+# Seconds; covers DB round trips through multi-minute generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelValues = Tuple[str, ...]
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[LabelValues, Any]]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Monotonic count, summed across processes."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels):
+        """Mirror a cumulative count that is already kept elsewhere (e.g. cache stats)."""
+        self._values[self._key(labels)] = float(value)
+
+    def samples(self) -> List[Tuple[LabelValues, Any]]:
+        return list(self._values.items())
+
+class Gauge(_Metric):
+    """Current value, summed across live processes."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = float(value)
+
+    def samples(self) -> List[Tuple[LabelValues, Any]]:
+        return list(self._values.items())
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; an observation is one bisect and three additions."""
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count above the last bucket, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        row = self._values.get(key)
+        if row is None:
+            row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of the block, also when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[Tuple[LabelValues, Any]]:
+        return [(key, list(row)) for key, row in self._values.items()]
+
+class StageTimer:
+    """Times consecutive stages of one operation: each mark() observes the time since the previous one."""
+
+    def __init__(self, histogram: Histogram, **labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = self._last = time.perf_counter()
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.histogram.observe(now - self._last, stage=stage, **self.labels)
+        self._last = now
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+class MetricsRegistry:
+    """Metric definitions plus collectors that refresh gauges from existing stats."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._snapshot_path: Optional[str] = None
+        self._export_task: Optional[asyncio.Task] = None
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], None]):
+        """Run `collector` before every snapshot (e.g. to set queue-depth gauges)."""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """This process's metrics as a JSON-serializable dict."""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning("Metrics collector failed", collector=getattr(collector, "__name__", ""), error=str(e))
+        return {
+            "pid": os.getpid(),
+            "written_at": time.time(),
+            "metrics": {
+                metric.name: {
+                    "type": metric.kind,
+                    "help": metric.documentation,
+                    "labelnames": list(metric.labelnames),
+                    "buckets": list(getattr(metric, "buckets", ())),
+                    "samples": [[list(key), value] for key, value in metric.samples()]
+                }
+                for metric in self._metrics.values()
+            }
+        }
+
+    async def export(self):
+        """Write this process's snapshot for other processes' /metrics to merge."""
+        if not METRICS_DIR:
+            return
+        await asyncio.to_thread(self._write_snapshot, self.snapshot())
+
+    def start_export(self):
+        """Export snapshots every METRICS_EXPORT_INTERVAL_SECONDS."""
+        if METRICS_ENABLED and METRICS_DIR and self._export_task is None:
+            self._export_task = asyncio.create_task(self._export_loop())
+
+    async def stop_export(self):
+        if self._export_task is not None:
+            self._export_task.cancel()
+            await asyncio.gather(self._export_task, return_exceptions=True)
+            self._export_task = None
+            await self.export()
+
+    async def render(self) -> str:
+        """Prometheus text exposition of all processes' metrics."""
+        own = self.snapshot()
+        if not METRICS_DIR:
+            return _render([own])
+        await asyncio.to_thread(self._write_snapshot, own)
+        snapshots = await asyncio.to_thread(_read_snapshots, METRICS_DIR)
+        return _render(snapshots)
+
+    def _register(self, metric: _Metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def _write_snapshot(self, snapshot: Dict[str, Any]):
+        if self._snapshot_path is None:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            # A random suffix keeps a reused PID from overwriting an exited process's counts
+            self._snapshot_path = os.path.join(METRICS_DIR, f"metrics_{os.getpid()}_{uuid.uuid4().hex[:8]}.json")
+        temp_path = f"{self._snapshot_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, self._snapshot_path)
+
+    async def _export_loop(self):
+        while True:
+            await asyncio.sleep(METRICS_EXPORT_INTERVAL_SECONDS)
+            try:
+                await self.export()
+            except Exception as e:
+                logger.warning("Metrics export failed", error=str(e))
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+def _read_snapshots(directory: str) -> List[Dict[str, Any]]:
+    """Load every process snapshot; gauges of exited processes are dropped, old files removed."""
+    snapshots = []
+    now = time.time()
+    for filename in os.listdir(directory):
+        if not (filename.startswith("metrics_") and filename.endswith(".json")):
+            continue
+        path = os.path.join(directory, filename)
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        if not _process_alive(snapshot.get("pid", 0)):
+            if now - snapshot.get("written_at", 0) > METRICS_DEAD_PROCESS_RETENTION_SECONDS:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            snapshot["metrics"] = {
+                name: metric for name, metric in snapshot["metrics"].items() if metric["type"] != "gauge"
+            }
+        snapshots.append(snapshot)
+    return snapshots
+
+def _merge(snapshots: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot["metrics"].items():
+            target = merged.setdefault(name, {**metric, "values": {}})
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                if metric["type"] == "histogram":
+                    row = target["values"].get(key)
+                    if row is None or len(row) != len(value):
+                        target["values"][key] = list(value)
+                    else:
+                        target["values"][key] = [a + b for a, b in zip(row, value)]
+                else:
+                    target["values"][key] = target["values"].get(key, 0.0) + value
+    return merged
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _render(snapshots: List[Dict[str, Any]]) -> str:
+    lines = []
+    for name, metric in sorted(_merge(snapshots).items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric["labelnames"]
+        for key, value in sorted(metric["values"].items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_labels(names, key)} {_number(value)}")
+                continue
+
+            cumulative = 0.0
+            for bound, count in zip(metric["buckets"], value):
+                cumulative += count
+                bucket_labels = _labels(names, key, 'le="%s"' % _number(bound))
+                lines.append(f"{name}_bucket{bucket_labels} {_number(cumulative)}")
+            count = cumulative + value[-2]
+            inf_labels = _labels(names, key, 'le="+Inf"')
+            lines.append(f"{name}_bucket{inf_labels} {_number(count)}")
+            lines.append(f"{name}_sum{_labels(names, key)} {repr(float(value[-1]))}")
+            lines.append(f"{name}_count{_labels(names, key)} {_number(count)}")
+    return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+# Task pipeline
+TASK_STAGE_SECONDS = REGISTRY.histogram(
+    "elca_task_stage_seconds", "Time spent in each stage of task processing.", ("stage", "agent_type")
+)
+TASK_SECONDS = REGISTRY.histogram(
+    "elca_task_seconds", "End-to-end task processing time.", ("agent_type", "status")
+)
+TASK_QUEUE_DEPTH = REGISTRY.gauge("elca_task_queue_depth", "Tasks waiting in the in-process execution queue.")
+TASKS_RUNNING = REGISTRY.gauge("elca_tasks_running", "Tasks currently being processed in this process.")
+
+# AI providers
+AI_REQUEST_SECONDS = REGISTRY.histogram(
+    "elca_ai_request_seconds", "Provider call latency per attempt.", ("provider", "use_case", "outcome")
+)
+AI_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    "elca_ai_first_token_seconds", "Time to the first streamed chunk.", ("provider", "use_case")
+)
+AI_TOKENS = REGISTRY.counter(
+    "elca_ai_tokens_total", "Tokens reported by providers.", ("provider", "model", "direction")
+)
+AI_COST_USD = REGISTRY.counter("elca_ai_cost_usd_total", "Estimated provider cost in USD.", ("provider", "model"))
+AI_RATE_LIMIT_WAITING = REGISTRY.gauge(
+    "elca_ai_rate_limit_waiting", "Calls queued for a provider concurrency slot or rate budget.", ("provider",)
+)
+AI_IN_FLIGHT = REGISTRY.gauge("elca_ai_single_flight_in_flight", "Distinct upstream generations in flight.")
+
+# Caches
+CACHE_LOOKUPS = REGISTRY.counter(
+    "elca_cache_lookups_total", "Response cache lookups by cache and result.", ("cache", "result")
+)
+
+# Database
+DB_CONNECTIONS_CHECKED_OUT = REGISTRY.gauge(
+    "elca_db_connections_checked_out", "Database connections held by open sessions."
+)
+DB_POOL_SIZE = REGISTRY.gauge("elca_db_pool_size", "Connections kept in the database pool.")
+DB_WRITE_QUEUE_DEPTH = REGISTRY.gauge("elca_db_write_queue_depth", "Writes waiting for the SQLite writer connection.")
+DB_WRITE_BATCH_SIZE = REGISTRY.histogram(
+    "elca_db_write_batch_size", "Writes committed together by the SQLite writer.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
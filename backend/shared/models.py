@@ -1,26 +1,100 @@
 """
 Simplified database models for ELCA Blockbusters MVP.
-Uses SQLite for rapid development.
+Uses SQLite for local development and PostgreSQL (asyncpg) for multi-node deployments,
+selected by DATABASE_URL, with optional read-replica routing for read-only endpoints.
 """
 
+import os
+import re
 import uuid
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from enum import Enum
 
-from sqlalchemy import Column, String, Text, DateTime, JSON, ForeignKey, Integer
+from sqlalchemy import Column, String, Text, DateTime, JSON, ForeignKey, Index, Integer, event, inspect, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.sql import func
 from pydantic import BaseModel, Field, ConfigDict
 
-# Database configuration - SQLite for MVP
-DATABASE_URL = "sqlite+aiosqlite:///./elca_blockbusters.db"
+def normalize_database_url(url: str) -> str:
+    """Use the async driver for plain postgres:// URLs (as issued by Render and Heroku)."""
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            url = "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("postgresql+asyncpg://"):
+        # asyncpg takes ssl=, not libpq's sslmode=
+        url = url.replace("?sslmode=", "?ssl=").replace("&sslmode=", "&ssl=")
+    return url
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+# Database configuration - SQLite by default, PostgreSQL when DATABASE_URL points at it
+DATABASE_URL = normalize_database_url(os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./elca_blockbusters.db"))
+# Optional replica for read-only endpoints; unset means reads use the primary
+DATABASE_READ_REPLICA_URL = normalize_database_url(os.getenv("DATABASE_READ_REPLICA_URL", ""))
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Prepared statements cached per asyncpg connection; set 0 behind PgBouncer in transaction mode
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+DB_COMMAND_TIMEOUT_SECONDS = float(os.getenv("DB_COMMAND_TIMEOUT_SECONDS", "60"))
+
+# SQLite connection pragmas: WAL lets reads run alongside the single writer
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "30000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+
+# Indexes added to existing tables are built by `python -m migrate`; enable only for single-process deployments
+DB_CREATE_INDEXES_ON_STARTUP = os.getenv("DB_CREATE_INDEXES_ON_STARTUP", "false").lower() == "true"
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Configure every new SQLite connection for concurrent access."""
+    cursor = dbapi_connection.cursor()
+    for pragma in (
+        f"journal_mode={SQLITE_JOURNAL_MODE}",
+        f"synchronous={SQLITE_SYNCHRONOUS}",
+        f"busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"mmap_size={SQLITE_MMAP_SIZE}",
+        f"cache_size=-{SQLITE_CACHE_SIZE_KB}",
+        "temp_store=MEMORY"
+    ):
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+def create_engine_from_url(url: str):
+    """Async engine with pool settings for the URL's backend."""
+    options: Dict[str, Any] = {"echo": SQL_ECHO}
+    if ":memory:" not in url:
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT_SECONDS)
+    if url.startswith("postgresql"):
+        options.update(
+            # Drop connections the server or a load balancer closed while idle
+            pool_pre_ping=DB_POOL_PRE_PING,
+            pool_recycle=DB_POOL_RECYCLE_SECONDS,
+            connect_args={
+                "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+                "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+                "command_timeout": DB_COMMAND_TIMEOUT_SECONDS,
+                "server_settings": {"application_name": "elca-blockbusters"}
+            }
+        )
+    async_engine = create_async_engine(url, **options)
+    if url.startswith("sqlite"):
+        event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return async_engine
+
+engine = create_engine_from_url(DATABASE_URL)
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+read_engine = create_engine_from_url(DATABASE_READ_REPLICA_URL) if DATABASE_READ_REPLICA_URL else engine
+read_session_maker = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+
 Base = declarative_base()
 
 # Enums
@@ -80,6 +154,13 @@ class Agent(Base):
 class Task(Base):
     """Task tracking table."""
     __tablename__ = "tasks"
+    # Listings page by (created_at, id) within an optional equality filter
+    __table_args__ = (
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_agent_created_at", "agent_id", "created_at", "id"),
+        Index("ix_tasks_user_created_at", "user_id", "created_at", "id"),
+        Index("ix_tasks_status_created_at", "status", "created_at", "id"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, default="demo-user")
@@ -88,9 +169,19 @@ class Task(Base):
     output_data = Column(JSON)
     status = Column(String(50), default=TaskStatus.PENDING)
     error_message = Column(Text)
-    created_at = Column(DateTime, server_default=func.now())
+    # Set client-side at microsecond precision so keyset cursors can compare it exactly
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
     completed_at = Column(DateTime)
     
+    # Summary projection filled at write time, so listings need not load the JSON blobs
+    title = Column(String(255))
+    preview = Column(Text)
+    
+    # Lease-based claiming for background workers
+    lease_owner = Column(String(255))
+    lease_expires_at = Column(DateTime)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    
     # Relationships
     agent = relationship("Agent", back_populates="tasks")
 
@@ -159,6 +250,27 @@ class TaskResponse(BaseModel):
     error_message: Optional[str]
     created_at: datetime
     completed_at: Optional[datetime]
+    title: Optional[str] = None
+    preview: Optional[str] = None
+
+class TaskListItem(BaseModel):
+    """Schema for a task in a listing; only the fields selected with ?fields= are present."""
+    id: Optional[str] = None
+    user_id: Optional[str] = None
+    agent_id: Optional[str] = None
+    input_data: Optional[Dict[str, Any]] = None
+    output_data: Optional[Dict[str, Any]] = None
+    status: Optional[str] = None
+    error_message: Optional[str] = None
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    title: Optional[str] = None
+    preview: Optional[str] = None
+
+class TaskListResponse(BaseModel):
+    """Schema for a page of tasks; pass next_cursor as ?cursor= to get the next page."""
+    items: List[TaskListItem]
+    next_cursor: Optional[str] = None
 
 # Database dependency
 async def get_db() -> AsyncSession:
@@ -169,8 +281,85 @@ async def get_db() -> AsyncSession:
         finally:
             await session.close()
 
+async def get_read_db() -> AsyncSession:
+    """Get a session for read-only endpoints (the replica when configured; may lag the primary)."""
+    async with read_session_maker() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+def _add_missing_columns(connection):
+    """Add columns introduced after a table was first created (create_all never alters tables)."""
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            
+            column_type = column.type.compile(dialect=connection.dialect)
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            connection.execute(text(ddl))
+
+def create_missing_indexes(connection) -> List[str]:
+    """Build indexes introduced after a table was first created; returns their names.
+    
+    Needs a connection in AUTOCOMMIT mode: on PostgreSQL the indexes are built
+    CONCURRENTLY so writes continue during the build, and an invalid index left by
+    an interrupted concurrent build is dropped and built again.
+    """
+    inspector = inspect(connection)
+    postgres = connection.dialect.name == "postgresql"
+    invalid = set()
+    if postgres:
+        invalid = set(connection.execute(text(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid"
+        )).scalars())
+    
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        
+        existing = {index["name"] for index in inspector.get_indexes(table.name)} - invalid
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            
+            ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=connection.dialect))
+            if postgres:
+                if index.name in invalid:
+                    connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+                ddl = re.sub(r"^CREATE (UNIQUE )?INDEX", r"CREATE \1INDEX CONCURRENTLY", ddl)
+            connection.execute(text(ddl))
+            created.append(index.name)
+    return created
+
+async def create_indexes() -> List[str]:
+    """Build missing indexes; run from a single process (python -m migrate)."""
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        return await conn.run_sync(create_missing_indexes)
+
+# Advisory lock held while a process creates or alters tables at startup
+SCHEMA_LOCK_KEY = 0x454C4341
+
 # Initialize database
 async def init_db():
-    """Initialize database tables."""
+    """Initialize database tables and add missing columns."""
     async with engine.begin() as conn:
+        # Processes starting together take turns, so each sees the schema the previous one left
+        if engine.dialect.name == "postgresql":
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        elif engine.dialect.name == "sqlite":
+            await conn.exec_driver_sql("BEGIN IMMEDIATE")
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+    if DB_CREATE_INDEXES_ON_STARTUP:
+        await create_indexes()
@@ -0,0 +1,205 @@
+"""
+Versioned in-memory snapshot of the ELCA ontology and agent registry.
+Values, beliefs and agents almost never change, so the task hot path reads
+them from an immutable snapshot instead of querying the database per task.
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import structlog
+
+from shared.models import Value, Belief, Agent
+
+logger = structlog.get_logger()
+
+# Writes made by other processes become visible after at most this many seconds
+ONTOLOGY_SNAPSHOT_TTL_SECONDS = float(os.getenv("ONTOLOGY_SNAPSHOT_TTL_SECONDS", "60"))
+
+_ontology_version = 0
+
+def get_ontology_version() -> int:
+    """Current in-process ontology version."""
+    return _ontology_version
+
+def bump_ontology_version():
+    """Invalidate all snapshots after an ontology or agent registry write."""
+    global _ontology_version
+    _ontology_version += 1
+
+@event.listens_for(Session, "after_flush")
+def _track_ontology_writes(session, flush_context):
+    """Flag sessions that wrote values, beliefs or agents."""
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, (Value, Belief, Agent)):
+            session.info["ontology_dirty"] = True
+            return
+
+@event.listens_for(Session, "after_commit")
+def _bump_on_ontology_commit(session):
+    if session.info.pop("ontology_dirty", False):
+        bump_ontology_version()
+
+@event.listens_for(Session, "after_rollback")
+def _clear_on_rollback(session):
+    session.info.pop("ontology_dirty", None)
+
+@dataclass(frozen=True)
+class ValueRecord:
+    """Immutable copy of a value row."""
+    id: str
+    name: str
+    description: str
+
+@dataclass(frozen=True)
+class BeliefRecord:
+    """Immutable copy of a belief row."""
+    id: str
+    name: str
+    description: str
+    related_values: Tuple[str, ...]
+
+@dataclass(frozen=True)
+class AgentRecord:
+    """Immutable copy of an agent registry row."""
+    id: str
+    name: str
+    agent_type: str
+    capabilities: Mapping[str, Any]
+    status: str
+
+@dataclass(frozen=True)
+class OntologySnapshot:
+    """Pre-indexed, pre-rendered view of a tenant's ontology and agents."""
+    tenant_id: str
+    version: int
+    fingerprint: str
+    values: Tuple[ValueRecord, ...]
+    beliefs: Tuple[BeliefRecord, ...]
+    agents: Tuple[AgentRecord, ...]
+    values_by_name: Mapping[str, ValueRecord]
+    beliefs_by_name: Mapping[str, BeliefRecord]
+    agents_by_id: Mapping[str, AgentRecord]
+    agents_by_type: Mapping[str, AgentRecord]
+    values_text: str
+    beliefs_text: str
+    built_at: float = field(default_factory=time.monotonic)
+
+    def is_fresh(self) -> bool:
+        return (
+            self.version == _ontology_version
+            and time.monotonic() - self.built_at < ONTOLOGY_SNAPSHOT_TTL_SECONDS
+        )
+
+def build_snapshot(
+    tenant_id: str,
+    version: int,
+    values: Tuple[ValueRecord, ...],
+    beliefs: Tuple[BeliefRecord, ...],
+    agents: Tuple[AgentRecord, ...]
+) -> OntologySnapshot:
+    """Index records and render the prompt fragments once."""
+    values_text = "\n".join([f"- {v.name}: {v.description}" for v in values])
+    beliefs_text = "\n".join([f"- {b.name}: {b.description}" for b in beliefs])
+
+    # Content hash, identical across processes for the same ontology
+    fingerprint = hashlib.sha256(f"{values_text}\n\n{beliefs_text}".encode("utf-8")).hexdigest()[:16]
+
+    return OntologySnapshot(
+        tenant_id=tenant_id,
+        version=version,
+        fingerprint=fingerprint,
+        values=values,
+        beliefs=beliefs,
+        agents=agents,
+        values_by_name=MappingProxyType({v.name: v for v in values}),
+        beliefs_by_name=MappingProxyType({b.name: b for b in beliefs}),
+        agents_by_id=MappingProxyType({a.id: a for a in agents}),
+        agents_by_type=MappingProxyType({a.agent_type: a for a in agents}),
+        values_text=values_text,
+        beliefs_text=beliefs_text
+    )
+
+class OntologySnapshotStore:
+    """Per-tenant snapshot cache, rebuilt when the version changes or the TTL lapses."""
+
+    def __init__(self):
+        self._snapshots: Dict[str, OntologySnapshot] = {}
+        self._lock = asyncio.Lock()
+
+    def peek(self, tenant_id: str) -> Optional[OntologySnapshot]:
+        """Get the cached snapshot without refreshing it."""
+        return self._snapshots.get(tenant_id)
+
+    async def get(self, db: AsyncSession, tenant_id: str) -> OntologySnapshot:
+        """Get a fresh snapshot, loading it from the database if needed."""
+        snapshot = self._snapshots.get(tenant_id)
+        if snapshot and snapshot.is_fresh():
+            return snapshot
+
+        async with self._lock:
+            snapshot = self._snapshots.get(tenant_id)
+            if snapshot and snapshot.is_fresh():
+                return snapshot
+
+            snapshot = await self._load(db, tenant_id)
+            self._snapshots[tenant_id] = snapshot
+            logger.info(
+                "Ontology snapshot built",
+                tenant_id=tenant_id,
+                version=snapshot.version,
+                fingerprint=snapshot.fingerprint
+            )
+            return snapshot
+
+    def invalidate(self):
+        """Drop all cached snapshots."""
+        self._snapshots.clear()
+
+    async def _load(self, db: AsyncSession, tenant_id: str) -> OntologySnapshot:
+        # Read the version first so a concurrent write forces another rebuild
+        version = _ontology_version
+
+        values_result = await db.execute(
+            select(Value).where(Value.tenant_id == tenant_id).order_by(Value.created_at.desc())
+        )
+        beliefs_result = await db.execute(
+            select(Belief).where(Belief.tenant_id == tenant_id).order_by(Belief.created_at.desc())
+        )
+        agents_result = await db.execute(select(Agent).order_by(Agent.created_at))
+
+        values = tuple(
+            ValueRecord(id=v.id, name=v.name, description=v.description)
+            for v in values_result.scalars().all()
+        )
+        beliefs = tuple(
+            BeliefRecord(
+                id=b.id,
+                name=b.name,
+                description=b.description,
+                related_values=tuple(b.related_values or ())
+            )
+            for b in beliefs_result.scalars().all()
+        )
+        agents = tuple(
+            AgentRecord(
+                id=a.id,
+                name=a.name,
+                agent_type=a.agent_type,
+                capabilities=MappingProxyType(dict(a.capabilities or {})),
+                status=a.status
+            )
+            for a in agents_result.scalars().all()
+        )
+
+        return build_snapshot(tenant_id, version, values, beliefs, agents)
+
+# Process-wide snapshot store
+ontology_snapshots = OntologySnapshotStore()
@@ -0,0 +1,42 @@
+"""
+Model pricing for ELCA Blockbusters cost estimates and cost-aware routing.
+Prices are USD per million input / output tokens and can be overridden via
+AI_MODEL_PRICING="model=input:output,...".
+"""
+
+import os
+from typing import Dict, Tuple
+import structlog
+
+logger = structlog.get_logger()
+
+DEFAULT_MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "claude-sonnet-4-5": (3.00, 15.00),
+    "claude-haiku-4-5": (1.00, 5.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "grok-beta": (5.00, 15.00),
+}
+
+# Used for models missing from the table, so they are never treated as free
+FALLBACK_PRICING = (10.00, 30.00)
+
+def _load_pricing() -> Dict[str, Tuple[float, float]]:
+    pricing = dict(DEFAULT_MODEL_PRICING)
+    for entry in os.getenv("AI_MODEL_PRICING", "").split(","):
+        if not entry.strip():
+            continue
+        try:
+            model, prices = entry.split("=", 1)
+            input_price, output_price = prices.split(":", 1)
+            pricing[model.strip()] = (float(input_price), float(output_price))
+        except ValueError:
+            logger.warning("Ignoring invalid AI_MODEL_PRICING entry", entry=entry)
+    return pricing
+
+MODEL_PRICING = _load_pricing()
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """Estimated USD cost of a call."""
+    input_price, output_price = MODEL_PRICING.get(model, FALLBACK_PRICING)
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
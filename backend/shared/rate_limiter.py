@@ -0,0 +1,203 @@
+"""
+Per-provider concurrency limits and adaptive token-bucket rate limiting.
+Calls queue in FIFO order until a concurrency slot and request/token budget
+are available; limits back off on 429s (honoring retry-after) and recover
+gradually, so bursts stay under provider quotas instead of cascading.
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+import structlog
+
+logger = structlog.get_logger()
+
+# Share of the configured rate kept after a 429, and the floor it never drops below
+RATE_LIMIT_BACKOFF = 0.5
+RATE_LIMIT_MIN_FACTOR = 0.1
+RATE_LIMIT_RECOVERY_STEP = 0.05
+# Default pause after a 429 without a retry-after header
+RATE_LIMIT_DEFAULT_RETRY_SECONDS = 1.0
+
+class RateLimitTimeout(RuntimeError):
+    """Raised when a call could not be admitted before its deadline."""
+
+class _TokenBucket:
+    """Per-minute budget with up to ten seconds of burst."""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = max(1.0, per_minute / 6)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, factor: float):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_minute * factor / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float, factor: float) -> float:
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / (self.per_minute * factor / 60)
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+class ProviderRateLimiter:
+    """FIFO admission control for one provider.
+
+    A limit of 0 disables that dimension. The concurrency limit and the rate
+    factor halve on a 429 and recover additively on success (AIMD).
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 16, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency_limit = self.max_concurrency
+        self.rate_factor = 1.0
+        self._requests = _TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._in_flight = 0
+        self._successes = 0
+        self._blocked_until = 0.0
+        self._waiters: Deque[object] = deque()
+        self._changed = asyncio.Event()
+        self.stats = {"admitted": 0, "queued": 0, "wait_seconds": 0.0, "rate_limited": 0, "timeouts": 0}
+
+    @classmethod
+    def from_env(cls, provider: str) -> "ProviderRateLimiter":
+        """Limits from AI_<PROVIDER>_MAX_CONCURRENCY / _RPM / _TPM."""
+        prefix = f"AI_{provider.upper()}"
+        return cls(
+            provider,
+            max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", "16")),
+            requests_per_minute=float(os.getenv(f"{prefix}_RPM", "0")),
+            tokens_per_minute=float(os.getenv(f"{prefix}_TPM", "0"))
+        )
+
+    async def acquire(self, tokens: int, timeout: float):
+        """Wait in line for a slot and budget for a call of about `tokens` tokens."""
+        ticket = object()
+        self._waiters.append(ticket)
+        started = time.monotonic()
+        deadline = started + timeout
+        queued = False
+        try:
+            while True:
+                delay = self._admission_delay(tokens) if self._waiters[0] is ticket else None
+                if delay == 0.0:
+                    self._admit(tokens)
+                    self._waiters.popleft()
+                    if queued:
+                        self.stats["wait_seconds"] += time.monotonic() - started
+                    return
+
+                if not queued:
+                    queued = True
+                    self.stats["queued"] += 1
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats["timeouts"] += 1
+                    raise RateLimitTimeout(f"Rate limit queue timeout for {self.name}")
+
+                changed = self._changed
+                try:
+                    await asyncio.wait_for(changed.wait(), min(remaining, delay) if delay else remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+                self._notify()
+
+    def release(self):
+        """Return the concurrency slot of an admitted call."""
+        self._in_flight = max(0, self._in_flight - 1)
+        self._notify()
+
+    def on_success(self):
+        """Recover limits gradually after successful calls."""
+        self._successes += 1
+        if self.rate_factor < 1.0:
+            self.rate_factor = min(1.0, self.rate_factor + RATE_LIMIT_RECOVERY_STEP)
+        if self.concurrency_limit < self.max_concurrency and self._successes >= self.concurrency_limit:
+            self._successes = 0
+            self.concurrency_limit += 1
+            self._notify()
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        """Back off after a 429, pausing admissions for retry-after seconds."""
+        self.stats["rate_limited"] += 1
+        self._successes = 0
+        self.rate_factor = max(RATE_LIMIT_MIN_FACTOR, self.rate_factor * RATE_LIMIT_BACKOFF)
+        self.concurrency_limit = max(1, self.concurrency_limit // 2)
+        pause = retry_after if retry_after is not None else RATE_LIMIT_DEFAULT_RETRY_SECONDS
+        self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+        logger.warning(
+            "Provider rate limited, backing off",
+            provider=self.name,
+            retry_after=pause,
+            concurrency_limit=self.concurrency_limit,
+            rate_factor=round(self.rate_factor, 2)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "wait_seconds": round(self.stats["wait_seconds"], 3),
+            "in_flight": self._in_flight,
+            "waiting": len(self._waiters),
+            "concurrency_limit": self.concurrency_limit,
+            "rate_factor": round(self.rate_factor, 3)
+        }
+
+    def _admission_delay(self, tokens: int) -> Optional[float]:
+        """0 if the call can start now, seconds until it might, or None to wait for a slot."""
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._in_flight >= self.concurrency_limit:
+            return None
+
+        delay = 0.0
+        for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+            if bucket is not None:
+                bucket.refill(self.rate_factor)
+                delay = max(delay, bucket.wait_time(amount, self.rate_factor))
+        return delay
+
+    def _admit(self, tokens: int):
+        if self._requests is not None:
+            self._requests.take(1)
+        if self._tokens is not None:
+            self._tokens.take(tokens)
+        self._in_flight += 1
+        self.stats["admitted"] += 1
+        self._notify()
+
+    def _notify(self):
+        """Wake all waiters so the new head of the line re-checks admission."""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Whether a provider error is an HTTP 429."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """The retry-after header of a 429 response, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
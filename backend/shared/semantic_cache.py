@@ -0,0 +1,215 @@
+"""
+Semantic near-duplicate cache for ELCA Blockbusters generated content.
+Prompts are vectorized locally with a signed hashing vectorizer and matched by
+cosine similarity against a NumPy matrix, so "youth retreat on identity" can
+reuse the answer for "identity-themed youth retreat" without an external
+embedding service.
+"""
+
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import structlog
+
+try:
+    import numpy as np
+except ImportError:  # Semantic caching is disabled without NumPy
+    np = None
+
+logger = structlog.get_logger()
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+_STOPWORDS = frozenset("""
+a an and are as at be by for from how in into is it of on or our the their this
+to what with about themed theme focused based around
+""".split())
+
+def _normalize_token(token: str) -> str:
+    """Very light stemming so plurals and possessives collapse."""
+    token = token.strip("'")
+    if token.endswith("'s"):
+        token = token[:-2]
+    if len(token) > 4 and token.endswith("ies"):
+        token = token[:-3] + "y"
+    elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        token = token[:-1]
+    return token
+
+class HashingVectorizer:
+    """Signed feature hashing of word unigrams and character trigrams."""
+
+    def __init__(self, dimensions: int = 1024, char_ngram_weight: float = 0.3):
+        self.dimensions = dimensions
+        self.char_ngram_weight = char_ngram_weight
+
+    def features(self, text: str) -> List[Tuple[str, float]]:
+        tokens = [_normalize_token(t) for t in _TOKEN.findall(text.lower())]
+        tokens = [t for t in tokens if t and t not in _STOPWORDS]
+
+        features = [(f"w:{token}", 1.0) for token in tokens]
+        for token in tokens:
+            padded = f"^{token}$"
+            features.extend(
+                (f"c:{padded[i:i + 3]}", self.char_ngram_weight) for i in range(len(padded) - 2)
+            )
+        return features
+
+    def transform(self, text: str) -> Optional["np.ndarray"]:
+        """L2-normalized float32 vector, or None if the text has no features."""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, weight in self.features(text):
+            hashed = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if hashed & 0x80000000 else -1.0
+            vector[hashed % self.dimensions] += sign * weight
+
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            return None
+        return vector / norm
+
+class _Partition:
+    """Vectors and responses for one (use case, scope, model, ...) partition."""
+
+    def __init__(self, dimensions: int):
+        self.matrix = np.zeros((8, dimensions), dtype=np.float32)
+        self.responses: List[str] = []
+        self.last_used: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.responses)
+
+    def add(self, vector: "np.ndarray", response: str):
+        size = len(self.responses)
+        if size == self.matrix.shape[0]:
+            grown = np.zeros((size * 2, self.matrix.shape[1]), dtype=np.float32)
+            grown[:size] = self.matrix
+            self.matrix = grown
+        self.matrix[size] = vector
+        self.responses.append(response)
+        self.last_used.append(time.monotonic())
+
+    def top_k(self, vector: "np.ndarray", k: int) -> List[Tuple[int, float]]:
+        """Indices and cosine similarities of the k closest entries, best first."""
+        size = len(self.responses)
+        if size == 0:
+            return []
+        similarities = self.matrix[:size] @ vector
+        k = min(k, size)
+        candidates = np.argpartition(-similarities, k - 1)[:k]
+        ordered = candidates[np.argsort(-similarities[candidates])]
+        return [(int(i), float(similarities[i])) for i in ordered]
+
+    def evict_lru(self):
+        """Remove the least recently used entry (swap-with-last, O(dimensions))."""
+        victim = min(range(len(self.last_used)), key=self.last_used.__getitem__)
+        last = len(self.responses) - 1
+        if victim != last:
+            self.matrix[victim] = self.matrix[last]
+            self.responses[victim] = self.responses[last]
+            self.last_used[victim] = self.last_used[last]
+        self.responses.pop()
+        self.last_used.pop()
+
+class SemanticCache:
+    """Cosine-similarity cache over hashed prompt vectors with bounded memory."""
+
+    def __init__(
+        self,
+        enabled_use_cases: Iterable[str] = (),
+        threshold: float = 0.85,
+        top_k: int = 3,
+        max_entries: int = 2000,
+        dimensions: int = 1024
+    ):
+        self.enabled_use_cases = set(enabled_use_cases)
+        self.threshold = threshold
+        self.top_k = top_k
+        self.max_entries = max_entries
+        self.vectorizer = HashingVectorizer(dimensions) if np is not None else None
+        self._partitions: "OrderedDict[Tuple, _Partition]" = OrderedDict()
+        self._size = 0
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        if self.enabled_use_cases and np is None:
+            logger.warning("NumPy not installed, semantic cache disabled")
+
+    @classmethod
+    def from_env(cls) -> "SemanticCache":
+        """Configure the cache from environment variables."""
+        use_cases = [u.strip() for u in os.getenv("SEMANTIC_CACHE_USE_CASES", "").split(",") if u.strip()]
+        return cls(
+            enabled_use_cases=use_cases,
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85")),
+            top_k=int(os.getenv("SEMANTIC_CACHE_TOP_K", "3")),
+            max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000")),
+            dimensions=int(os.getenv("SEMANTIC_CACHE_DIMENSIONS", "1024"))
+        )
+
+    def is_enabled_for(self, use_case: str) -> bool:
+        return self.vectorizer is not None and use_case in self.enabled_use_cases
+
+    def lookup(self, partition_key: Tuple, text: str) -> Optional[str]:
+        """Return a cached response whose key text is similar enough to `text`."""
+        partition = self._partitions.get(partition_key)
+        vector = self.vectorizer.transform(text)
+        if partition is None or vector is None:
+            self.stats["misses"] += 1
+            return None
+
+        matches = [
+            (index, similarity)
+            for index, similarity in partition.top_k(vector, self.top_k)
+            if similarity >= self.threshold
+        ]
+        if matches:
+            index, similarity = matches[0]
+            partition.last_used[index] = time.monotonic()
+            self._partitions.move_to_end(partition_key)
+            self.stats["hits"] += 1
+            logger.info("Semantic cache hit", similarity=round(similarity, 3), candidates=len(matches))
+            return partition.responses[index]
+
+        self.stats["misses"] += 1
+        return None
+
+    def store(self, partition_key: Tuple, text: str, response: str):
+        """Add a response, evicting least recently used entries beyond max_entries."""
+        vector = self.vectorizer.transform(text)
+        if vector is None:
+            return
+
+        partition = self._partitions.get(partition_key)
+        if partition is None:
+            partition = self._partitions[partition_key] = _Partition(self.vectorizer.dimensions)
+        self._partitions.move_to_end(partition_key)
+
+        partition.add(vector, response)
+        self._size += 1
+        self.stats["writes"] += 1
+
+        while self._size > self.max_entries:
+            self._evict_one()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": self._size,
+            "partitions": len(self._partitions),
+            "threshold": self.threshold,
+            "enabled_use_cases": sorted(self.enabled_use_cases) if self.vectorizer else []
+        }
+
+    def _evict_one(self):
+        """Evict from the least recently used partition."""
+        partition_key, partition = next(iter(self._partitions.items()))
+        partition.evict_lru()
+        if not len(partition):
+            del self._partitions[partition_key]
+        self._size -= 1
+        self.stats["evictions"] += 1
@@ -0,0 +1,59 @@
+"""
+Single-flight coalescing of identical in-flight requests.
+Concurrent callers with the same key share one upstream call and its result.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+class _Flight:
+    """One shared upstream call and the number of callers waiting on it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Table of in-flight calls keyed by request identity."""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.stats = {"leaders": 0, "coalesced": 0, "abandoned": 0}
+
+    async def do(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Run `call` once per key at a time; concurrent callers await the same result.
+
+        Errors propagate to every waiter. A waiter being cancelled does not affect
+        the others; the upstream call is cancelled only when the last waiter leaves.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody is interested in the result any more
+                flight.task.cancel()
+                self._forget(key, flight)
+                self.stats["abandoned"] += 1
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "in_flight": len(self._flights)}
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
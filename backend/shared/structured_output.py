@@ -0,0 +1,176 @@
+"""
+Local JSON-schema validation and repair for structured LLM output.
+Schemas are compiled once into validator closures; malformed responses get a
+cheap local repair pass (fence stripping, trailing prose, truncation) before
+anyone pays for a re-ask.
+"""
+
+import re
+import json
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Validator = Callable[[Any, str], List[str]]
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+_DECODER = json.JSONDecoder()
+
+# How many truncation points to try when closing a cut-off response
+MAX_REPAIR_CUTS = 20
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "boolean": lambda v: isinstance(v, bool),
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool)) or (isinstance(v, float) and v.is_integer()),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+def _compile(schema: Dict[str, Any]) -> Validator:
+    """Turn a (subset of) JSON schema into a validator returning error messages."""
+    checks: List[Validator] = []
+
+    expected = schema.get("type")
+    if expected:
+        types = [expected] if isinstance(expected, str) else list(expected)
+        type_checks = [_TYPE_CHECKS[t] for t in types if t in _TYPE_CHECKS]
+
+        def check_type(value: Any, path: str) -> List[str]:
+            if any(check(value) for check in type_checks):
+                return []
+            return [f"{path}: expected {'/'.join(types)}, got {type(value).__name__}"]
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+        checks.append(lambda v, p: [] if v in allowed else [f"{p}: must be one of {allowed}"])
+
+    minimum, maximum = schema.get("minimum"), schema.get("maximum")
+    if minimum is not None or maximum is not None:
+        def check_range(value: Any, path: str) -> List[str]:
+            if not _TYPE_CHECKS["number"](value):
+                return []
+            if minimum is not None and value < minimum:
+                return [f"{path}: {value} is below minimum {minimum}"]
+            if maximum is not None and value > maximum:
+                return [f"{path}: {value} is above maximum {maximum}"]
+            return []
+        checks.append(check_range)
+
+    properties = {name: _compile(sub) for name, sub in schema.get("properties", {}).items()}
+    required = list(schema.get("required", []))
+    additional = schema.get("additionalProperties", True)
+    additional_check = _compile(additional) if isinstance(additional, dict) else None
+    if properties or required or additional is not True:
+        def check_object(value: Any, path: str) -> List[str]:
+            if not isinstance(value, dict):
+                return []
+            errors = [f"{path}: missing required property '{name}'" for name in required if name not in value]
+            for name, item in value.items():
+                if name in properties:
+                    errors.extend(properties[name](item, f"{path}.{name}"))
+                elif additional is False:
+                    errors.append(f"{path}: unexpected property '{name}'")
+                elif additional_check:
+                    errors.extend(additional_check(item, f"{path}.{name}"))
+            return errors
+        checks.append(check_object)
+
+    if isinstance(schema.get("items"), dict):
+        item_check = _compile(schema["items"])
+
+        def check_items(value: Any, path: str) -> List[str]:
+            if not isinstance(value, list):
+                return []
+            errors = []
+            for index, item in enumerate(value):
+                errors.extend(item_check(item, f"{path}[{index}]"))
+            return errors
+        checks.append(check_items)
+
+    def validate(value: Any, path: str = "$") -> List[str]:
+        errors = []
+        for check in checks:
+            errors.extend(check(value, path))
+        return errors
+    return validate
+
+@lru_cache(maxsize=64)
+def _compile_cached(schema_json: str) -> Validator:
+    return _compile(json.loads(schema_json))
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    """Compiled validator for a schema, cached by schema content."""
+    return _compile_cached(json.dumps(schema, sort_keys=True))
+
+def _close_truncated(text: str) -> List[str]:
+    """Candidate completions of JSON that was cut off mid-way, best first."""
+    stack: List[str] = []
+    cuts: List[Tuple[int, Tuple[str, ...]]] = []
+    in_string = escaped = False
+
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+        elif char == ",":
+            # Everything before this comma is complete at this depth
+            cuts.append((index, tuple(stack)))
+
+    candidates = []
+    tail = text + ('"' if in_string else "")
+    tail = tail.rstrip()
+    if tail.endswith(":"):
+        tail += " null"
+    candidates.append(tail.rstrip(",") + "".join(reversed(stack)))
+
+    for index, cut_stack in reversed(cuts[-MAX_REPAIR_CUTS:]):
+        candidates.append(text[:index] + "".join(reversed(cut_stack)))
+    return candidates
+
+def repair_json(text: str) -> Optional[Any]:
+    """Best-effort recovery of a JSON value from an LLM response, or None."""
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        return None
+    text = text[min(starts):]
+
+    # Trailing prose after a complete value
+    try:
+        value, _ = _DECODER.raw_decode(text)
+        return value
+    except json.JSONDecodeError:
+        pass
+
+    for candidate in _close_truncated(text):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+def parse_structured_output(text: str, validator: Validator) -> Tuple[Optional[Any], List[str]]:
+    """Parse (repairing if needed) and validate a response; returns the value and any errors."""
+    try:
+        value = json.loads(text)
+    except json.JSONDecodeError:
+        value = repair_json(text)
+        if value is None:
+            return None, ["response is not valid JSON"]
+    return value, validator(value)
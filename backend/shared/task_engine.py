@@ -0,0 +1,111 @@
+"""
+In-process async task execution engine for ELCA Blockbusters.
+Runs submitted tasks in the background so API requests return immediately.
+"""
+
+import os
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+import structlog
+
+logger = structlog.get_logger()
+
+TaskRunner = Callable[[str], Awaitable[None]]
+
+class TaskExecutionEngine:
+    """Bounded in-process queue with a fixed pool of async workers."""
+
+    def __init__(
+        self,
+        runner: TaskRunner,
+        concurrency: Optional[int] = None,
+        max_queue_size: Optional[int] = None
+    ):
+        self.runner = runner
+        self.concurrency = concurrency or int(os.getenv("TASK_ENGINE_CONCURRENCY", "8"))
+        self.max_queue_size = max_queue_size or int(os.getenv("TASK_ENGINE_MAX_QUEUE", "1000"))
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._workers: List[asyncio.Task] = []
+        self._completion_events: Dict[str, asyncio.Event] = {}
+        self._running_tasks = 0
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self):
+        """Start the worker coroutines."""
+        if self._workers:
+            return
+
+        for index in range(self.concurrency):
+            self._workers.append(asyncio.create_task(self._worker_loop(index)))
+
+        logger.info("Task execution engine started", concurrency=self.concurrency)
+
+    async def stop(self, timeout: float = 30.0):
+        """Drain queued work (bounded by timeout) and stop the workers."""
+        if not self._workers:
+            return
+
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Task execution engine stopped with queued work", queued=self.queue.qsize())
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        logger.info("Task execution engine stopped")
+
+    def submit(self, task_id: str):
+        """Enqueue a persisted task for background execution."""
+        self._completion_events.setdefault(task_id, asyncio.Event())
+        try:
+            self.queue.put_nowait(task_id)
+        except asyncio.QueueFull:
+            self._completion_events.pop(task_id, None)
+            raise
+
+    async def wait_for(self, task_id: str, timeout: float) -> bool:
+        """Wait until a locally executed task finishes. Returns False on timeout or unknown task.
+
+        Tasks this engine does not run (synchronous, streamed or executed by another
+        process) have no completion event, so the full timeout is slept instead.
+        """
+        event = self._completion_events.get(task_id)
+        if event is None:
+            await asyncio.sleep(timeout)
+            return False
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get queue statistics."""
+        return {
+            "queued": self.queue.qsize(),
+            "running": self._running_tasks,
+            "concurrency": self.concurrency
+        }
+
+    async def _worker_loop(self, index: int):
+        """Pull task IDs off the queue and run them."""
+        while True:
+            task_id = await self.queue.get()
+            self._running_tasks += 1
+            try:
+                await self.runner(task_id)
+            except Exception as e:
+                logger.error("Background task execution failed", task_id=task_id, worker=index, error=str(e))
+            finally:
+                self._running_tasks -= 1
+                self.queue.task_done()
+                event = self._completion_events.pop(task_id, None)
+                if event:
+                    event.set()
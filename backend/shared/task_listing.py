@@ -0,0 +1,147 @@
+"""
+Keyset-paginated task listings for ELCA Blockbusters.
+Pages are ordered newest first by (created_at, id) and continue from an opaque
+cursor, so every page is an index range scan no matter how large the table grows.
+Listings select only the requested columns and are returned as plain dicts.
+"""
+
+import os
+import json
+import base64
+import binascii
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from sqlalchemy import Select, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.models import Task, TaskResponse
+
+# Length of the output preview stored with each finished task
+TASK_PREVIEW_CHARS = int(os.getenv("TASK_PREVIEW_CHARS", "200"))
+
+TASK_FIELDS = tuple(TaskResponse.model_fields)
+SUMMARY_FIELDS = ("id", "agent_id", "user_id", "status", "title", "preview", "created_at", "completed_at")
+FIELD_PRESETS = {"full": TASK_FIELDS, "summary": SUMMARY_FIELDS}
+
+# Input keys that name what a task is about, most specific first
+_TITLE_KEYS = ("topic", "theme", "passage", "event_type", "mission", "focus_area", "project", "query")
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that was not produced by encode_cursor."""
+
+class InvalidFields(ValueError):
+    """Raised for a ?fields= selection naming unknown fields."""
+
+class TaskFilters(NamedTuple):
+    agent_id: Optional[str] = None
+    user_id: Optional[str] = None
+    status: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+def task_title(input_data: Dict[str, Any]) -> str:
+    """Short label for a task, e.g. "Sermon: God's Grace"."""
+    label = str(input_data.get("type", "task")).replace("_", " ").capitalize()
+    subject = next((input_data[key] for key in _TITLE_KEYS if input_data.get(key)), None)
+    title = f"{label}: {subject}" if subject else label
+    return title[:255]
+
+def task_preview(result: Any) -> str:
+    """First TASK_PREVIEW_CHARS characters of a task's output."""
+    return str(result)[:TASK_PREVIEW_CHARS]
+
+def parse_fields(fields: Optional[str]) -> Sequence[str]:
+    """Columns for a ?fields= value: a preset (full, summary) or a comma-separated list."""
+    if not fields:
+        return TASK_FIELDS
+    if fields in FIELD_PRESETS:
+        return FIELD_PRESETS[fields]
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in TASK_FIELDS]
+    if unknown or not selected:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown) or fields}")
+    return list(dict.fromkeys(selected))
+
+def encode_cursor(created_at: datetime, task_id: str) -> str:
+    """Opaque cursor pointing just past the task at (created_at, task_id)."""
+    position = [created_at.isoformat(), task_id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        created_at, task_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), str(task_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+def _as_utc_naive(value: datetime) -> datetime:
+    """Task timestamps are stored as naive UTC."""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+def build_task_list_query(
+    filters: TaskFilters,
+    limit: int,
+    cursor: Optional[str] = None,
+    fields: Sequence[str] = TASK_FIELDS
+) -> Select:
+    """Newest-first page query; fetches one extra row to tell whether another page follows."""
+    # The cursor columns are always selected; callers drop them if not requested
+    columns = dict.fromkeys((*fields, "created_at", "id"))
+    query = select(*(Task.__table__.c[name] for name in columns))
+    if filters.agent_id:
+        query = query.where(Task.agent_id == filters.agent_id)
+    if filters.user_id:
+        query = query.where(Task.user_id == filters.user_id)
+    if filters.status:
+        query = query.where(Task.status == filters.status)
+    if filters.created_after:
+        query = query.where(Task.created_at >= _as_utc_naive(filters.created_after))
+    if filters.created_before:
+        query = query.where(Task.created_at < _as_utc_naive(filters.created_before))
+    if cursor:
+        query = query.where(tuple_(Task.created_at, Task.id) < decode_cursor(cursor))
+    return query.order_by(Task.created_at.desc(), Task.id.desc()).limit(limit + 1)
+
+async def list_tasks(
+    db: AsyncSession,
+    filters: TaskFilters,
+    limit: int,
+    cursor: Optional[str] = None,
+    fields: Sequence[str] = TASK_FIELDS
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of tasks as dicts of `fields` and the next page's cursor (None on the last page)."""
+    result = await db.execute(build_task_list_query(filters, limit, cursor, fields))
+    rows = result.mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return [{field: row[field] for field in fields} for row in rows], next_cursor
+
+async def backfill_task_summaries(db: AsyncSession, batch_size: int = 500) -> int:
+    """Fill title and preview for tasks written before those columns existed; returns rows updated."""
+    pending = or_(Task.title.is_(None), Task.preview.is_(None) & Task.output_data.is_not(None))
+    updated = 0
+    last_id = ""
+    while True:
+        result = await db.execute(
+            select(Task.id, Task.input_data, Task.output_data, Task.title, Task.preview)
+            .where(pending, Task.id > last_id)
+            .order_by(Task.id)
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            return updated
+        
+        for task_id, input_data, output_data, title, preview in rows:
+            values = {}
+            if title is None:
+                values["title"] = task_title(input_data or {})
+            if preview is None and isinstance(output_data, dict) and output_data.get("result") is not None:
+                values["preview"] = task_preview(output_data["result"])
+            if values:
+                await db.execute(update(Task).where(Task.id == task_id).values(**values))
+                updated += 1
+        await db.commit()
+        last_id = rows[-1].id
@@ -0,0 +1,209 @@
+"""
+Lease-based task claiming for ELCA Blockbusters task executors.
+Both the in-process engine and standalone workers claim tasks through here,
+so a task is only ever processed by the current lease owner.
+"""
+
+import os
+import socket
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+from typing import Awaitable, List, Optional, TypeVar
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_, or_
+from sqlalchemy.orm.attributes import set_committed_value
+import structlog
+
+from shared.models import Task, TaskStatus, async_session_maker
+from shared.write_queue import execute_write
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+LEASE_SECONDS = float(os.getenv("TASK_LEASE_SECONDS", "120"))
+MAX_TASK_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "3"))
+
+class LeaseLost(Exception):
+    """Raised by run_with_lease when another owner took the task over and the work was abandoned."""
+
+def make_owner_id(prefix: str = "api") -> str:
+    """Build a unique lease owner ID for this process."""
+    return f"{prefix}:{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def _utcnow() -> datetime:
+    return datetime.utcnow()
+
+def _claimable(now: datetime, include_reserved: bool = False):
+    """Pending tasks, plus in-progress tasks whose lease expired (or predate leasing).
+    
+    A pending task with a future lease_expires_at is reserved (e.g. for a streaming
+    client about to connect) and is only claimable with include_reserved=True.
+    """
+    pending = Task.status == TaskStatus.PENDING
+    if not include_reserved:
+        pending = and_(pending, or_(Task.lease_expires_at.is_(None), Task.lease_expires_at < now))
+    
+    return and_(
+        Task.attempts < MAX_TASK_ATTEMPTS,
+        or_(
+            pending,
+            and_(
+                Task.status == TaskStatus.IN_PROGRESS,
+                or_(Task.lease_expires_at.is_(None), Task.lease_expires_at < now)
+            )
+        )
+    )
+
+async def claim_task(db: AsyncSession, task_id: str, owner: str, include_reserved: bool = False) -> bool:
+    """Atomically take the lease on a specific task."""
+    now = _utcnow()
+    rowcount = await execute_write(
+        db,
+        update(Task)
+        .where(Task.id == task_id, _claimable(now, include_reserved))
+        .values(
+            status=TaskStatus.IN_PROGRESS,
+            lease_owner=owner,
+            lease_expires_at=now + timedelta(seconds=LEASE_SECONDS),
+            attempts=Task.attempts + 1
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return rowcount == 1
+
+async def reserve_task(db: AsyncSession, task_id: str, seconds: float):
+    """Keep a pending task away from executors for a while (it stays claimable by ID)."""
+    await execute_write(
+        db,
+        update(Task)
+        .where(Task.id == task_id, Task.status == TaskStatus.PENDING)
+        .values(lease_expires_at=_utcnow() + timedelta(seconds=seconds))
+        .execution_options(synchronize_session=False)
+    )
+
+async def find_claimable_task_ids(
+    db: AsyncSession,
+    limit: int,
+    min_age_seconds: float = 0
+) -> List[str]:
+    """List claimable tasks, oldest first. min_age_seconds skips freshly submitted tasks."""
+    now = _utcnow()
+    query = select(Task.id).where(_claimable(now))
+    if min_age_seconds:
+        query = query.where(Task.created_at < now - timedelta(seconds=min_age_seconds))
+
+    result = await db.execute(query.order_by(Task.created_at).limit(limit))
+    task_ids = list(result.scalars().all())
+    await db.commit()
+    return task_ids
+
+async def claim_tasks(db: AsyncSession, owner: str, limit: int) -> List[str]:
+    """Claim up to `limit` tasks. Candidates taken by a competing worker are skipped."""
+    claimed = []
+    for task_id in await find_claimable_task_ids(db, limit * 2):
+        if await claim_task(db, task_id, owner):
+            claimed.append(task_id)
+            if len(claimed) >= limit:
+                break
+    return claimed
+
+async def renew_lease(db: AsyncSession, task_id: str, owner: str) -> bool:
+    """Extend our lease. Returns False if the lease was lost to another owner."""
+    rowcount = await execute_write(
+        db,
+        update(Task)
+        .where(
+            Task.id == task_id,
+            Task.lease_owner == owner,
+            Task.status == TaskStatus.IN_PROGRESS
+        )
+        .values(lease_expires_at=_utcnow() + timedelta(seconds=LEASE_SECONDS))
+        .execution_options(synchronize_session=False)
+    )
+    return rowcount == 1
+
+async def release_task(db: AsyncSession, task_id: str, owner: str):
+    """Hand an unfinished task back to the queue without counting the attempt."""
+    await execute_write(
+        db,
+        update(Task)
+        .where(
+            Task.id == task_id,
+            Task.lease_owner == owner,
+            Task.status == TaskStatus.IN_PROGRESS
+        )
+        .values(
+            status=TaskStatus.PENDING,
+            lease_owner=None,
+            lease_expires_at=None,
+            attempts=Task.attempts - 1
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+async def fail_exhausted_tasks(db: AsyncSession) -> int:
+    """Mark tasks that keep losing their lease (e.g. crash the worker) as failed."""
+    now = _utcnow()
+    rowcount = await execute_write(
+        db,
+        update(Task)
+        .where(
+            Task.attempts >= MAX_TASK_ATTEMPTS,
+            Task.status == TaskStatus.IN_PROGRESS,
+            or_(Task.lease_expires_at.is_(None), Task.lease_expires_at < now)
+        )
+        .values(
+            status=TaskStatus.FAILED,
+            error_message="Task abandoned after exceeding maximum attempts",
+            lease_owner=None,
+            lease_expires_at=None
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if rowcount:
+        logger.warning("Failed exhausted tasks", count=rowcount)
+    return rowcount
+
+async def update_task(db: AsyncSession, task: Task, **values):
+    """Write column values of a loaded task and mirror them on the object without dirtying the session."""
+    await execute_write(
+        db,
+        update(Task).where(Task.id == task.id).values(**values).execution_options(synchronize_session=False)
+    )
+    for key, value in values.items():
+        set_committed_value(task, key, value)
+
+async def _renew_until_done(task_id: str, owner: str, work: asyncio.Future) -> bool:
+    """Renew the lease periodically; cancel the work and return True if the lease is lost."""
+    interval = LEASE_SECONDS / 3
+    while not work.done():
+        await asyncio.sleep(interval)
+        try:
+            async with async_session_maker() as db:
+                still_owner = await renew_lease(db, task_id, owner)
+        except Exception as e:
+            logger.warning("Lease renewal failed", task_id=task_id, error=str(e))
+            continue
+
+        if not still_owner and not work.done():
+            logger.warning("Task lease lost, abandoning work", task_id=task_id, owner=owner)
+            work.cancel()
+            return True
+    return False
+
+async def run_with_lease(task_id: str, owner: str, work: Awaitable[T]) -> Optional[T]:
+    """Run `work` while keeping the task lease alive; raises LeaseLost if the lease is lost."""
+    work_future = asyncio.ensure_future(work)
+    renewer = asyncio.create_task(_renew_until_done(task_id, owner, work_future))
+    try:
+        return await work_future
+    except asyncio.CancelledError:
+        # Only the renewer's cancellation becomes LeaseLost; our own caller's propagates
+        if asyncio.current_task().cancelling() or not (renewer.done() and renewer.result()):
+            raise
+        raise LeaseLost(f"Lease on task {task_id} was lost") from None
+    finally:
+        renewer.cancel()
+        await asyncio.gather(renewer, return_exceptions=True)
@@ -0,0 +1,224 @@
+"""
+AI usage accounting shared across worker processes.
+Calls are counted in memory and flushed periodically into a SQLite table that
+every worker adds to, so usage stats and budgets reflect the whole deployment.
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import structlog
+
+logger = structlog.get_logger()
+
+USAGE_DB_PATH = os.getenv("USAGE_DB_PATH", "./ai_usage.db")
+USAGE_FLUSH_INTERVAL_SECONDS = float(os.getenv("USAGE_FLUSH_INTERVAL_SECONDS", "5"))
+
+# Tenant the current task is running for; set per task so nested AI calls are attributed to it
+current_tenant: ContextVar[str] = ContextVar("ai_usage_tenant", default="default")
+
+# (period, tenant, use_case, provider, model)
+UsageKey = Tuple[str, str, str, str, str]
+
+def current_period() -> str:
+    """Budget period (calendar month, UTC)."""
+    return datetime.now(timezone.utc).strftime("%Y-%m")
+
+def _add(target: Dict[UsageKey, List[float]], key: UsageKey, values: List[float]):
+    row = target.get(key)
+    if row is None:
+        target[key] = list(values)
+    else:
+        for i, value in enumerate(values):
+            row[i] += value
+
+class UsageStore:
+    """Per-process counters with periodic flush into a shared SQLite table.
+
+    Each counter row is [requests, input_tokens, output_tokens, cost_usd].
+    """
+
+    def __init__(self, db_path: Optional[str] = USAGE_DB_PATH, flush_interval: float = USAGE_FLUSH_INTERVAL_SECONDS):
+        self.flush_interval = flush_interval
+        self._pending: Dict[UsageKey, List[float]] = {}
+        self._flushing: Dict[UsageKey, List[float]] = {}
+        self._totals: Dict[UsageKey, List[float]] = {}  # All workers, as of the last flush
+        self._last_flush = time.monotonic()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+        if db_path:
+            try:
+                self._db = self._open_db(db_path)
+                self._totals = self._load_totals(current_period())
+            except sqlite3.Error as e:
+                logger.warning("Shared usage store unavailable, counting per process", path=db_path, error=str(e))
+                self._db = None
+
+    def record(
+        self,
+        tenant: str,
+        use_case: str,
+        provider: str,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        cost_usd: float
+    ):
+        """Count one call; flushes in the background when the interval has passed."""
+        key = (current_period(), tenant, use_case, provider, model)
+        _add(self._pending, key, [1, input_tokens, output_tokens, cost_usd])
+        self._maybe_flush()
+
+    def totals(self) -> Dict[UsageKey, List[float]]:
+        """Deployment-wide counters for the current period, including unflushed local usage.
+
+        Reading counters older than the flush interval starts a background flush and
+        reload, so processes that make no calls still pick up other workers' usage.
+        """
+        self._maybe_flush()
+        period = current_period()
+        merged: Dict[UsageKey, List[float]] = {}
+        for source in (self._totals, self._flushing, self._pending):
+            for key, values in source.items():
+                if key[0] == period:
+                    _add(merged, key, values)
+        return merged
+
+    def spent(self, tenant: Optional[str] = None, use_case: Optional[str] = None) -> float:
+        """USD spent this period, optionally for one tenant and/or use case."""
+        return sum(
+            values[3]
+            for (_, key_tenant, key_use_case, _, _), values in self.totals().items()
+            if (tenant is None or key_tenant == tenant) and (use_case is None or key_use_case == use_case)
+        )
+
+    async def flush(self):
+        """Write local counters to the shared table and reload deployment totals."""
+        if not self._pending:
+            self._last_flush = time.monotonic()
+            if self._db is None:
+                return
+        self._flushing, self._pending = self._pending, {}
+        try:
+            self._totals = await asyncio.to_thread(self._flush_sync, self._flushing)
+        except sqlite3.Error as e:
+            logger.warning("Usage flush failed, will retry", error=str(e))
+            for key, values in self._flushing.items():
+                _add(self._pending, key, values)
+        finally:
+            self._flushing = {}
+            self._last_flush = time.monotonic()
+
+    async def close(self):
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush < self.flush_interval:
+            return
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+        except RuntimeError:
+            pass  # No running loop; the next call inside the loop will flush
+
+    @staticmethod
+    def _open_db(path: str) -> sqlite3.Connection:
+        connection = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ai_usage (
+                period TEXT NOT NULL,
+                tenant TEXT NOT NULL,
+                use_case TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                requests INTEGER NOT NULL DEFAULT 0,
+                input_tokens INTEGER NOT NULL DEFAULT 0,
+                output_tokens INTEGER NOT NULL DEFAULT 0,
+                cost_usd REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (period, tenant, use_case, provider, model)
+            )
+            """
+        )
+        connection.commit()
+        return connection
+
+    def _flush_sync(self, batch: Dict[UsageKey, List[float]]) -> Dict[UsageKey, List[float]]:
+        if self._db is None:
+            totals = {key: list(values) for key, values in self._totals.items()}
+            for key, values in batch.items():
+                _add(totals, key, values)
+            return totals
+
+        with self._db_lock:
+            self._db.executemany(
+                """
+                INSERT INTO ai_usage (period, tenant, use_case, provider, model, requests, input_tokens, output_tokens, cost_usd)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (period, tenant, use_case, provider, model) DO UPDATE SET
+                    requests = requests + excluded.requests,
+                    input_tokens = input_tokens + excluded.input_tokens,
+                    output_tokens = output_tokens + excluded.output_tokens,
+                    cost_usd = cost_usd + excluded.cost_usd
+                """,
+                [(*key, *values) for key, values in batch.items()]
+            )
+            self._db.commit()
+        return self._load_totals(current_period())
+
+    def _load_totals(self, period: str) -> Dict[UsageKey, List[float]]:
+        with self._db_lock:
+            rows = self._db.execute(
+                """
+                SELECT period, tenant, use_case, provider, model, requests, input_tokens, output_tokens, cost_usd
+                FROM ai_usage WHERE period = ?
+                """,
+                (period,)
+            ).fetchall()
+        return {tuple(row[:5]): list(row[5:]) for row in rows}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Usage for the current period, summed over all workers."""
+        providers: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        use_cases: Dict[str, float] = {}
+        total = [0, 0, 0, 0.0]
+        for (_, _, use_case, provider, model), values in self.totals().items():
+            row = providers.setdefault(provider, {}).setdefault(
+                model, {"tokens": 0, "requests": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0}
+            )
+            row["requests"] += int(values[0])
+            row["input_tokens"] += int(values[1])
+            row["output_tokens"] += int(values[2])
+            row["tokens"] += int(values[1] + values[2])
+            row["cost_usd"] = round(row["cost_usd"] + values[3], 6)
+            use_cases[use_case] = round(use_cases.get(use_case, 0.0) + values[3], 6)
+            for i, value in enumerate(values):
+                total[i] += value
+
+        return {
+            "period": current_period(),
+            "total_requests": int(total[0]),
+            "total_tokens": int(total[1] + total[2]),
+            "total_input_tokens": int(total[1]),
+            "total_output_tokens": int(total[2]),
+            "total_cost_usd": round(total[3], 6),
+            "provider_breakdown": providers,
+            "cost_by_use_case": use_cases,
+            "shared": self._db is not None
+        }
@@ -0,0 +1,141 @@
+"""
+Single-writer commit queue for SQLite deployments.
+Each process funnels its hot-path writes through one connection that commits them
+in batches, so concurrent tasks stop contending for SQLite's write lock while reads
+keep using the pool. With other databases writes execute directly on the session.
+"""
+
+import os
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.sql import Executable
+import structlog
+
+from shared.models import engine
+from shared.metrics import DB_WRITE_BATCH_SIZE
+
+logger = structlog.get_logger()
+
+SQLITE_WRITE_QUEUE_ENABLED = os.getenv("SQLITE_WRITE_QUEUE_ENABLED", "true").lower() == "true"
+SQLITE_WRITE_BATCH_SIZE = int(os.getenv("SQLITE_WRITE_BATCH_SIZE", "64"))
+
+_Write = Tuple[Executable, asyncio.Future]
+
+class WriteQueue:
+    """Commits queued write statements in batches on a dedicated connection.
+
+    Writes that arrive while a batch is committing form the next batch, so the
+    number of commits (and fsyncs) grows with load far slower than the number of
+    writes. If a batch fails, its writes are retried one transaction each so a bad
+    statement only fails its own caller.
+    """
+
+    def __init__(self, engine: AsyncEngine, batch_size: int = SQLITE_WRITE_BATCH_SIZE):
+        self.engine = engine
+        self.batch_size = max(1, batch_size)
+        self.enabled = SQLITE_WRITE_QUEUE_ENABLED and engine.dialect.name == "sqlite"
+        self.stats = {"writes": 0, "batches": 0, "largest_batch": 0, "batch_retries": 0, "failed_writes": 0}
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def execute(self, statement: Executable) -> int:
+        """Commit `statement` with the next batch; returns its rowcount."""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run(self._queue), name="sqlite-writer")
+        future = loop.create_future()
+        self._queue.put_nowait((statement, future))
+        return await future
+
+    async def close(self):
+        """Commit everything queued, then stop the writer."""
+        if self._task is None or self._task.done():
+            return
+        self._queue.put_nowait(None)
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "queued": self.depth(), **self.stats}
+
+    async def _run(self, queue: asyncio.Queue):
+        while True:
+            write = await queue.get()
+            if write is None:
+                return
+            batch = [write]
+            stopping = False
+            while len(batch) < self.batch_size and not queue.empty():
+                write = queue.get_nowait()
+                if write is None:
+                    stopping = True
+                    break
+                batch.append(write)
+
+            # Callers that gave up before the batch started are skipped
+            batch = [(statement, future) for statement, future in batch if not future.done()]
+            if batch:
+                await self._commit(batch)
+            if stopping:
+                return
+
+    async def _commit(self, batch: List[_Write]):
+        self.stats["batches"] += 1
+        self.stats["writes"] += len(batch)
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        DB_WRITE_BATCH_SIZE.observe(len(batch))
+        try:
+            async with self.engine.begin() as conn:
+                rowcounts = [(await conn.execute(statement)).rowcount for statement, _ in batch]
+        except Exception as e:
+            if len(batch) == 1:
+                self._fail(batch[0][1], e)
+                return
+            self.stats["batch_retries"] += 1
+            logger.warning("SQLite write batch failed, retrying writes individually", size=len(batch), error=str(e))
+            for write in batch:
+                await self._commit_one(write)
+            return
+
+        for (_, future), rowcount in zip(batch, rowcounts):
+            if not future.done():
+                future.set_result(rowcount)
+
+    async def _commit_one(self, write: _Write):
+        statement, future = write
+        try:
+            async with self.engine.begin() as conn:
+                rowcount = (await conn.execute(statement)).rowcount
+        except Exception as e:
+            self._fail(future, e)
+            return
+        if not future.done():
+            future.set_result(rowcount)
+
+    def _fail(self, future: asyncio.Future, error: Exception):
+        self.stats["failed_writes"] += 1
+        if not future.done():
+            future.set_exception(error)
+
+write_queue = WriteQueue(engine)
+
+async def execute_write(db: AsyncSession, statement: Executable) -> int:
+    """Execute and commit a write statement, returning its rowcount.
+
+    With the SQLite write queue the statement runs on the writer connection; the
+    session is committed first so its pending changes land before the statement.
+    """
+    if not write_queue.enabled:
+        result = await db.execute(statement)
+        await db.commit()
+        return result.rowcount
+
+    await db.commit()
+    return await write_queue.execute(statement)
@@ -0,0 +1,109 @@
+"""
+ELCA Blockbusters standalone task worker.
+Claims pending tasks from the tasks table using leases so generation capacity
+can scale independently of the API tier. Run with: python -m worker
+"""
+
+import os
+import signal
+import asyncio
+from typing import Set
+import structlog
+
+import main
+from shared.models import async_session_maker, engine
+from shared.elca_ai_providers import close_ai_provider_manager
+from shared.write_queue import write_queue
+from shared.task_queue import make_owner_id, claim_tasks, release_task, fail_exhausted_tasks
+from shared.metrics import REGISTRY
+
+logger = structlog.get_logger()
+
+class TaskWorker:
+    """Polls for claimable tasks and processes them with bounded concurrency."""
+
+    def __init__(self):
+        self.owner_id = make_owner_id("worker")
+        self.concurrency = int(os.getenv("WORKER_CONCURRENCY", "4"))
+        self.poll_interval = float(os.getenv("WORKER_POLL_INTERVAL_SECONDS", "1.0"))
+        self.drain_timeout = float(os.getenv("WORKER_DRAIN_TIMEOUT_SECONDS", "60"))
+        self.in_flight: Set[asyncio.Task] = set()
+        self.stopping = asyncio.Event()
+
+    async def run(self):
+        """Run until SIGTERM/SIGINT, then drain in-flight work."""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.stopping.set)
+
+        await main.initialize_services()
+        REGISTRY.start_export()  # Merged into the API's /metrics
+        logger.info("Task worker started", owner=self.owner_id, concurrency=self.concurrency)
+
+        while not self.stopping.is_set():
+            try:
+                await self._poll_once()
+            except Exception as e:
+                logger.error("Worker poll failed", owner=self.owner_id, error=str(e))
+
+            # Sleep until the next poll, waking early on shutdown
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+        await self._drain()
+        await REGISTRY.stop_export()
+        await close_ai_provider_manager()
+        await write_queue.close()
+        await engine.dispose()
+
+    async def _poll_once(self):
+        """Claim as many tasks as there are free slots."""
+        free_slots = self.concurrency - len(self.in_flight)
+        if free_slots <= 0:
+            return
+
+        async with async_session_maker() as db:
+            await fail_exhausted_tasks(db)
+            task_ids = await claim_tasks(db, self.owner_id, free_slots)
+
+        for task_id in task_ids:
+            logger.info("Claimed task", task_id=task_id, owner=self.owner_id)
+            worker_task = asyncio.create_task(self._process(task_id), name=f"task:{task_id}")
+            self.in_flight.add(worker_task)
+            worker_task.add_done_callback(self.in_flight.discard)
+
+    async def _process(self, task_id: str):
+        """Process a claimed task; the lease is renewed while it runs."""
+        try:
+            await main.execute_task_claimed(task_id, self.owner_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Worker task failed", task_id=task_id, error=str(e))
+
+    async def _drain(self):
+        """Finish in-flight tasks; hand back anything that does not finish in time."""
+        if not self.in_flight:
+            logger.info("Task worker stopped", owner=self.owner_id)
+            return
+
+        logger.info("Draining in-flight tasks", count=len(self.in_flight), timeout=self.drain_timeout)
+        pending_tasks = {task.get_name().split(":", 1)[1]: task for task in self.in_flight}
+        done, not_done = await asyncio.wait(self.in_flight, timeout=self.drain_timeout)
+
+        for task in not_done:
+            task.cancel()
+        await asyncio.gather(*not_done, return_exceptions=True)
+
+        async with async_session_maker() as db:
+            for task_id, task in pending_tasks.items():
+                if task in not_done:
+                    await release_task(db, task_id, self.owner_id)
+                    logger.warning("Released unfinished task", task_id=task_id)
+
+        logger.info("Task worker stopped", owner=self.owner_id, released=len(not_done))
+
+if __name__ == "__main__":
+    asyncio.run(TaskWorker().run())